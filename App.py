@@ -1,21 +1,70 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Request, render_template, request, jsonify, redirect, url_for, flash, g, has_app_context, send_file
 import sqlite3
 import json
 import os
+import re
+import hashlib
+import bisect
+import heapq
+import glob
+import gzip
+import zlib
+import difflib
+import random
+import unicodedata
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 import shutil
+import subprocess
+import sys
+import tempfile
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from collections import OrderedDict
+import click
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 import logging
 
-# Import je bestaande OCR functies
-import pytesseract
-from PIL import Image
-import google.generativeai as genai
+import importlib
 from dotenv import load_dotenv
 
+class LazyModule:
+    """Module die pas bij het eerste gebruik wordt geïmporteerd.
+
+    De OCR/AI dependencies (vooral google.generativeai) kosten bij het importeren
+    veel tijd, terwijl de meeste requests en CLI commando's ze niet nodig hebben.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self.__dict__['_module'] is None:
+            # importlib heeft zijn eigen import locks, dus dit is thread-safe
+            self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return self.__dict__['_module']
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+# Je bestaande OCR functies, pas geladen bij de eerste OCR/AI aanroep
+pytesseract = LazyModule('pytesseract')
+Image = LazyModule('PIL.Image')
+ImageOps = LazyModule('PIL.ImageOps')
+genai = LazyModule('google.generativeai')
+
 # Laad environment variabelen
 load_dotenv()
 
@@ -49,28 +98,83 @@ def filter_sensitive_data(event, hint):
     
     return event
 
-sentry_sdk.init(
-    dsn=os.getenv("SENTRY_DSN"),  # Voeg SENTRY_DSN toe aan je .env file
-    integrations=[
-        FlaskIntegration(
-            transaction_style='endpoint'
-        ),
-        sentry_logging,
-    ],
-    # Performance Monitoring
-    traces_sample_rate=1.0,  # Voor productie: verlaag naar 0.1-0.3
-    profiles_sample_rate=1.0,  # Voor productie: verlaag naar 0.1-0.3
+# Sentry sampling: een standaard rate plus overrides per pad of transaction op.
+# Formaat: "/upload=1.0,/zoeken=0.1,/api/jobs/*=0.01,op:upload.job=0.5";
+# een '*' aan het eind matcht als prefix, de langste match wint.
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv('SENTRY_TRACES_SAMPLE_RATE', '1.0'))
+SENTRY_PROFILES_SAMPLE_RATE = float(os.getenv('SENTRY_PROFILES_SAMPLE_RATE', '1.0'))  # deel van de getracede requests
+SENTRY_TRACES_SAMPLE_RATES = os.getenv(
+    'SENTRY_TRACES_SAMPLE_RATES',
+    '/upload=1.0,op:upload=1.0,op:upload.job=1.0,/=0.1,/zoeken=0.1,/api/jobs/*=0.01,/health=0,/metrics=0'
+)
+SENTRY_UPLOAD_EVENTS = os.getenv('SENTRY_UPLOAD_EVENTS', 'false').lower() == 'true'  # event per geslaagde upload
+
+def parse_sample_rates(spec):
+    """Parse SENTRY_TRACES_SAMPLE_RATES naar (exact, prefixen, ops)"""
+    exact, prefixes, ops = {}, [], {}
+    for entry in spec.split(','):
+        key, _, rate = entry.strip().rpartition('=')
+        if not key:
+            continue
+        if key.startswith('op:'):
+            ops[key[3:]] = float(rate)
+        elif key.endswith('*'):
+            prefixes.append((key[:-1], float(rate)))
+        else:
+            exact[key] = float(rate)
+    prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+    return exact, prefixes, ops
+
+_sentry_sample_rates = parse_sample_rates(SENTRY_TRACES_SAMPLE_RATES)
+
+def traces_sampler(sampling_context):
+    """Sample rate per request pad of per handmatig gestarte transaction (op)"""
+    if sampling_context.get('parent_sampled') is not None:
+        return sampling_context['parent_sampled']
+
+    exact, prefixes, ops = _sentry_sample_rates
+    environ = sampling_context.get('wsgi_environ')
+    if environ is not None:
+        path = environ.get('PATH_INFO', '')
+        if path in exact:
+            return exact[path]
+        for prefix, rate in prefixes:
+            if path.startswith(prefix):
+                return rate
+        return SENTRY_TRACES_SAMPLE_RATE
+
+    op = sampling_context.get('transaction_context', {}).get('op')
+    return ops.get(op, SENTRY_TRACES_SAMPLE_RATE)
+
+def sentry_tracing_active():
+    """True als de huidige request/job getraced wordt; tags en context alleen dan zetten"""
+    span = sentry_sdk.Hub.current.scope.span
+    return span is not None and bool(span.sampled)
+
+def init_sentry():
+    """Initialiseer Sentry (vanuit init_app, niet bij het importeren)"""
+    sentry_sdk.init(
+        dsn=os.getenv("SENTRY_DSN"),  # Voeg SENTRY_DSN toe aan je .env file
+        integrations=[
+            FlaskIntegration(
+                transaction_style='endpoint'
+            ),
+            sentry_logging,
+        ],
+        # Performance Monitoring, per endpoint instelbaar via SENTRY_TRACES_SAMPLE_RATES
+        traces_sampler=traces_sampler,
+        profiles_sample_rate=SENTRY_PROFILES_SAMPLE_RATE,
     
-    # Release tracking
-    release=os.getenv("SENTRY_RELEASE", "recepten-app@1.0.0"),
-    environment=os.getenv("SENTRY_ENVIRONMENT", "development"),
+        # Release tracking
+        release=os.getenv("SENTRY_RELEASE", "recepten-app@1.0.0"),
+        environment=os.getenv("SENTRY_ENVIRONMENT", "development"),
     
-    # Session tracking
-    send_default_pii=False,  # Bescherm persoonlijke informatie
+        # Session tracking
+        send_default_pii=False,  # Bescherm persoonlijke informatie
     
-    # Error filtering
-    before_send=filter_sensitive_data,
-)
+        # Error filtering
+        before_send=filter_sensitive_data,
+    )
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'je-geheime-sleutel-hier')
@@ -81,78 +185,1849 @@ UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'}
 ARCHIVE_FOLDER = os.path.join('uploads', 'archief')
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB max
+MAX_BATCH_UPLOAD_SIZE = int(os.getenv('MAX_BATCH_UPLOAD_SIZE', str(256 * 1024 * 1024)))  # hele batch; per foto MAX_FILE_SIZE
 
-# Maak upload folders aan
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+# Upload wachtrij configuratie
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '5'))  # seconden
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '600'))  # max verwerkingstijd per poging
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+# Database configuratie
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024)))  # 64MB
+
+# Bulk import configuratie
+IMPORT_OCR_PROCESSES = int(os.getenv('IMPORT_OCR_PROCESSES', str(os.cpu_count() or 2)))  # alleen de import-dir CLI
+IMPORT_OCR_THREADS = int(os.getenv('IMPORT_OCR_THREADS', '2'))  # batch uploads in het webproces
+IMPORT_AI_THREADS = int(os.getenv('IMPORT_AI_THREADS', '4'))
+IMPORT_COMMIT_EVERY = int(os.getenv('IMPORT_COMMIT_EVERY', '20'))  # recepten per transactie
+
+# Cache configuratie voor /api/ingredienten en /api/ingredienten/suggest
+INGREDIENT_CACHE_TTL = float(os.getenv('INGREDIENT_CACHE_TTL', '5'))  # seconden tussen versiechecks
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', '60'))  # Cache-Control max-age voor browsers
+
+# Fuzzy zoeken (typefouten/OCR fouten)
+FUZZY_MIN_SIMILARITY = float(os.getenv('FUZZY_MIN_SIMILARITY', '0.6'))  # 1 - edit distance / woordlengte
+FUZZY_DEFAULT_LIMIT = int(os.getenv('FUZZY_DEFAULT_LIMIT', '50'))
+
+# Cache van gerenderde receptkaarten voor /recept/<id>
+RECIPE_CARD_CACHE_ITEMS = int(os.getenv('RECIPE_CARD_CACHE_ITEMS', '500'))  # 0 = uit
+RECIPE_CARD_CACHE_BYTES = int(os.getenv('RECIPE_CARD_CACHE_BYTES', str(8 * 1024 * 1024)))
+RECIPE_CARD_CACHE_DIR = os.getenv('RECIPE_CARD_CACHE_DIR', '')  # leeg = alleen in het geheugen
+
+# Koude kolommen (ruwe OCR tekst, originele bestandsnaam) staan zlib gecomprimeerd in recept_bronnen
+RECIPE_SOURCE_COMPRESSION_LEVEL = int(os.getenv('RECIPE_SOURCE_COMPRESSION_LEVEL', '6'))  # 1 = snelst, 9 = kleinst
+
+# Afgeleide afbeeldingen van de gearchiveerde foto's: naam -> langste zijde in pixels
+THUMBNAIL_SIZES = {
+    'klein': int(os.getenv('THUMBNAIL_SMALL', '200')),   # receptenlijst
+    'groot': int(os.getenv('THUMBNAIL_LARGE', '1200')),  # receptpagina
+}
+THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'webp').lower()  # 'webp' of 'jpeg'
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600  # content-addressed, dus de inhoud van een URL verandert nooit
+
+# Vergelijkbare recepten op de receptpagina (Jaccard gelijkenis van de ingrediënten)
+SIMILAR_RECIPES_K = int(os.getenv('SIMILAR_RECIPES_K', '6'))  # buren per recept
+SIMILAR_RECIPES_MIN_SCORE = float(os.getenv('SIMILAR_RECIPES_MIN_SCORE', '0.2'))
+SIMILAR_RECIPES_MAX_INGREDIENT_RECIPES = int(os.getenv('SIMILAR_RECIPES_MAX_INGREDIENT_RECIPES', '1000'))  # vaker: geen kandidaten
+SIMILAR_RECIPES_REBUILD_AFTER = int(os.getenv('SIMILAR_RECIPES_REBUILD_AFTER', '200'))  # import: vanaf zoveel recepten volledig herberekenen
+
+# Boodschappenlijst; recepten hebben geen aantal porties, dus ?porties= rekent vanaf dit aantal
+SHOPPING_LIST_DEFAULT_PORTIES = float(os.getenv('SHOPPING_LIST_DEFAULT_PORTIES', '4'))
+SHOPPING_LIST_MAX_RECIPES = int(os.getenv('SHOPPING_LIST_MAX_RECIPES', '100'))
+
+# Export/import van de hele collectie (NDJSON, optioneel gzip)
+RECIPE_EXPORT_FETCH_SIZE = int(os.getenv('RECIPE_EXPORT_FETCH_SIZE', '500'))  # rijen per fetchmany
+RECIPE_IMPORT_BATCH_SIZE = int(os.getenv('RECIPE_IMPORT_BATCH_SIZE', '500'))  # recepten per transactie
+RECIPE_IMPORT_MAX_SIZE = int(os.getenv('RECIPE_IMPORT_MAX_SIZE', str(1024 * 1024 * 1024)))  # 1GB per request
+
+# Versies van de extractie stappen; verhoog bij een wijziging zodat de
+# OCR/AI resultaat cache niet meer wordt gebruikt
+OCR_VERSION = '1'
+PROMPT_VERSION = '1'
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+
+# Herverwerking van bestaande recepten na een nieuwe OCR of prompt versie
+REPROCESS_WORKERS = int(os.getenv('REPROCESS_WORKERS', '2'))
+REPROCESS_RATE = float(os.getenv('REPROCESS_RATE', '30'))  # recepten per minuut, 0 = onbeperkt
+REPROCESS_BATCH_SIZE = int(os.getenv('REPROCESS_BATCH_SIZE', '25'))  # recepten per transactie
+
+# Gemini client configuratie
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '4'))  # gelijktijdige API aanroepen per proces
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '60'))  # seconden per aanroep
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '3'))
+GEMINI_BACKOFF_BASE = float(os.getenv('GEMINI_BACKOFF_BASE', '1'))  # seconden
+GEMINI_BACKOFF_MAX = float(os.getenv('GEMINI_BACKOFF_MAX', '30'))
+
+# OCR configuratie
+# 'sequential': één herkenning per taal na elkaar
+# 'parallel': één herkenning per taal, talen tegelijk
+# 'combined': één enkele herkenning met alle talen (bijv. nld+eng)
+OCR_MODE = os.getenv('OCR_MODE', 'sequential')
+OCR_LANGUAGES = [lang for lang in os.getenv('OCR_LANGUAGES', 'nld,eng').split(',') if lang]
+
+# Preprocessing vóór OCR (één keer per afbeelding, gedeeld door alle passes)
+# OCR_MAX_DIMENSION: langste zijde in pixels (2400 ≈ 300 DPI voor een A5/A4 pagina), 0 = niet verkleinen
+OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', '2400'))
+OCR_BINARIZE = os.getenv('OCR_BINARIZE', 'false').lower() == 'true'
+OCR_DESKEW = os.getenv('OCR_DESKEW', 'false').lower() == 'true'
+OCR_DESKEW_MAX_ANGLE = float(os.getenv('OCR_DESKEW_MAX_ANGLE', '5'))
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# In-process metrics in Prometheus tekstformaat (/metrics). Elk proces heeft
+# zijn eigen registry; scrape per worker of aggregeer in Prometheus.
+METRIC_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_DEFINITIONS = {
+    'recepten_http_request_seconds': ('histogram', 'Duur van HTTP requests per endpoint'),
+    'recepten_ocr_seconds': ('histogram', 'Duur van OCR stappen (preprocess en herkenning per taal)'),
+    'recepten_gemini_seconds': ('histogram', 'Latency van Gemini aanroepen per uitkomst'),
+    'recepten_db_query_seconds': ('histogram', 'Duur van database queries en schrijftransacties'),
+    'recepten_search_seconds': ('histogram', 'Latency van zoekopdrachten per soort'),
+    'recepten_similarity_seconds': ('histogram', 'Duur van het bijwerken van de vergelijkbare recepten'),
+    'recepten_uploads_total': ('counter', 'Verwerkte upload jobs per status'),
+}
+
+_metrics_lock = threading.Lock()
+_metric_values = {name: {} for name in METRIC_DEFINITIONS}
+
+def observe_metric(name, seconds, **labels):
+    """Voeg een meting toe aan een histogram"""
+    key = tuple(sorted(labels.items()))
+    index = bisect.bisect_left(METRIC_BUCKETS, seconds)
+    with _metrics_lock:
+        series = _metric_values[name].get(key)
+        if series is None:
+            # Tellers per bucket (niet cumulatief), plus som en aantal
+            series = _metric_values[name][key] = {"buckets": [0] * len(METRIC_BUCKETS), "sum": 0.0, "count": 0}
+        if index < len(METRIC_BUCKETS):
+            series['buckets'][index] += 1
+        series['sum'] += seconds
+        series['count'] += 1
+
+def inc_metric(name, amount=1, **labels):
+    """Verhoog een counter"""
+    key = tuple(sorted(labels.items()))
+    with _metrics_lock:
+        _metric_values[name][key] = _metric_values[name].get(key, 0) + amount
+
+@contextmanager
+def timed(name, **labels):
+    """Meet de duur van een blok in een histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_metric(name, time.perf_counter() - start, **labels)
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+
+def render_metrics():
+    """Alle metrics in het Prometheus tekstformaat (versie 0.0.4)"""
+    with _metrics_lock:
+        snapshot = {
+            name: {key: (dict(value, buckets=list(value['buckets'])) if isinstance(value, dict) else value)
+                   for key, value in series.items()}
+            for name, series in _metric_values.items()
+        }
+
+    lines = []
+    for name, (kind, help_text) in METRIC_DEFINITIONS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(snapshot[name].items()):
+            if kind == 'counter':
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(METRIC_BUCKETS, value['buckets']):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return '\n'.join(lines) + '\n'
+
 # Database helper functies met error handling
-def get_db_connection():
-    """Maak een database connectie met error handling"""
+DB_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def parse_db_timestamp(value):
+    """sqlite3 converter voor DATETIME kolommen; onbekende formaten blijven een string"""
+    text = value.decode('utf-8')
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
+        return datetime.strptime(text, DB_TIMESTAMP_FORMAT)
+    except ValueError:
+        return text
+
+def format_db_timestamp(value):
+    """Zet een (geconverteerde) timestamp terug naar het formaat in de database"""
+    if isinstance(value, datetime):
+        return value.strftime(DB_TIMESTAMP_FORMAT)
+    return value
+
+sqlite3.register_converter('DATETIME', parse_db_timestamp)
+
+# Elke thread (gunicorn worker thread, upload worker, CLI) houdt één lees- en
+# één schrijfconnectie open die tussen requests wordt hergebruikt.
+_db_pool = {}  # (thread, 'read' | 'write') -> sqlite3.Connection
+_db_pool_lock = threading.Lock()
+_db_write_lock = threading.Lock()
+_db_pool_stats = {"opened": 0, "reused": 0, "closed": 0, "writes": 0, "write_wait_ms": 0.0}
+
+def open_db_connection():
+    """Open een nieuwe connectie met getunede PRAGMA's"""
+    # check_same_thread=False zodat de pool connecties van gestopte threads kan sluiten;
+    # een connectie wordt zelf altijd maar door één thread gebruikt.
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        detect_types=sqlite3.PARSE_DECLTYPES,  # DATETIME kolommen worden datetime objecten
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')  # lezers blokkeren schrijvers niet
+    conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA synchronous = NORMAL')  # veilig in WAL mode, veel minder fsyncs
+    conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+def _count_db_pool(**increments):
+    """Tel op in de pool statistieken, onder _db_pool_lock"""
+    with _db_pool_lock:
+        for name, value in increments.items():
+            _db_pool_stats[name] += value
+
+def _prune_db_pool():
+    """Sluit connecties van threads die niet meer bestaan (aanroepen met _db_pool_lock)"""
+    for key in [key for key in _db_pool if not key[0].is_alive()]:
+        try:
+            _db_pool.pop(key).close()
+        except sqlite3.Error:
+            pass
+        _db_pool_stats['closed'] += 1
+
+def _pooled_connection(kind):
+    """Connectie van de huidige thread voor kind ('read' of 'write')"""
+    key = (threading.current_thread(), kind)
+    conn = _db_pool.get(key)
+    if conn is not None:
+        _count_db_pool(reused=1)
         return conn
+
+    try:
+        conn = open_db_connection()
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {str(e)}")
         sentry_sdk.capture_exception(e)
         raise
 
+    with _db_pool_lock:
+        _prune_db_pool()
+        _db_pool[key] = conn
+        _db_pool_stats['opened'] += 1
+    return conn
+
+def get_db_connection():
+    """Geef de (lees)connectie van deze thread, gekoppeld aan Flask's g"""
+    conn = _pooled_connection('read')
+    if has_app_context():
+        g.db = conn
+    return conn
+
+def discard_db_connections():
+    """Sluit de connecties van deze thread (bijv. na een fout)"""
+    current = threading.current_thread()
+    with _db_pool_lock:
+        for kind in ('read', 'write'):
+            conn = _db_pool.pop((current, kind), None)
+            if conn is not None:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                _db_pool_stats['closed'] += 1
+
+@contextmanager
+def db_write():
+    """Schrijftransactie op de schrijfconnectie van deze thread.
+
+    Schrijvers binnen een proces wachten op elkaar via een lock en nemen met
+    BEGIN IMMEDIATE direct de schrijflock, zodat ze niet halverwege met
+    "database is locked" falen.
+    """
+    conn = _pooled_connection('write')
+    wait_start = time.perf_counter()
+    with _db_write_lock, timed('recepten_db_query_seconds', query='write_transaction'):
+        _count_db_pool(writes=1, write_wait_ms=(time.perf_counter() - wait_start) * 1000)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def get_db_pool_stats():
+    """Statistieken van de connectie pool van dit proces"""
+    with _db_pool_lock:
+        _prune_db_pool()
+        stats = dict(_db_pool_stats, open=len(_db_pool))
+    stats['write_wait_ms'] = round(stats['write_wait_ms'], 2)
+    return stats
+
+@app.teardown_appcontext
+def release_db_connection(error):
+    """Geef de connectie terug aan de pool; na een fout wordt hij gesloten"""
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    if error is not None:
+        discard_db_connections()
+    elif conn.in_transaction:
+        conn.rollback()
+
 def init_db():
     """Initialiseer de database met de juiste tabel structuur"""
     try:
-        conn = get_db_connection()
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS recepten (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                titel TEXT NOT NULL,
-                ingredienten TEXT,
-                stappen TEXT,
-                benodigdheden TEXT,
-                originele_bestandsnaam TEXT,
-                ruwe_ocr_tekst TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        with db_write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recepten (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    titel TEXT NOT NULL,
+                    ingredienten TEXT,
+                    stappen TEXT,
+                    benodigdheden TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Upload wachtrij: elke job doorloopt ocr -> ai -> db -> archive
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS upload_jobs (
+                    id TEXT PRIMARY KEY,
+                    soort TEXT NOT NULL DEFAULT 'upload',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    stage TEXT NOT NULL DEFAULT 'queued',
+                    bestandsnaam TEXT NOT NULL,
+                    content_type TEXT,
+                    ruwe_ocr_tekst TEXT,
+                    recept_json TEXT,
+                    recept_id INTEGER,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Voor keyset paginering op (timestamp, id)
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recepten_timestamp_id
+                ON recepten (timestamp, id)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_upload_jobs_status
+                ON upload_jobs (status, created_at)
+            ''')
+            add_column_if_missing(conn, 'upload_jobs', 'soort', "TEXT NOT NULL DEFAULT 'upload'")
+            # Bulk import: één rij per bestand, zodat een afgebroken import kan hervatten
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS import_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    batch_id TEXT NOT NULL,
+                    bron TEXT NOT NULL,
+                    pad TEXT NOT NULL,
+                    bestandsnaam TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    recept_id INTEGER,
+                    error TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (batch_id, bron)
+                )
+            ''')
+            # Content hashes voor deduplicatie en de OCR/AI resultaat cache
+            add_column_if_missing(conn, 'recepten', 'bestand_hash', 'TEXT')
+            add_column_if_missing(conn, 'upload_jobs', 'bestand_hash', 'TEXT')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recepten_bestand_hash
+                ON recepten (bestand_hash)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS extractie_cache (
+                    sleutel TEXT PRIMARY KEY,
+                    soort TEXT NOT NULL,
+                    waarde TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Rij versie voor de receptkaart cache; verhoogd bij elke inhoudelijke wijziging
+            add_column_if_missing(conn, 'recepten', 'versie', 'INTEGER NOT NULL DEFAULT 1')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS recepten_rij_versie
+                AFTER UPDATE OF titel, ingredienten, stappen, benodigdheden, timestamp ON recepten
+                WHEN NEW.versie = OLD.versie
+                BEGIN
+                    UPDATE recepten SET versie = OLD.versie + 1 WHERE id = NEW.id;
+                END
+            ''')
+            # Hash van de inhoud voor upserts bij het importeren van een export
+            add_column_if_missing(conn, 'recepten', 'inhoud_hash', 'TEXT')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recepten_inhoud_hash
+                ON recepten (inhoud_hash)
+            ''')
+            count = backfill_content_hashes(conn)
+            if count:
+                logger.info(f"Backfilled recepten.inhoud_hash: {count} recipes")
+            # Met welke OCR/AI configuratie een recept gemaakt is (zie reprocess);
+            # bestaande recepten gelden als gemaakt met de huidige configuratie
+            ocr_versie, ai_versie = current_extraction_versions()
+            if add_column_if_missing(conn, 'recepten', 'ocr_versie', 'TEXT'):
+                conn.execute('UPDATE recepten SET ocr_versie = ?', (ocr_versie,))
+            if add_column_if_missing(conn, 'recepten', 'ai_versie', 'TEXT'):
+                conn.execute('UPDATE recepten SET ai_versie = ?', (ai_versie,))
+            init_data_versions(conn)
+            init_search_index(conn)
+            init_ingredient_table(conn)
+            init_similar_recipes(conn)
+            migrated = init_recipe_sources(conn)
+        if migrated:
+            # DROP COLUMN geeft de ruimte niet terug aan het bestand
+            try:
+                vacuum_database()
+            except sqlite3.Error as e:
+                logger.warning(f"VACUUM after migration failed: {str(e)}")
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization error: {str(e)}")
         sentry_sdk.capture_exception(e)
         raise
 
-# Initialiseer database bij opstarten
-with app.app_context():
-    init_db()
+def add_column_if_missing(conn, table, column, declaration):
+    """Migratie: voeg een kolom toe aan een bestaande tabel als die nog ontbreekt"""
+    columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+        logger.info(f"Added column {table}.{column}")
+        return True
+    return False
+
+def recipe_content_hash(recipe_data):
+    """SHA-256 van titel, ingrediënten, stappen en benodigdheden (onafhankelijk van id en bestand)"""
+    inhoud = [
+        recipe_data.get('titel', 'Onbekend Recept'),
+        recipe_data.get('ingredienten', []),
+        recipe_data.get('stappen', []),
+        recipe_data.get('benodigdheden', []),
+    ]
+    canonical = json.dumps(inhoud, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def backfill_content_hashes(conn, batch_size=1000):
+    """Migratie: vul inhoud_hash voor recepten van vóór deze kolom"""
+    count = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, titel, ingredienten, stappen, benodigdheden FROM recepten
+            WHERE inhoud_hash IS NULL LIMIT ?
+        ''', (batch_size,)).fetchall()
+        if not rows:
+            return count
+        updates = []
+        for row in rows:
+            recipe_data = {"titel": row['titel']}
+            for field in ('ingredienten', 'stappen', 'benodigdheden'):
+                try:
+                    recipe_data[field] = json.loads(row[field]) if row[field] else []
+                except json.JSONDecodeError:
+                    recipe_data[field] = row[field]
+            updates.append((recipe_content_hash(recipe_data), row['id']))
+        conn.executemany('UPDATE recepten SET inhoud_hash = ? WHERE id = ?', updates)
+        count += len(updates)
+
+# Versienummers voor caches: triggers verhogen de versie bij elke wijziging,
+# ook als die uit een ander gunicorn proces of een CLI commando komt.
+def init_data_versions(conn):
+    """Maak de data_versies tabel en de triggers op recepten aan"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versies (
+            naam TEXT PRIMARY KEY,
+            versie INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO data_versies (naam, versie) VALUES ('recepten', 0)")
+    # Willekeurig bij het aanmaken: onderscheidt deze database van een nieuwe met dezelfde ids
+    conn.execute("INSERT OR IGNORE INTO data_versies (naam, versie) VALUES ('database', ?)",
+                 (uuid.uuid4().int >> 66,))
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS recepten_versie_{event.lower()} AFTER {event} ON recepten BEGIN
+                UPDATE data_versies SET versie = versie + 1 WHERE naam = 'recepten';
+            END
+        ''')
+
+def get_data_version(conn, naam='recepten'):
+    """Huidige versie van een dataset"""
+    row = conn.execute('SELECT versie FROM data_versies WHERE naam = ?', (naam,)).fetchone()
+    return row['versie'] if row else 0
+
+def bump_data_version(conn, naam='recepten'):
+    """Verhoog de versie handmatig (bijv. na een backfill buiten de triggers om)"""
+    conn.execute('UPDATE data_versies SET versie = versie + 1 WHERE naam = ?', (naam,))
+
+# Full-text zoekindex (SQLite FTS5)
+# Ingrediënten, stappen en benodigdheden worden uit de JSON kolommen gehaald,
+# zodat zoeken op bijv. "naam" of "eenheid" niet meer elk recept oplevert.
+def _fts_values_sql(prefix):
+    """SELECT expressies die de FTS kolommen vullen vanuit een recepten rij"""
+    return f'''
+        {prefix}titel,
+        CASE WHEN json_valid({prefix}ingredienten) THEN
+            (SELECT group_concat(CASE WHEN type = 'object' THEN json_extract(value, '$.naam') ELSE value END, ' ')
+             FROM json_each({prefix}ingredienten))
+        END,
+        CASE WHEN json_valid({prefix}stappen) THEN
+            (SELECT group_concat(value, ' ') FROM json_each({prefix}stappen))
+        END,
+        CASE WHEN json_valid({prefix}benodigdheden) THEN
+            (SELECT group_concat(value, ' ') FROM json_each({prefix}benodigdheden))
+        END
+    '''
+
+# Gewichten voor bm25: titel > ingrediënten > stappen/benodigdheden
+SEARCH_BM25_WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+
+def init_search_index(conn):
+    """Maak de FTS5 tabel en sync triggers aan; vul de index bij een nieuwe tabel"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recepten_fts'"
+    ).fetchone()
+
+    # remove_diacritics: "creme" vindt "crème"; prefix index voor zoeken-tijdens-typen
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS recepten_fts USING fts5(
+            titel, ingredienten, stappen, benodigdheden,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '2 3'
+        )
+    ''')
+    # Triggers opnieuw aanmaken, zodat een gewijzigde _fts_values_sql ook bestaande databases bereikt
+    for trigger in ('recepten_fts_insert', 'recepten_fts_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recepten_fts_insert AFTER INSERT ON recepten BEGIN
+            INSERT INTO recepten_fts (rowid, titel, ingredienten, stappen, benodigdheden)
+            SELECT new.id, {_fts_values_sql('new.')};
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS recepten_fts_delete AFTER DELETE ON recepten BEGIN
+            DELETE FROM recepten_fts WHERE rowid = old.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recepten_fts_update
+        AFTER UPDATE OF titel, ingredienten, stappen, benodigdheden ON recepten BEGIN
+            DELETE FROM recepten_fts WHERE rowid = old.id;
+            INSERT INTO recepten_fts (rowid, titel, ingredienten, stappen, benodigdheden)
+            SELECT new.id, {_fts_values_sql('new.')};
+        END
+    ''')
+
+    if not exists:
+        rebuild_search_index(conn)
+
+def rebuild_search_index(conn):
+    """Vul de zoekindex opnieuw vanuit de recepten tabel"""
+    conn.execute('DELETE FROM recepten_fts')
+    conn.execute(f'''
+        INSERT INTO recepten_fts (rowid, titel, ingredienten, stappen, benodigdheden)
+        SELECT id, {_fts_values_sql('')} FROM recepten
+    ''')
+    conn.execute("INSERT INTO recepten_fts (recepten_fts) VALUES ('optimize')")
+    return conn.execute('SELECT COUNT(*) FROM recepten_fts').fetchone()[0]
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Bouw de full-text zoekindex opnieuw op (voor bestaande databases)"""
+    init_app()
+    with db_write() as conn:
+        count = rebuild_search_index(conn)
+    print(f"Zoekindex opnieuw opgebouwd: {count} recepten")
+
+def normalize_text(text):
+    """Lowercase en zonder accenten, voor vergelijken van zoektermen"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+def search_terms(query):
+    """Splits een zoekopdracht in losse (genormaliseerde) woorden"""
+    return re.findall(r'\w+', normalize_text(query))
+
+def build_fts_query(query, columns=None):
+    """Zet een zoekopdracht om naar een FTS5 MATCH expressie met prefix matching"""
+    terms = search_terms(query)
+    if not terms:
+        return None
+    expression = ' '.join(f'"{term}"*' for term in terms)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+# Hoeveelheden worden bij het opslaan omgerekend naar g, ml of stuks, zodat de
+# boodschappenlijst alleen nog hoeft op te tellen. Eenheid -> (canonieke eenheid, factor)
+UNIT_CONVERSIONS = {
+    **dict.fromkeys(['g', 'gr', 'gram', 'grammen'], ('g', 1)),
+    **dict.fromkeys(['kg', 'kilo', 'kilogram'], ('g', 1000)),
+    **dict.fromkeys(['mg', 'milligram'], ('g', 0.001)),
+    'ons': ('g', 100),
+    'pond': ('g', 500),
+    **dict.fromkeys(['ml', 'milliliter'], ('ml', 1)),
+    **dict.fromkeys(['cl', 'centiliter'], ('ml', 10)),
+    **dict.fromkeys(['dl', 'deciliter'], ('ml', 100)),
+    **dict.fromkeys(['l', 'liter'], ('ml', 1000)),
+    **dict.fromkeys(['el', 'eetlepel', 'eetlepels', 'eetl'], ('ml', 15)),
+    **dict.fromkeys(['tl', 'theelepel', 'theelepels', 'theel'], ('ml', 5)),
+    **dict.fromkeys([
+        'stuk', 'stuks', 'st', 'teen', 'teentje', 'teentjes', 'tenen', 'blik', 'blikje', 'blikjes', 'blikken',
+        'zakje', 'zakjes', 'takje', 'takjes', 'plak', 'plakje', 'plakjes', 'plakken', 'bos', 'bosje', 'bosjes',
+        'snee', 'sneetje', 'sneetjes', 'sneden', 'pak', 'pakje', 'pakjes', 'potje', 'potjes',
+    ], ('stuks', 1)),
+}
+# Verhoog bij een wijziging van parse_quantity, zodat opgeslagen hoeveelheden opnieuw worden omgerekend
+QUANTITY_PARSER_VERSION = 2
+QUANTITY_FRACTIONS = {'½': '1/2', '¼': '1/4', '¾': '3/4', '⅓': '1/3', '⅔': '2/3', '⅛': '1/8'}
+# Getal, breuk of heel getal met breuk ("1 1/2")
+_QUANTITY_NUMBER = re.compile(r'(\d+(?:[.,]\d+)?)(?:\s*/\s*(\d+)|\s+(\d+)\s*/\s*(\d+))?')
+_QUANTITY_RANGE = re.compile(r'\s*(?:-|–|\btot\b|\bà\b|\ba\b)\s*')
+
+def _parse_quantity_part(part):
+    """Eerste getal in part -> (getal, rest); (None, '') zonder getal of bij een deling door nul"""
+    match = _QUANTITY_NUMBER.search(part)
+    if match is None:
+        return None, ''
+    value = float(match.group(1).replace(',', '.'))
+    if match.group(2):
+        denominator = float(match.group(2))
+        if not denominator:
+            return None, ''
+        value /= denominator
+    elif match.group(3):
+        denominator = float(match.group(4))
+        if not denominator:
+            return None, ''
+        value += float(match.group(3)) / denominator
+    return value, part[match.end():]
+
+def parse_quantity(text):
+    """'1/2', '1 1/2', '2-3', '0,5', '½' -> (getal, rest); bij een bereik de bovengrens.
+
+    De rest is de tekst na het getal (bijv. 'g' bij '200g'); (None, '') zonder getal.
+    Overige getallen ('2 x 100 g', '2 pakjes à 250 g') zijn niet op te tellen: (None, '').
+    """
+    text = str(text or '').strip().lower()
+    for char, fraction in QUANTITY_FRACTIONS.items():
+        text = text.replace(char, f" {fraction}")
+
+    parts = _QUANTITY_RANGE.split(text)
+    amount = None
+    for index, part in enumerate(parts):
+        value, rest = _parse_quantity_part(part)
+        if value is None:
+            return None, ''
+        # Alleen het laatste getal van een bereik mag een eenheid hebben, en nergens een tweede getal
+        if any(char.isdigit() for char in rest) or (index < len(parts) - 1 and rest.strip()):
+            return None, ''
+        amount = value if amount is None else max(amount, value)
+    return amount, rest.strip(' .')
+
+def normalize_quantity(hoeveelheid, eenheid):
+    """Hoeveelheid en eenheid -> (getal, 'g' | 'ml' | 'stuks' | onbekende eenheid); (None, None) zonder getal"""
+    amount, rest = parse_quantity(hoeveelheid)
+    if amount is None:
+        return None, None  # "naar smaak", "snufje"
+    unit = normalize_text(str(eenheid)) if eenheid not in (None, '') else normalize_text(rest)
+    unit = unit.strip(' .')
+    if not unit:
+        return amount, 'stuks'
+    canonical, factor = UNIT_CONVERSIONS.get(unit, (unit, 1))
+    return amount * factor, canonical
+
+# Genormaliseerde ingrediënten tabel (één rij per ingrediënt per recept)
+def init_ingredient_table(conn):
+    """Maak recept_ingredienten aan en vul de tabel eenmalig vanuit de JSON kolom"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recept_ingredienten'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS recept_ingredienten (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recept_id INTEGER NOT NULL REFERENCES recepten (id) ON DELETE CASCADE,
+            naam TEXT NOT NULL,
+            naam_norm TEXT NOT NULL,
+            hoeveelheid TEXT,
+            eenheid TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recept_ingredienten_naam_norm
+        ON recept_ingredienten (naam_norm, recept_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recept_ingredienten_recept
+        ON recept_ingredienten (recept_id)
+    ''')
+    # foreign_keys staat standaard uit in SQLite, dus ook via een trigger opruimen
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS recept_ingredienten_delete AFTER DELETE ON recepten BEGIN
+            DELETE FROM recept_ingredienten WHERE recept_id = old.id;
+        END
+    ''')
+    # Hoeveelheid omgerekend naar eenheid_norm (g, ml of stuks) voor de boodschappenlijst
+    added = add_column_if_missing(conn, 'recept_ingredienten', 'hoeveelheid_norm', 'REAL')
+    add_column_if_missing(conn, 'recept_ingredienten', 'eenheid_norm', 'TEXT')
+
+    if not exists:
+        count = backfill_ingredient_table(conn)
+        logger.info(f"Backfilled recept_ingredienten: {count} ingredients")
+    elif added or get_data_version(conn, 'hoeveelheden') < QUANTITY_PARSER_VERSION:
+        count = backfill_normalized_quantities(conn)
+        logger.info(f"Backfilled normalized quantities: {count} ingredients")
+    conn.execute("INSERT OR REPLACE INTO data_versies (naam, versie) VALUES ('hoeveelheden', ?)",
+                 (QUANTITY_PARSER_VERSION,))
+
+def backfill_normalized_quantities(conn):
+    """Migratie: reken de hoeveelheden van bestaande rijen om"""
+    updates = [
+        (*normalize_quantity(row['hoeveelheid'], row['eenheid']), row['id'])
+        for row in conn.execute('SELECT id, hoeveelheid, eenheid FROM recept_ingredienten')
+    ]
+    conn.executemany('UPDATE recept_ingredienten SET hoeveelheid_norm = ?, eenheid_norm = ? WHERE id = ?', updates)
+    return len(updates)
+
+def backfill_ingredient_table(conn):
+    """Migratie: vul recept_ingredienten vanuit recepten.ingredienten"""
+    conn.execute('DELETE FROM recept_ingredienten')
+    count = 0
+    for recept in conn.execute('SELECT id, ingredienten FROM recepten').fetchall():
+        if not recept['ingredienten']:
+            continue
+        try:
+            ingredienten_lijst = json.loads(recept['ingredienten'])
+        except json.JSONDecodeError:
+            continue
+        count += insert_recipe_ingredients(conn, recept['id'], ingredienten_lijst)
+    return count
+
+# Koude gegevens van een recept (ruwe OCR tekst, originele bestandsnaam) staan in een
+# aparte tabel, zodat scans over recepten ze niet door de page cache halen. De tekst
+# wordt alleen geladen voor herverwerken, export en "Toon OCR tekst".
+RECIPE_SOURCE_COLUMNS = ('originele_bestandsnaam', 'ruwe_ocr_tekst')
+
+def compress_text(text):
+    """zlib gecomprimeerde UTF-8 bytes, of None"""
+    if text is None:
+        return None
+    return zlib.compress(text.encode('utf-8'), RECIPE_SOURCE_COMPRESSION_LEVEL)
+
+def decompress_text(value):
+    """Tegenhanger van compress_text"""
+    if value is None or isinstance(value, str):
+        return value
+    return zlib.decompress(value).decode('utf-8')
+
+def init_recipe_sources(conn):
+    """Maak recept_bronnen aan en verplaats de koude kolommen uit een oude recepten tabel.
+
+    Geeft True als er gemigreerd is (dan is een VACUUM zinvol).
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS recept_bronnen (
+            recept_id INTEGER PRIMARY KEY REFERENCES recepten (id) ON DELETE CASCADE,
+            originele_bestandsnaam TEXT,
+            ruwe_ocr_tekst BLOB
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS recept_bronnen_delete AFTER DELETE ON recepten BEGIN
+            DELETE FROM recept_bronnen WHERE recept_id = old.id;
+        END
+    ''')
+
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(recepten)')}
+    legacy = [column for column in RECIPE_SOURCE_COLUMNS if column in columns]
+    if not legacy:
+        return False
+    count = migrate_recipe_sources(conn, legacy)
+    for column in legacy:
+        conn.execute(f'ALTER TABLE recepten DROP COLUMN {column}')
+    logger.info(f"Moved {', '.join(legacy)} to recept_bronnen: {count} recipes")
+    return True
+
+def migrate_recipe_sources(conn, columns, batch_size=1000):
+    """Migratie: kopieer de koude kolommen gecomprimeerd naar recept_bronnen"""
+    select = ', '.join(column if column in columns else 'NULL' for column in RECIPE_SOURCE_COLUMNS)
+    count = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(f'''
+            SELECT id, {select} FROM recepten WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            return count
+        store_recipe_sources(conn, [(row[0], row[1], row[2]) for row in rows])
+        count += len(rows)
+        last_id = rows[-1][0]
+
+def store_recipe_sources(conn, rows):
+    """Schrijf (recept_id, bestandsnaam, ruwe tekst) weg; None laat de bestaande waarde staan"""
+    conn.executemany('''
+        INSERT INTO recept_bronnen (recept_id, originele_bestandsnaam, ruwe_ocr_tekst)
+        VALUES (?, ?, ?)
+        ON CONFLICT (recept_id) DO UPDATE SET
+            originele_bestandsnaam = COALESCE(excluded.originele_bestandsnaam, originele_bestandsnaam),
+            ruwe_ocr_tekst = COALESCE(excluded.ruwe_ocr_tekst, ruwe_ocr_tekst)
+    ''', [(recipe_id, filename, compress_text(raw_text)) for recipe_id, filename, raw_text in rows])
+
+def get_recipe_source(conn, recipe_id):
+    """Bestandsnaam en ruwe OCR tekst van één recept, of None als het recept niet bestaat"""
+    row = conn.execute('''
+        SELECT r.id, b.originele_bestandsnaam, b.ruwe_ocr_tekst
+        FROM recepten r LEFT JOIN recept_bronnen b ON b.recept_id = r.id
+        WHERE r.id = ?
+    ''', (recipe_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row['id'],
+        "originele_bestandsnaam": row['originele_bestandsnaam'],
+        "ruwe_ocr_tekst": decompress_text(row['ruwe_ocr_tekst']),
+    }
+
+def vacuum_database():
+    """Herschrijf het databasebestand zodat vrijgekomen pagina's worden teruggegeven"""
+    before = os.path.getsize(DATABASE_PATH)
+    conn = open_db_connection()
+    try:
+        conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        conn.close()
+    logger.info(f"Vacuumed database: {before} -> {os.path.getsize(DATABASE_PATH)} bytes")
+
+def insert_recipe_ingredients(conn, recipe_id, ingredienten):
+    """Voeg de ingrediënten van een recept toe aan recept_ingredienten"""
+    rows = []
+    for ingredient in ingredienten:
+        if not isinstance(ingredient, dict) or not ingredient.get('naam'):
+            continue
+        naam = str(ingredient['naam']).strip()
+        hoeveelheid = ingredient.get('hoeveelheid')
+        eenheid = ingredient.get('eenheid')
+        rows.append((
+            recipe_id,
+            naam,
+            normalize_text(naam),
+            str(hoeveelheid) if hoeveelheid not in (None, '') else None,
+            str(eenheid) if eenheid not in (None, '') else None,
+            *normalize_quantity(hoeveelheid, eenheid)
+        ))
+    conn.executemany('''
+        INSERT INTO recept_ingredienten (recept_id, naam, naam_norm, hoeveelheid, eenheid,
+                                         hoeveelheid_norm, eenheid_norm)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    return len(rows)
+
+@app.cli.command('backfill-ingredients')
+def backfill_ingredients_command():
+    """Vul recept_ingredienten opnieuw vanuit de JSON kolom"""
+    init_app()
+    with db_write() as conn:
+        count = backfill_ingredient_table(conn)
+        bump_data_version(conn)
+    print(f"Ingrediënten tabel opnieuw gevuld: {count} ingrediënten")
+
+@timed('recepten_db_query_seconds', query='boodschappenlijst')
+def build_shopping_list(conn, keuze):
+    """Tel de ingrediënten van [(recept_id, factor), ...] op per naam en eenheid, in één query.
+
+    Een recept dat twee keer gekozen is telt twee keer mee. Ingrediënten zonder
+    hoeveelheid ("naar smaak") komen in de lijst met hoeveelheid None; hoeveelheden
+    die niet te parsen zijn ("2 x 100 g") staan ongewijzigd in niet_opgeteld.
+    """
+    rows = conn.execute('''
+        WITH keuze AS (
+            SELECT json_extract(value, '$[0]') AS recept_id, json_extract(value, '$[1]') AS factor
+            FROM json_each(?)
+        )
+        SELECT ri.naam_norm, MIN(ri.naam) AS naam, ri.eenheid_norm,
+               SUM(ri.hoeveelheid_norm * keuze.factor) AS hoeveelheid,
+               COUNT(DISTINCT ri.recept_id) AS recepten,
+               json_group_array(CASE WHEN ri.hoeveelheid_norm IS NULL AND trim(ri.hoeveelheid) != ''
+                   THEN trim(ri.hoeveelheid || ' ' || coalesce(ri.eenheid, '')) END) AS niet_opgeteld
+        FROM keuze
+        JOIN recept_ingredienten ri ON ri.recept_id = keuze.recept_id
+        GROUP BY ri.naam_norm, ri.eenheid_norm
+        ORDER BY ri.naam_norm, ri.eenheid_norm
+    ''', (json.dumps(keuze),)).fetchall()
+    return [{
+        "naam": row['naam'],
+        "hoeveelheid": round(row['hoeveelheid'], 2) if row['hoeveelheid'] is not None else None,
+        "eenheid": row['eenheid_norm'],
+        "recepten": row['recepten'],
+        "niet_opgeteld": [value for value in json.loads(row['niet_opgeteld']) if value]
+    } for row in rows]
+
+def get_distinct_ingredients(conn):
+    """Unieke ingrediënten (één weergavenaam per genormaliseerde naam), via de index"""
+    rows = conn.execute('''
+        SELECT naam_norm, MIN(naam) AS naam
+        FROM recept_ingredienten
+        GROUP BY naam_norm
+        ORDER BY naam_norm
+    ''').fetchall()
+    return [row['naam'] for row in rows]
+
+# Proces-caches die afhangen van de recepten versie (zie data_versies)
+_versioned_caches = {}
+_versioned_caches_lock = threading.Lock()  # alleen voor de dicts, niet tijdens het opbouwen
+_versioned_cache_build_locks = {}  # naam -> lock, zodat een trage build andere caches niet blokkeert
+_versioned_caches_generation = 0  # verhoogd door invalidate_ingredient_cache
+
+def get_versioned_cache(naam, builder):
+    """Geef de gecachte waarde van builder(conn, versie) terug.
+
+    De database wordt hooguit elke INGREDIENT_CACHE_TTL seconden geraakt (één
+    versie lookup); alleen bij een nieuwe versie wordt de waarde opnieuw opgebouwd.
+    """
+    entry = _versioned_caches.get(naam)
+    if entry is not None and time.monotonic() - entry['checked_at'] < INGREDIENT_CACHE_TTL:
+        return entry['value']
+
+    with _versioned_caches_lock:
+        build_lock = _versioned_cache_build_locks.setdefault(naam, threading.Lock())
+
+    with build_lock:
+        entry = _versioned_caches.get(naam)
+        if entry is not None and time.monotonic() - entry['checked_at'] < INGREDIENT_CACHE_TTL:
+            return entry['value']
+
+        generation = _versioned_caches_generation
+        conn = get_db_connection()
+        versie = get_data_version(conn)
+        if entry is None or entry['versie'] != versie:
+            with timed('recepten_db_query_seconds', query=f'cache_build:{naam}'):
+                value = builder(conn, versie)
+        else:
+            value = entry['value']
+
+        with _versioned_caches_lock:
+            # Tijdens het opbouwen geïnvalideerd: de volgende aanvraag controleert de versie opnieuw
+            checked_at = time.monotonic() if generation == _versioned_caches_generation else 0.0
+            _versioned_caches[naam] = {"versie": versie, "value": value, "checked_at": checked_at}
+        return value
+
+def invalidate_ingredient_cache():
+    """Forceer een versiecheck bij de volgende aanvraag (na een insert in dit proces)"""
+    global _versioned_caches_generation
+    with _versioned_caches_lock:
+        _versioned_caches_generation += 1
+        for naam, entry in list(_versioned_caches.items()):
+            _versioned_caches[naam] = dict(entry, checked_at=0.0)
+
+def _build_ingredient_vocabulary(conn, versie):
+    """JSON body + ETag voor /api/ingredienten"""
+    namen = get_distinct_ingredients(conn)
+    ingredienten_sorted = sorted({naam.lower() for naam in namen})
+    body = app.json.dumps({
+        "ingredienten": ingredienten_sorted,
+        "count": len(ingredienten_sorted)
+    }).encode('utf-8')
+    return {"body": body, "etag": f"ingr-{versie}-{hashlib.sha1(body).hexdigest()[:16]}"}
+
+def get_ingredient_vocabulary():
+    """Gecachte JSON body + ETag van alle ingrediënten"""
+    return get_versioned_cache('ingredienten', _build_ingredient_vocabulary)
+
+# Prefix index voor autocomplete: gesorteerde sleutels + bisect.
+# Elk woord in een ingrediëntnaam is een sleutel, zodat "fraiche" ook
+# "crème fraîche" vindt.
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+SUGGEST_PRECOMPUTED_PREFIX = 2  # top resultaten voor korte prefixen vooraf berekend
+
+def _build_suggest_index(conn, versie):
+    """Bouw de prefix index over alle ingrediëntnamen, met gebruiksaantallen"""
+    rows = conn.execute('''
+        SELECT naam_norm, MIN(naam) AS naam, COUNT(DISTINCT recept_id) AS aantal
+        FROM recept_ingredienten
+        GROUP BY naam_norm
+    ''').fetchall()
+
+    names = [row['naam'].lower() for row in rows]
+    counts = [row['aantal'] for row in rows]
+    # Volgorde van ranking: meest gebruikt eerst, dan alfabetisch
+    rank = sorted(range(len(rows)), key=lambda i: (-counts[i], rows[i]['naam_norm']))
+    position = {idx: pos for pos, idx in enumerate(rank)}
+
+    pairs = []
+    for idx, row in enumerate(rows):
+        # Dezelfde woordsplitsing als de zoekopdracht, anders vindt "vierge" geen "olie (extra-vierge)"
+        words = search_terms(row['naam_norm'])
+        for start in range(len(words)):
+            pairs.append((' '.join(words[start:]), position[idx]))
+    pairs.sort()
+
+    # Korte prefixen matchen veel namen; daarvoor de top vooraf berekenen
+    top = {'': rank[:SUGGEST_MAX_LIMIT]}
+    for length in range(1, SUGGEST_PRECOMPUTED_PREFIX + 1):
+        buckets = {}
+        for key, pos in pairs:
+            if len(key) >= length:
+                buckets.setdefault(key[:length], set()).add(pos)
+        for prefix, positions in buckets.items():
+            top[prefix] = [rank[pos] for pos in sorted(positions)[:SUGGEST_MAX_LIMIT]]
+
+    return {
+        "keys": [key for key, _ in pairs],
+        "positions": [pos for _, pos in pairs],
+        "rank": rank,
+        "names": names,
+        "counts": counts,
+        "top": top,
+        "versie": versie
+    }
+
+@timed('recepten_search_seconds', kind='suggest')
+def suggest_ingredients(query, limit=SUGGEST_DEFAULT_LIMIT):
+    """Ingrediënten waarvan een woord met query begint, meest gebruikte eerst"""
+    index = get_versioned_cache('ingredienten_suggest', _build_suggest_index)
+    prefix = ' '.join(search_terms(query)) if query else ''
+
+    if prefix in index['top']:
+        matches = index['top'][prefix][:limit]
+    else:
+        keys = index['keys']
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\uffff', start)
+        positions = sorted(set(index['positions'][start:end]))[:limit]
+        matches = [index['rank'][pos] for pos in positions]
+
+    return [{"naam": index['names'][i], "recepten": index['counts'][i]} for i in matches]
+
+# Inverted index ingrediënt -> recepten, als bitsets (Python ints) over
+# recept posities; positie volgt (timestamp, id), dus hoger = nieuwer
+INGREDIENT_SEARCH_DEFAULT_LIMIT = 50
+
+def _positions_to_bitset(positions, size):
+    """Bitset (int) met een bit per recept positie"""
+    buffer = bytearray(size // 8 + 1)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, 'little')
+
+def _bitset_positions(bits):
+    """Posities van de gezette bits, oplopend"""
+    positions = []
+    for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            low = byte & -byte
+            positions.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return positions
+
+def _build_ingredient_search_index(conn, versie):
+    """Bouw de inverted index over recept_ingredienten"""
+    recepten = conn.execute('SELECT id, titel, timestamp FROM recepten ORDER BY timestamp, id').fetchall()
+    position_of = {recept['id']: pos for pos, recept in enumerate(recepten)}
+
+    ingredient_index = {}
+    names = []
+    postings = []
+    recipe_ingredients = [set() for _ in recepten]
+    for row in conn.execute('SELECT recept_id, naam, naam_norm FROM recept_ingredienten ORDER BY id'):
+        pos = position_of.get(row['recept_id'])
+        if pos is None:
+            continue
+        idx = ingredient_index.get(row['naam_norm'])
+        if idx is None:
+            idx = ingredient_index[row['naam_norm']] = len(names)
+            names.append(row['naam'])
+            postings.append(set())
+        postings[idx].add(pos)
+        recipe_ingredients[pos].add(idx)
+
+    words = {}
+    for naam_norm, idx in ingredient_index.items():
+        for word in set(search_terms(naam_norm)):
+            words.setdefault(word, set()).add(idx)
+
+    return {
+        "recepten": [(recept['id'], recept['titel'], recept['timestamp']) for recept in recepten],
+        "bitsets": [_positions_to_bitset(positions, len(recepten)) for positions in postings],
+        "recipe_ingredients": [frozenset(idxs) for idxs in recipe_ingredients],
+        "names": names,
+        "words": words,
+        "versie": versie
+    }
+
+def _resolve_ingredient_term(index, term):
+    """Ingrediënten waarin alle woorden van de zoekterm voorkomen ('ui' -> 'ui', 'rode ui')"""
+    matched = None
+    for word in search_terms(term):
+        idxs = index['words'].get(word, set())
+        matched = idxs if matched is None else matched & idxs
+    return matched or set()
+
+def _union_bitset(index, idxs):
+    bits = 0
+    for idx in idxs:
+        bits |= index['bitsets'][idx]
+    return bits
+
+@timed('recepten_search_seconds', kind='ingredienten')
+def search_by_ingredients(include=(), exclude=(), any_of=(), limit=INGREDIENT_SEARCH_DEFAULT_LIMIT, min_coverage=0.0):
+    """Recepten met alle include, minstens één any_of en geen exclude ingrediënten.
+
+    Gerangschikt op dekking: het deel van de ingrediënten van het recept dat in
+    include + any_of voorkomt ("wat kan ik koken met wat ik heb"), daarna op
+    aantal gevonden ingrediënten en nieuwste eerst.
+    """
+    index = get_versioned_cache('ingredienten_zoekindex', _build_ingredient_search_index)
+    size = len(index['recepten'])
+
+    have = set()
+    candidates = (1 << size) - 1
+    for term in include:
+        idxs = _resolve_ingredient_term(index, term)
+        have |= idxs
+        candidates &= _union_bitset(index, idxs)
+    if any_of:
+        any_idxs = set()
+        for term in any_of:
+            any_idxs |= _resolve_ingredient_term(index, term)
+        have |= any_idxs
+        candidates &= _union_bitset(index, any_idxs)
+    for term in exclude:
+        candidates &= ~_union_bitset(index, _resolve_ingredient_term(index, term))
+
+    results = []
+    for pos in _bitset_positions(candidates):
+        ingredients = index['recipe_ingredients'][pos]
+        matched = ingredients & have
+        coverage = len(matched) / len(ingredients) if ingredients else 0.0
+        if coverage >= min_coverage:
+            results.append((coverage, len(matched), pos, matched))
+    results.sort(key=lambda r: (-r[0], -r[1], -r[2]))
+
+    recepten = []
+    for coverage, _, pos, matched in results[:limit]:
+        recept_id, titel, timestamp = index['recepten'][pos]
+        ingredients = index['recipe_ingredients'][pos]
+        recepten.append({
+            "id": recept_id,
+            "titel": titel,
+            "timestamp": timestamp,
+            "coverage": round(coverage, 3),
+            "matching_ingredients": sorted(index['names'][idx] for idx in matched),
+            "missing_count": len(ingredients) - len(matched)
+        })
+    return recepten, len(results)
+
+# Fuzzy zoeken: trigram postings over de woorden in titels en ingrediëntnamen,
+# zodat OCR fouten ('bioem' voor 'bloem') toch gevonden worden zonder elke
+# rij met edit distance te vergelijken
+FUZZY_CANDIDATES_PER_TERM = 50
+
+def word_trigrams(word):
+    """Trigrammen van een woord, met opvulling zodat ook korte woorden er hebben"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein afstand, of max_distance + 1 zodra die zeker groter is"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def _build_fuzzy_index(conn, versie):
+    """Bouw de woordenlijst, trigram postings en woord -> recept postings per veld"""
+    recepten = conn.execute('SELECT id, titel, timestamp FROM recepten ORDER BY timestamp, id').fetchall()
+    position_of = {recept['id']: pos for pos, recept in enumerate(recepten)}
+
+    word_index = {}
+    postings = {'titel': {}, 'ingredienten': {}}
+
+    def add(field, text, pos):
+        for word in set(search_terms(text)):
+            idx = word_index.setdefault(word, len(word_index))
+            postings[field].setdefault(idx, set()).add(pos)
+
+    for pos, recept in enumerate(recepten):
+        add('titel', recept['titel'], pos)
+    for row in conn.execute('SELECT DISTINCT recept_id, naam_norm FROM recept_ingredienten'):
+        pos = position_of.get(row['recept_id'])
+        if pos is not None:
+            add('ingredienten', row['naam_norm'], pos)
+
+    words = [None] * len(word_index)
+    trigrams = {}
+    for word, idx in word_index.items():
+        words[idx] = word
+        for trigram in word_trigrams(word):
+            trigrams.setdefault(trigram, []).append(idx)
+
+    return {
+        "recepten": [(recept['id'], recept['titel'], recept['timestamp']) for recept in recepten],
+        "words": words,
+        "trigrams": trigrams,
+        "trigram_counts": [len(word_trigrams(word)) for word in words],
+        "postings": postings,
+        "versie": versie
+    }
+
+def _similar_words(index, term):
+    """Woorden uit de index die op term lijken, als {woord idx: similarity}"""
+    query_trigrams = word_trigrams(term)
+    shared = {}
+    for trigram in query_trigrams:
+        for idx in index['trigrams'].get(trigram, ()):
+            shared[idx] = shared.get(idx, 0) + 1
+
+    # Kandidaten op trigram overlap (Dice), daarna pas edit distance
+    words = index['words']
+    scored = []
+    for idx, count in shared.items():
+        dice = 2 * count / (len(query_trigrams) + index['trigram_counts'][idx])
+        scored.append((dice, idx))
+    scored.sort(reverse=True)
+
+    similar = {}
+    for _, idx in scored[:FUZZY_CANDIDATES_PER_TERM]:
+        word = words[idx]
+        longest = max(len(word), len(term))
+        max_distance = int(longest * (1 - FUZZY_MIN_SIMILARITY))
+        distance = edit_distance(term, word, max_distance)
+        if distance <= max_distance:
+            similar[idx] = 1 - distance / longest
+    return similar
+
+@timed('recepten_search_seconds', kind='fuzzy')
+def fuzzy_search(query, fields=('titel', 'ingredienten'), limit=FUZZY_DEFAULT_LIMIT):
+    """Recepten waarin elk zoekwoord (bij benadering) voorkomt, meest gelijkend eerst"""
+    index = get_versioned_cache('fuzzy_zoekindex', _build_fuzzy_index)
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    scores = None
+    matched_words = {}
+    for term in terms:
+        term_scores = {}
+        for idx, similarity in _similar_words(index, term).items():
+            for field in fields:
+                for pos in index['postings'][field].get(idx, ()):
+                    if similarity > term_scores.get(pos, 0):
+                        term_scores[pos] = similarity
+                    if field == 'ingredienten':
+                        matched_words.setdefault(pos, set()).add(index['words'][idx])
+        # Elk zoekwoord moet in het recept voorkomen
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {pos: scores[pos] + score for pos, score in term_scores.items() if pos in scores}
+        if not scores:
+            return []
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+    results = []
+    for pos, score in ranked:
+        recept_id, titel, timestamp = index['recepten'][pos]
+        results.append({
+            "id": recept_id,
+            "titel": titel,
+            "timestamp": timestamp,
+            "similarity": round(score / len(terms), 3),
+            "matching_ingredients": sorted(matched_words.get(pos, ()))
+        })
+    return results
+
+# Vergelijkbare recepten: per recept de top-k buren op Jaccard gelijkenis van de
+# genormaliseerde ingrediëntnamen, opgeslagen in vergelijkbare_recepten zodat de
+# receptpagina ze met één index lookup ophaalt. Kandidaten moeten minstens één
+# ingrediënt delen dat in hooguit SIMILAR_RECIPES_MAX_INGREDIENT_RECIPES recepten
+# voorkomt; veelgebruikte ingrediënten (bloem, ui) tellen wel mee in de score.
+# Zo blijft de berekening ook bij grote collecties ruwweg lineair.
+SIMILARITY_IGNORED_INGREDIENTS = frozenset({
+    'zout', 'peper', 'zwarte peper', 'zout en peper', 'peper en zout', 'water',
+})
+SIMILARITY_BLOCK_PAIRS = 4 * 1024 * 1024  # (recept, kandidaat) paren per NumPy blok
+
+def init_similar_recipes(conn):
+    """Maak vergelijkbare_recepten aan en vul de tabel eenmalig"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vergelijkbare_recepten'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS vergelijkbare_recepten (
+            recept_id INTEGER NOT NULL REFERENCES recepten (id) ON DELETE CASCADE,
+            buur_id INTEGER NOT NULL REFERENCES recepten (id) ON DELETE CASCADE,
+            score REAL NOT NULL,
+            PRIMARY KEY (recept_id, buur_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_vergelijkbare_recepten_buur
+        ON vergelijkbare_recepten (buur_id)
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS vergelijkbare_recepten_delete AFTER DELETE ON recepten BEGIN
+            DELETE FROM vergelijkbare_recepten WHERE recept_id = old.id OR buur_id = old.id;
+        END
+    ''')
+
+    if not exists:
+        count = rebuild_similar_recipes(conn)
+        logger.info(f"Built similar recipes index: {count} recipes")
+
+def similarity_terms(namen):
+    """Ingrediëntnamen (naam_norm) die meetellen voor de gelijkenis"""
+    return frozenset(namen) - SIMILARITY_IGNORED_INGREDIENTS
+
+def jaccard(gedeeld, size_a, size_b):
+    """Jaccard gelijkenis uit de overlap en de groottes van twee sets"""
+    return gedeeld / (size_a + size_b - gedeeld)
+
+def _rank_neighbours(scored, k):
+    """Top-k (score, buur) paren: hoogste score eerst, bij gelijke score het laagste id"""
+    return heapq.nsmallest(k, scored, key=lambda item: (-item[0], item[1]))
+
+def _load_numpy():
+    """NumPy is optioneel: zonder NumPy valt de herberekening terug op pure Python"""
+    try:
+        return importlib.import_module('numpy')
+    except ImportError:
+        return None
+
+def _top_neighbours_python(sets, k, min_score, max_postings):
+    """Per recept (positie) de top-k (score, positie) paren"""
+    postings = {}
+    for pos, terms in enumerate(sets):
+        for term in terms:
+            postings.setdefault(term, []).append(pos)
+    probes = {term for term, recipes in postings.items() if len(recipes) <= max_postings}
+
+    neighbours = []
+    for pos, terms in enumerate(sets):
+        candidates = set()
+        for term in terms & probes:
+            candidates.update(postings[term])
+        candidates.discard(pos)
+        scored = []
+        for other in candidates:
+            score = jaccard(len(terms & sets[other]), len(terms), len(sets[other]))
+            if score >= min_score:
+                scored.append((score, other))
+        neighbours.append(_rank_neighbours(scored, k))
+    return neighbours
+
+def _top_neighbours_numpy(np, sets, k, min_score, max_postings):
+    """Zelfde uitkomst als _top_neighbours_python, per blok recepten gevectoriseerd.
+
+    De overlap in zeldzame ingrediënten komt uit de postings (tellen met np.unique), de
+    overlap in veelgebruikte ingrediënten uit een popcount over bitmaskers.
+    """
+    n = len(sets)
+    vocabulary = {}
+    recipe_terms = np.fromiter(
+        (vocabulary.setdefault(term, len(vocabulary)) for terms in sets for term in sorted(terms)),
+        dtype=np.int64
+    )
+    sizes = np.array([len(terms) for terms in sets], dtype=np.int64)
+    recipe_ptr = np.concatenate(([0], np.cumsum(sizes)))
+    owners = np.repeat(np.arange(n, dtype=np.int64), sizes)
+
+    frequency = np.bincount(recipe_terms, minlength=len(vocabulary))
+    probe = frequency[recipe_terms] <= max_postings
+
+    # Postings van de zeldzame ingrediënten als CSR arrays
+    order = np.argsort(recipe_terms[probe], kind='stable')
+    posting_recipes = owners[probe][order]
+    posting_len = np.where(frequency <= max_postings, frequency, 0)
+    posting_ptr = np.concatenate(([0], np.cumsum(posting_len)))
+
+    # Veelgebruikte ingrediënten als bitmaskers (64 ingrediënten per woord)
+    common_terms = np.flatnonzero(frequency > max_postings)
+    common_column = np.full(len(vocabulary), -1, dtype=np.int64)
+    common_column[common_terms] = np.arange(len(common_terms))
+    columns = common_column[recipe_terms[~probe]]
+    common = np.zeros((n, max(1, (len(common_terms) + 63) // 64)), dtype=np.uint64)
+    np.bitwise_or.at(common, (owners[~probe], columns // 64),
+                     np.left_shift(np.uint64(1), (columns % 64).astype(np.uint64)))
+    common_count = sizes - np.bincount(owners[probe], minlength=n)
+    if hasattr(np, 'bitwise_count'):
+        popcount = np.bitwise_count
+    else:
+        byte_counts = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+        popcount = lambda words: byte_counts[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1)
+
+    pairs_per_recipe = int((posting_len.astype(np.float64) ** 2).sum() / n) + 1
+    block = max(1, SIMILARITY_BLOCK_PAIRS // pairs_per_recipe)
+    neighbours = []
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        rows = stop - start
+        first, last = recipe_ptr[start], recipe_ptr[stop]
+        block_probe = probe[first:last]
+        terms = recipe_terms[first:last][block_probe]
+        local = owners[first:last][block_probe] - start
+
+        # Alle (recept, kandidaat) paren via de postings van elk zeldzaam ingrediënt
+        lengths = posting_len[terms]
+        offsets = np.repeat(posting_ptr[terms] - np.cumsum(lengths) + lengths, lengths)
+        others = posting_recipes[offsets + np.arange(lengths.sum())]
+        pairs = np.unique(np.repeat(local, lengths) * n + others, return_counts=True)
+        row, column = np.divmod(pairs[0], n)
+        keep = row + start != column
+        row, column, shared = row[keep], column[keep], pairs[1][keep]
+
+        if len(common_terms):
+            # Eerst een bovengrens: paren die ook met maximale overlap afvallen overslaan
+            bound = shared + np.minimum(common_count[row + start], common_count[column])
+            keep = bound / (sizes[row + start] + sizes[column] - bound) >= min_score
+            row, column, shared = row[keep], column[keep], shared[keep]
+            shared = shared + popcount(common[row + start] & common[column]).sum(axis=1, dtype=np.int64)
+        scores = shared / (sizes[row + start] + sizes[column] - shared)
+        keep = scores >= min_score
+        row, column, scores = row[keep], column[keep], scores[keep]
+
+        # Sorteer per recept op score (aflopend) en id; de paren staan al op (recept, id)
+        order = np.lexsort((column, -scores, row))
+        row, column, scores = row[order], column[order], scores[order]
+        starts = np.searchsorted(row, np.arange(rows))
+        ends = np.searchsorted(row, np.arange(rows), side='right')
+        for begin, end in zip(starts, ends):
+            end = min(end, begin + k)
+            neighbours.append(list(zip(scores[begin:end].tolist(), column[begin:end].tolist())))
+    return neighbours
+
+def rebuild_similar_recipes(conn, k=None, min_score=None, max_postings=None):
+    """Bereken vergelijkbare_recepten opnieuw voor alle recepten; geeft het aantal recepten"""
+    k = k or SIMILAR_RECIPES_K
+    min_score = SIMILAR_RECIPES_MIN_SCORE if min_score is None else min_score
+    max_postings = max_postings or SIMILAR_RECIPES_MAX_INGREDIENT_RECIPES
+    names = {}
+    for row in conn.execute('SELECT recept_id, naam_norm FROM recept_ingredienten'):
+        names.setdefault(row['recept_id'], set()).add(row['naam_norm'])
+    ids = sorted(recipe_id for recipe_id, namen in names.items() if similarity_terms(namen))
+    sets = [similarity_terms(names[recipe_id]) for recipe_id in ids]
+
+    np = _load_numpy()
+    with timed('recepten_similarity_seconds', kind='rebuild', engine='numpy' if np else 'python'):
+        if np is not None and sets:
+            neighbours = _top_neighbours_numpy(np, sets, k, min_score, max_postings)
+        else:
+            neighbours = _top_neighbours_python(sets, k, min_score, max_postings)
+
+    conn.execute('DELETE FROM vergelijkbare_recepten')
+    conn.executemany(
+        'INSERT INTO vergelijkbare_recepten (recept_id, buur_id, score) VALUES (?, ?, ?)',
+        ((ids[pos], ids[other], round(score, 4))
+         for pos, top in enumerate(neighbours) for score, other in top)
+    )
+    return len(ids)
+
+@timed('recepten_similarity_seconds', kind='incremental')
+def update_similar_recipes(conn, recipe_id, k=None, min_score=None, max_postings=None):
+    """Werk de buren van één nieuw of gewijzigd recept bij, binnen een lopende transactie.
+
+    Het recept krijgt een nieuwe top-k en komt in de lijst van elk recept waar het
+    nu in de top-k hoort. Recepten waarvoor het juist minder vergelijkbaar werd,
+    houden tot de volgende volledige herberekening een kortere lijst.
+    """
+    k = k or SIMILAR_RECIPES_K
+    min_score = SIMILAR_RECIPES_MIN_SCORE if min_score is None else min_score
+    max_postings = max_postings or SIMILAR_RECIPES_MAX_INGREDIENT_RECIPES
+    conn.execute('DELETE FROM vergelijkbare_recepten WHERE recept_id = ? OR buur_id = ?', (recipe_id, recipe_id))
+    terms = similarity_terms(row['naam_norm'] for row in conn.execute(
+        'SELECT naam_norm FROM recept_ingredienten WHERE recept_id = ?', (recipe_id,)
+    ))
+    if not terms:
+        return 0
+
+    # Alleen de zeldzame ingrediënten leveren kandidaten op; tellen stopt bij de limiet
+    probes = [term for term in sorted(terms) if conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT DISTINCT recept_id FROM recept_ingredienten
+            WHERE naam_norm = ? AND recept_id != ? LIMIT ?
+        )
+    ''', (term, recipe_id, max_postings)).fetchone()[0] < max_postings]
+    if not probes:
+        return 0
+
+    candidates = {}
+    for row in conn.execute('''
+        SELECT recept_id, naam_norm FROM recept_ingredienten
+        WHERE recept_id IN (
+            SELECT recept_id FROM recept_ingredienten
+            WHERE naam_norm IN (SELECT value FROM json_each(?)) AND recept_id != ?
+        )
+    ''', (json.dumps(probes), recipe_id)):
+        candidates.setdefault(row['recept_id'], set()).add(row['naam_norm'])
+
+    scored = []
+    for other, namen in candidates.items():
+        other_terms = similarity_terms(namen)
+        if not other_terms:
+            continue
+        score = jaccard(len(terms & other_terms), len(terms), len(other_terms))
+        if score >= min_score:
+            scored.append((score, other))
+    if not scored:
+        return 0
+    top = _rank_neighbours(scored, k)
+    conn.executemany(
+        'INSERT INTO vergelijkbare_recepten (recept_id, buur_id, score) VALUES (?, ?, ?)',
+        [(recipe_id, other, round(score, 4)) for score, other in top]
+    )
+
+    # Omgekeerde richting: alleen waar het recept de zwakste buur verdringt of er plek is
+    current = {row[0]: (row[1], row[2]) for row in conn.execute('''
+        SELECT recept_id, COUNT(*), MIN(score) FROM vergelijkbare_recepten
+        WHERE recept_id IN (SELECT value FROM json_each(?))
+        GROUP BY recept_id
+    ''', (json.dumps([other for _, other in scored]),))}
+    for score, other in scored:
+        score = round(score, 4)
+        count, weakest = current.get(other, (0, None))
+        if count >= k and score <= weakest:
+            continue
+        conn.execute('INSERT INTO vergelijkbare_recepten (recept_id, buur_id, score) VALUES (?, ?, ?)',
+                     (other, recipe_id, score))
+        if count >= k:
+            conn.execute('''
+                DELETE FROM vergelijkbare_recepten WHERE recept_id = ? AND buur_id = (
+                    SELECT buur_id FROM vergelijkbare_recepten WHERE recept_id = ?
+                    ORDER BY score, buur_id DESC LIMIT 1
+                )
+            ''', (other, other))
+    return len(top)
+
+def get_similar_recipes(conn, recipe_id):
+    """Opgeslagen buren van een recept, meest vergelijkbaar eerst"""
+    return [dict(row) for row in conn.execute('''
+        SELECT r.id, r.titel, r.bestand_hash, v.score
+        FROM vergelijkbare_recepten v JOIN recepten r ON r.id = v.buur_id
+        WHERE v.recept_id = ?
+        ORDER BY v.score DESC, v.buur_id
+    ''', (recipe_id,)).fetchall()]
+
+@app.cli.command('rebuild-similar-recipes')
+def rebuild_similar_recipes_command():
+    """Bereken de vergelijkbare recepten voor alle recepten opnieuw"""
+    init_app()
+    with db_write() as conn:
+        count = rebuild_similar_recipes(conn)
+    engine = 'NumPy' if _load_numpy() else 'Python'
+    print(f"Vergelijkbare recepten opnieuw berekend ({engine}): {count} recepten")
+
+# Cache van gerenderde receptkaarten, op (id, versie) met LRU en een geheugenlimiet
+RECIPE_CARD_COLUMNS = 'id, titel, ingredienten, stappen, benodigdheden, timestamp, versie, bestand_hash'
+
+_recipe_cards = OrderedDict()
+_recipe_cards_lock = threading.Lock()
+_recipe_card_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+_recipe_card_database = None
+
+def _recipe_card_dir():
+    """Map per database, zodat een opnieuw aangemaakte database geen kaarten van de oude ziet"""
+    global _recipe_card_database
+    if _recipe_card_database is None:
+        _recipe_card_database = get_data_version(get_db_connection(), 'database')
+    return os.path.join(RECIPE_CARD_CACHE_DIR, f"db-{_recipe_card_database:x}")
+
+def _recipe_card_path(recept_id, versie):
+    return os.path.join(_recipe_card_dir(), f"{recept_id}-{versie}.html")
+
+def _remove_stale_card_files(recept_id, keep_versie):
+    """Verwijder kaarten van oudere versies van dit recept van schijf"""
+    for path in glob.glob(os.path.join(_recipe_card_dir(), f"{recept_id}-*.html")):
+        if path != _recipe_card_path(recept_id, keep_versie):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def _store_recipe_card_in_memory(recept_id, versie, html):
+    size = len(html.encode('utf-8'))
+    if size > RECIPE_CARD_CACHE_BYTES:
+        return
+    with _recipe_cards_lock:
+        # Een nieuwe versie vervangt de oude
+        previous = _recipe_cards.pop(recept_id, None)
+        if previous is not None:
+            _recipe_card_stats['bytes'] -= previous[2]
+        _recipe_cards[recept_id] = (versie, html, size)
+        _recipe_card_stats['bytes'] += size
+        while (len(_recipe_cards) > RECIPE_CARD_CACHE_ITEMS
+               or _recipe_card_stats['bytes'] > RECIPE_CARD_CACHE_BYTES):
+            _, (_, _, evicted_size) = _recipe_cards.popitem(last=False)
+            _recipe_card_stats['bytes'] -= evicted_size
+            _recipe_card_stats['evictions'] += 1
+
+def get_recipe_card(recept_id, versie):
+    """Gerenderde kaart voor deze versie van het recept, of None"""
+    with _recipe_cards_lock:
+        entry = _recipe_cards.get(recept_id)
+        if entry is not None and entry[0] == versie:
+            _recipe_cards.move_to_end(recept_id)
+            _recipe_card_stats['hits'] += 1
+            return entry[1]
+
+    if RECIPE_CARD_CACHE_DIR:
+        try:
+            with open(_recipe_card_path(recept_id, versie), encoding='utf-8') as f:
+                html = f.read()
+        except OSError:
+            pass
+        else:
+            _store_recipe_card_in_memory(recept_id, versie, html)
+            with _recipe_cards_lock:
+                _recipe_card_stats['disk_hits'] += 1
+            return html
+
+    with _recipe_cards_lock:
+        _recipe_card_stats['misses'] += 1
+    return None
+
+def store_recipe_card(recept_id, versie, html):
+    """Bewaar een gerenderde kaart in het geheugen en (optioneel) op schijf"""
+    if RECIPE_CARD_CACHE_ITEMS <= 0:
+        return
+    _store_recipe_card_in_memory(recept_id, versie, html)
+    if RECIPE_CARD_CACHE_DIR:
+        try:
+            os.makedirs(_recipe_card_dir(), exist_ok=True)
+            path = _recipe_card_path(recept_id, versie)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+            _remove_stale_card_files(recept_id, versie)
+        except OSError as e:
+            logger.warning(f"Could not write recipe card {recept_id} to disk: {str(e)}")
+
+def get_recipe_card_stats():
+    """Hit/miss statistieken van de receptkaart cache"""
+    with _recipe_cards_lock:
+        return dict(_recipe_card_stats, items=len(_recipe_cards))
+
+def render_recipe_card(recept):
+    """Render de receptkaart uit een rij met RECIPE_CARD_COLUMNS"""
+    # Parse JSON data met error handling
+    try:
+        ingredienten = json.loads(recept['ingredienten']) if recept['ingredienten'] else []
+        stappen = json.loads(recept['stappen']) if recept['stappen'] else []
+        benodigdheden = json.loads(recept['benodigdheden']) if recept['benodigdheden'] else []
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error for recipe {recept['id']}: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        ingredienten = []
+        stappen = []
+        benodigdheden = []
+
+    return render_template('recept_kaart.html',
+                         recept=recept,
+                         ingredienten=ingredienten,
+                         stappen=stappen,
+                         benodigdheden=benodigdheden)
+
+# Expliciete initialisatie in plaats van bij het importeren, zodat workers,
+# CLI commando's en tests alleen betalen voor wat ze gebruiken
+_app_initialized = False
+_app_init_lock = threading.Lock()
+
+def init_app(flask_app=None):
+    """Eenmalige initialisatie: Sentry, upload folders en database schema"""
+    global _app_initialized
+    flask_app = flask_app or app
+    if _app_initialized:
+        return flask_app
+
+    with _app_init_lock:
+        if not _app_initialized:
+            start = time.perf_counter()
+            init_sentry()
+
+            # Maak upload folders aan
+            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+            os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+
+            # Initialiseer database bij opstarten
+            with flask_app.app_context():
+                init_db()
+            _app_initialized = True
+            logger.info(f"App initialized in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return flask_app
+
+def create_app():
+    """App factory voor gunicorn en flask: 'App:create_app()'"""
+    init_app(app)
+    # Direct starten, zodat jobs van voor een herstart niet op het eerste request wachten
+    start_upload_workers()
+    return app
+
+@app.before_request
+def ensure_app_initialized():
+    # Vangnet als de server 'App:app' gebruikt in plaats van create_app()
+    init_app()
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    start = g.get('request_start')
+    if start is not None:
+        observe_metric('recepten_http_request_seconds', time.perf_counter() - start,
+                       endpoint=request.endpoint or 'onbekend', method=request.method)
+    return response
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # OCR functies met error handling en monitoring
+def ocr_preprocess_settings(**overrides):
+    """Actieve preprocessing instellingen, eventueel met overrides (voor benchmarks)"""
+    settings = {
+        "max_dimension": OCR_MAX_DIMENSION,
+        "binarize": OCR_BINARIZE,
+        "deskew": OCR_DESKEW,
+    }
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return settings
+
+def ocr_preprocess_signature():
+    """Korte weergave van de preprocessing instellingen, onderdeel van de OCR cache sleutel"""
+    settings = ocr_preprocess_settings()
+    return f"max{settings['max_dimension']}-bin{int(settings['binarize'])}-deskew{int(settings['deskew'])}"
+
+def otsu_threshold(img):
+    """Drempelwaarde volgens Otsu op basis van het histogram van een grijswaarden afbeelding"""
+    histogram = img.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold, best_variance = 127, -1.0
+
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+def estimate_skew_angle(img, max_angle=OCR_DESKEW_MAX_ANGLE, step=0.5):
+    """Schat de scheefstand via het projectieprofiel van de regels op een verkleinde kopie"""
+    small = img.copy()
+    small.thumbnail((800, 800))
+    # Tekst wit op zwart, zodat de opvulling bij het roteren geen 'tekst' toevoegt
+    small = ImageOps.invert(small)
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(round(max_angle / step))
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        rotated = small.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+        # Breedte 1 met BOX geeft per rij de gemiddelde helderheid
+        profile = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(profile) / len(profile)
+        score = sum((value - mean) ** 2 for value in profile)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
 @sentry_sdk.trace
-def preprocess_image_for_ocr(image_path):
-    """Preprocess image voor betere OCR resultaten"""
+def preprocess_image_for_ocr(image_path, **overrides):
+    """Preprocess image voor betere OCR resultaten: oriëntatie, verkleinen, optioneel binariseren/rechtzetten"""
     try:
         with sentry_sdk.start_span(op="image.process", description="Preprocess image for OCR"):
+            settings = ocr_preprocess_settings(**overrides)
+            max_dimension = settings['max_dimension']
+            start = time.perf_counter()
             img = Image.open(image_path)
+            original_size = img.size
+            original_format = img.format
             
-            # Log image info
-            sentry_sdk.set_context("image_info", {
-                "format": img.format,
-                "size": img.size,
-                "mode": img.mode
-            })
+            # JPEG direct op een lagere resolutie (en in grijswaarden) decoderen
+            if img.format == 'JPEG' and max_dimension and max(img.size) > max_dimension:
+                scale = max_dimension / max(img.size)
+                img.draft('L', (int(img.width * scale), int(img.height * scale)))
             
+            # Telefoonfoto's staan vaak gedraaid; EXIF oriëntatie toepassen
+            img = ImageOps.exif_transpose(img)
             img = img.convert('L')  # Convert to grayscale
             
-            # Optioneel: verbeter contrast
-            # from PIL import ImageEnhance
-            # enhancer = ImageEnhance.Contrast(img)
-            # img = enhancer.enhance(1.5)
+            if max_dimension and max(img.size) > max_dimension:
+                img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            
+            skew_angle = 0.0
+            if settings['deskew']:
+                skew_angle = estimate_skew_angle(img)
+                if skew_angle:
+                    img = img.rotate(skew_angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+            
+            if settings['binarize']:
+                threshold = otsu_threshold(img)
+                img = img.point(lambda value: 255 if value > threshold else 0)
+            
+            duration_ms = (time.perf_counter() - start) * 1000
+            observe_metric('recepten_ocr_seconds', duration_ms / 1000, stage='preprocess')
+            
+            # Log image info
+            sentry_sdk.set_context("image_info", {
+                "format": original_format,
+                "size": original_size,
+                "processed_size": img.size,
+                "skew_angle": skew_angle,
+                "duration_ms": round(duration_ms)
+            })
+            logger.info(
+                f"Preprocessed image {original_size} -> {img.size} "
+                f"(skew={skew_angle}, binarize={settings['binarize']}) in {duration_ms:.0f}ms"
+            )
             
             return img
     except Exception as e:
@@ -160,48 +2035,129 @@ def preprocess_image_for_ocr(image_path):
         sentry_sdk.capture_exception(e)
         return None
 
-@sentry_sdk.trace
-def extract_text_from_image(image_path):
-    """Extract text uit afbeelding met Tesseract OCR"""
+@contextmanager
+def ocr_input_file(processed_img):
+    """Schrijf de voorbewerkte afbeelding één keer weg, zodat elke OCR pass hetzelfde bestand leest"""
+    fd, path = tempfile.mkstemp(prefix='ocr_', suffix='.png')
+    os.close(fd)
     try:
-        with sentry_sdk.start_span(op="ocr.extract", description="Extract text with Tesseract"):
-            processed_img = preprocess_image_for_ocr(image_path)
-            if processed_img is None:
-                return None
-            
-            # Configureer Tesseract pad voor Windows indien nodig
-            # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-            
-            # Probeer verschillende talen
-            languages = ['nld', 'eng']  # Nederlands en Engels
-            best_text = ""
-            best_confidence = 0
-            
+        # Lage compressie: het bestand leeft maar kort
+        processed_img.save(path, format='PNG', compress_level=1)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def build_text_from_ocr_data(data):
+    """Bouw de tekst op uit de woorden van image_to_data (zelfde indeling als image_to_string)"""
+    lines = []
+    current_key = None
+    current_words = []
+    previous_paragraph = None
+
+    for i, word in enumerate(data['text']):
+        if not word or not word.strip():
+            continue
+        paragraph = (data['page_num'][i], data['block_num'][i], data['par_num'][i])
+        key = paragraph + (data['line_num'][i],)
+        if key != current_key:
+            if current_words:
+                lines.append(' '.join(current_words))
+            # Lege regel tussen alinea's, net als Tesseract zelf
+            if previous_paragraph is not None and paragraph != previous_paragraph:
+                lines.append('')
+            current_key = key
+            current_words = []
+            previous_paragraph = paragraph
+        current_words.append(word.strip())
+
+    if current_words:
+        lines.append(' '.join(current_words))
+    return '\n'.join(lines)
+
+def ocr_language(ocr_input, lang):
+    """Eén Tesseract herkenning voor een taal (afbeelding of pad); geeft tekst, confidence en duur terug"""
+    start = time.perf_counter()
+    data = pytesseract.image_to_data(ocr_input, lang=lang, output_type=pytesseract.Output.DICT)
+
+    # Calculate average confidence
+    confidences = [float(conf) for conf in data['conf'] if float(conf) > 0]
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+    text = build_text_from_ocr_data(data)
+    duration = time.perf_counter() - start
+    observe_metric('recepten_ocr_seconds', duration, stage='recognize', language=lang)
+
+    return {
+        "language": lang,
+        "text": text,
+        "confidence": avg_confidence,
+        "words": len(confidences),
+        "duration_ms": duration * 1000
+    }
+
+def run_ocr_passes(processed_img):
+    """Voer alle OCR passes uit op dezelfde voorbewerkte afbeelding; geeft de resultaten per taal"""
+    # Eén herkenning per taal (of één gecombineerde pass), tekst uit dezelfde data
+    if OCR_MODE == 'combined':
+        languages = ['+'.join(OCR_LANGUAGES)]
+    else:
+        languages = OCR_LANGUAGES
+    
+    results = []
+    with ocr_input_file(processed_img) as input_path:
+        if OCR_MODE == 'parallel' and len(languages) > 1:
+            # Tesseract draait als subprocess, dus threads lopen echt parallel
+            with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+                futures = {executor.submit(ocr_language, input_path, lang): lang for lang in languages}
+                for future, lang in futures.items():
+                    try:
+                        results.append(future.result())
+                    except Exception as lang_error:
+                        logger.warning(f"OCR failed for language {lang}: {str(lang_error)}")
+        else:
             for lang in languages:
                 try:
-                    # Get text with confidence scores
-                    data = pytesseract.image_to_data(processed_img, lang=lang, output_type=pytesseract.Output.DICT)
-                    
-                    # Calculate average confidence
-                    confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-                    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-                    
-                    # Get text
-                    text = pytesseract.image_to_string(processed_img, lang=lang)
-                    
-                    if avg_confidence > best_confidence:
-                        best_text = text
-                        best_confidence = avg_confidence
-                    
-                    logger.info(f"OCR with {lang}: confidence={avg_confidence:.2f}")
-                    
+                    results.append(ocr_language(input_path, lang))
                 except Exception as lang_error:
                     logger.warning(f"OCR failed for language {lang}: {str(lang_error)}")
+    return results
+
+@sentry_sdk.trace
+def extract_text_from_image(image_path):
+    """Extract text uit afbeelding met Tesseract OCR"""
+    try:
+        with sentry_sdk.start_span(op="ocr.extract", description="Extract text with Tesseract"):
+            processed_img = preprocess_image_for_ocr(image_path)
+            if processed_img is None:
+                return None
+            
+            # Configureer Tesseract pad voor Windows indien nodig
+            # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+            
+            results = run_ocr_passes(processed_img)
+            
+            for result in results:
+                logger.info(
+                    f"OCR with {result['language']}: confidence={result['confidence']:.2f}, "
+                    f"words={result['words']}, time={result['duration_ms']:.0f}ms"
+                )
+            
+            best = max(results, key=lambda r: r['confidence'], default=None)
+            best_text = best['text'] if best else ""
             
             sentry_sdk.set_context("ocr_result", {
                 "text_length": len(best_text),
-                "confidence": best_confidence,
-                "language": "multi"
+                "confidence": best['confidence'] if best else 0,
+                "language": best['language'] if best else None,
+                "mode": OCR_MODE,
+                "languages": {
+                    r['language']: {
+                        "confidence": round(r['confidence'], 2),
+                        "duration_ms": round(r['duration_ms'])
+                    } for r in results
+                }
             })
             
             if not best_text.strip():
@@ -210,159 +2166,1783 @@ def extract_text_from_image(image_path):
             return best_text
             
     except Exception as e:
-        logger.error(f"OCR extraction error: {str(e)}")
+        logger.error(f"OCR extraction error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return None
+
+# Gemini client laag: één model per proces, begrensde concurrency,
+# timeouts en exponential backoff met jitter
+GEMINI_GENERATION_CONFIG = {
+    "temperature": 0.2,  # Lagere temperatuur voor consistentere output
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+# De prompt wordt eenmalig opgebouwd; per aanroep wordt alleen de OCR tekst ingevoegd
+GEMINI_PROMPT_PREFIX = """
+            Ik heb tekst geëxtraheerd uit een afbeelding van een recept. Analyseer deze tekst en 
+            extraheer de informatie in een gestructureerd JSON formaat.
+
+            Geef het resultaat ALLEEN als JSON in dit exacte formaat:
+            {
+                "titel": "Naam van het recept",
+                "ingredienten": [
+                    {"hoeveelheid": "2", "eenheid": "stuks", "naam": "eieren"},
+                    {"hoeveelheid": "500", "eenheid": "gram", "naam": "bloem"}
+                ],
+                "stappen": [
+                    "Stap 1: beschrijving",
+                    "Stap 2: beschrijving"
+                ],
+                "benodigdheden": [
+                    "Mengkom",
+                    "Garde"
+                ]
+            }
+
+            Als je bepaalde informatie niet kunt vinden, gebruik dan lege arrays.
+            Zorg ervoor dat de JSON valide is.
+
+            Hier is de ruwe OCR-tekst:
+            ```
+            """
+
+GEMINI_PROMPT_SUFFIX = """
+            ```
+
+            Geef ALLEEN de JSON output, zonder extra tekst of uitleg.
+            """
+
+_gemini_lock = threading.Lock()
+_gemini_client = {"pid": None, "model": None, "executor": None}
+_gemini_metrics_lock = threading.Lock()
+_gemini_metrics = {
+    "calls": 0,
+    "successes": 0,
+    "failures": 0,
+    "retries": 0,
+    "timeouts": 0,
+    "json_errors": 0,
+    "in_flight": 0,
+    "latency_ms_total": 0.0,
+    "latency_ms_max": 0.0,
+    "prompt_tokens": 0,
+    "output_tokens": 0,
+}
+
+def _record_gemini_metric(**increments):
+    with _gemini_metrics_lock:
+        for name, value in increments.items():
+            _gemini_metrics[name] += value
+
+def get_gemini_metrics():
+    """Latency, token en retry statistieken van de Gemini aanroepen in dit proces"""
+    with _gemini_metrics_lock:
+        metrics = dict(_gemini_metrics)
+    metrics['latency_ms_avg'] = round(metrics['latency_ms_total'] / metrics['calls'], 1) if metrics['calls'] else 0.0
+    metrics['latency_ms_total'] = round(metrics['latency_ms_total'], 1)
+    metrics['latency_ms_max'] = round(metrics['latency_ms_max'], 1)
+    return metrics
+
+def get_gemini_client():
+    """Geef (model, executor) voor dit proces; wordt bij het eerste gebruik aangemaakt.
+
+    De executor begrenst het aantal gelijktijdige API aanroepen tot
+    GEMINI_MAX_CONCURRENCY en maakt een timeout per aanroep mogelijk.
+    """
+    client = _gemini_client
+    if client['pid'] == os.getpid():
+        return client['model'], client['executor']
+
+    with _gemini_lock:
+        if _gemini_client['pid'] != os.getpid():
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError("Google API key not configured")
+
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(
+                GEMINI_MODEL,
+                generation_config=GEMINI_GENERATION_CONFIG,
+                safety_settings=GEMINI_SAFETY_SETTINGS
+            )
+            executor = ThreadPoolExecutor(
+                max_workers=GEMINI_MAX_CONCURRENCY,
+                thread_name_prefix='gemini'
+            )
+            _gemini_client.update(pid=os.getpid(), model=model, executor=executor)
+            logger.info(f"Gemini client initialized ({GEMINI_MODEL}, concurrency={GEMINI_MAX_CONCURRENCY})")
+    return _gemini_client['model'], _gemini_client['executor']
+
+def _call_gemini(model, prompt):
+    """Eén API aanroep; geeft (tekst, usage_metadata) terug"""
+    response = model.generate_content(prompt)
+
+    if hasattr(response, 'text'):
+        refined_text = response.text
+    elif hasattr(response, 'parts') and response.parts:
+        refined_text = "".join([part.text for part in response.parts if hasattr(part, 'text')])
+    else:
+        raise ValueError("No text in Gemini response")
+    return refined_text, getattr(response, 'usage_metadata', None)
+
+def gemini_backoff_delay(attempt):
+    """Exponential backoff met 'full jitter' voor poging attempt (0-based)"""
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt)))
+
+def parse_gemini_json(refined_text):
+    """Haal de recept JSON uit het Gemini antwoord (ook als die in ```json staat)"""
+    json_text = refined_text.strip()
+    if json_text.startswith("```json"):
+        json_text = json_text[7:]
+    if json_text.startswith("```"):
+        json_text = json_text[3:]
+    if json_text.endswith("```"):
+        json_text = json_text[:-3]
+    
+    recipe_data = json.loads(json_text.strip())
+    
+    # Valideer de structuur
+    required_fields = ['titel', 'ingredienten', 'stappen', 'benodigdheden']
+    for field in required_fields:
+        if field not in recipe_data:
+            recipe_data[field] = [] if field != 'titel' else 'Onbekend Recept'
+    return recipe_data
+
+@sentry_sdk.trace
+def refine_text_with_gemini(raw_text):
+    """Verfijn ruwe OCR tekst met Google Gemini AI"""
+    clean_raw_text = raw_text.strip()
+    if not clean_raw_text:
+        return None
+
+    try:
+        with sentry_sdk.start_span(op="ai.process", description="Process with Gemini AI"):
+            model, executor = get_gemini_client()
+            prompt = GEMINI_PROMPT_PREFIX + clean_raw_text + GEMINI_PROMPT_SUFFIX
+            
+            # Maak de API call met retry logic
+            for attempt in range(GEMINI_MAX_RETRIES):
+                if attempt > 0:
+                    _record_gemini_metric(retries=1)
+                    time.sleep(gemini_backoff_delay(attempt - 1))
+                
+                start = time.perf_counter()
+                outcome = 'error'
+                _record_gemini_metric(calls=1, in_flight=1)
+                try:
+                    future = executor.submit(_call_gemini, model, prompt)
+                    refined_text, usage = future.result(timeout=GEMINI_TIMEOUT)
+                    
+                    if usage is not None:
+                        _record_gemini_metric(
+                            prompt_tokens=getattr(usage, 'prompt_token_count', 0) or 0,
+                            output_tokens=getattr(usage, 'candidates_token_count', 0) or 0
+                        )
+                    
+                    # Parse en valideer JSON
+                    outcome = 'json_error'
+                    recipe_data = parse_gemini_json(refined_text)
+                    outcome = 'success'
+                    _record_gemini_metric(successes=1)
+                    
+                    # Log success
+                    sentry_sdk.set_context("gemini_result", {
+                        "success": True,
+                        "attempt": attempt + 1,
+                        "recipe_title": recipe_data.get('titel', 'Unknown')
+                    })
+                    
+                    return recipe_data
+                    
+                except FutureTimeoutError as timeout_error:
+                    outcome = 'timeout'
+                    _record_gemini_metric(timeouts=1)
+                    logger.warning(f"Gemini API timeout on attempt {attempt + 1} after {GEMINI_TIMEOUT}s")
+                    if attempt == GEMINI_MAX_RETRIES - 1 or not future.done():
+                        sentry_sdk.capture_exception(timeout_error)
+                    if not future.done():
+                        # google-generativeai 0.3 kent geen request timeout: de aanroep loopt door en
+                        # houdt zijn plek bezet. Niet opnieuw proberen, anders vult een trage API
+                        # de executor met hangende aanroepen en wachten alle andere jobs.
+                        break
+                except json.JSONDecodeError as json_error:
+                    _record_gemini_metric(json_errors=1)
+                    logger.warning(f"JSON parsing error on attempt {attempt + 1}: {str(json_error)}")
+                    if attempt == GEMINI_MAX_RETRIES - 1:
+                        sentry_sdk.capture_exception(json_error)
+                except Exception as api_error:
+                    logger.warning(f"Gemini API error on attempt {attempt + 1}: {str(api_error)}")
+                    if attempt == GEMINI_MAX_RETRIES - 1:
+                        sentry_sdk.capture_exception(api_error)
+                finally:
+                    latency_ms = (time.perf_counter() - start) * 1000
+                    observe_metric('recepten_gemini_seconds', latency_ms / 1000, outcome=outcome)
+                    with _gemini_metrics_lock:
+                        _gemini_metrics['in_flight'] -= 1
+                        _gemini_metrics['latency_ms_total'] += latency_ms
+                        _gemini_metrics['latency_ms_max'] = max(_gemini_metrics['latency_ms_max'], latency_ms)
+            
+            _record_gemini_metric(failures=1)
+                    
+    except Exception as e:
+        logger.error(f"Gemini refinement error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return None
+
+# Content-addressed opslag en cache van OCR/AI resultaten
+def file_sha256(path):
+    """SHA-256 van de bytes van een bestand"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def archive_path_for(file_hash, filename):
+    """Pad in het archief voor een bestand met deze hash (archief/ab/abcdef….jpg)"""
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(ARCHIVE_FOLDER, file_hash[:2], f"{file_hash}{extension}")
+
+def archive_file(filepath, file_hash, filename, move=True):
+    """Plaats een bestand in het content-addressed archief; dubbele bytes worden niet opnieuw opgeslagen"""
+    target = archive_path_for(file_hash, filename)
+    if os.path.abspath(filepath) == os.path.abspath(target):
+        return target
+    if os.path.exists(target):
+        if move and os.path.exists(filepath):
+            os.remove(filepath)
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if move:
+        shutil.move(filepath, target)
+    else:
+        shutil.copy2(filepath, target)
+    return target
+
+# Afgeleide afbeeldingen: verkleinde versies van de gearchiveerde foto's, naast
+# het origineel opgeslagen als archief/ab/<hash>_<px>.<ext>. Ontbrekende versies
+# maakt een achtergrond thread, nooit de request zelf.
+THUMBNAIL_EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg'}
+
+_thumbnail_lock = threading.Lock()
+_thumbnail_state = {"pid": None, "queue": None, "pending": set(), "failed": set()}
+_thumbnail_format = None
+
+def thumbnail_format():
+    """THUMBNAIL_FORMAT, of 'jpeg' als deze Pillow geen WebP kan schrijven"""
+    global _thumbnail_format
+    if _thumbnail_format is None:
+        fmt = THUMBNAIL_FORMAT if THUMBNAIL_FORMAT in THUMBNAIL_EXTENSIONS else 'jpeg'
+        if fmt == 'webp' and not importlib.import_module('PIL.features').check('webp'):
+            logger.warning("Pillow has no WebP support, thumbnails fall back to JPEG")
+            fmt = 'jpeg'
+        _thumbnail_format = fmt
+    return _thumbnail_format
+
+def thumbnail_path_for(file_hash, pixels):
+    """Pad van de afgeleide afbeelding met langste zijde pixels"""
+    extension = THUMBNAIL_EXTENSIONS[thumbnail_format()]
+    return os.path.join(ARCHIVE_FOLDER, file_hash[:2], f"{file_hash}_{pixels}{extension}")
+
+def find_archived_original(file_hash):
+    """Het origineel met deze hash in het archief (de extensie staat niet in de database), of None"""
+    matches = glob.glob(os.path.join(ARCHIVE_FOLDER, file_hash[:2], f"{file_hash}.*"))
+    return matches[0] if matches else None
+
+def generate_thumbnails(source_path, file_hash):
+    """Maak de ontbrekende afgeleide afbeeldingen; geeft het aantal nieuwe bestanden"""
+    fmt = thumbnail_format()
+    missing = [pixels for pixels in sorted(set(THUMBNAIL_SIZES.values()), reverse=True)
+               if not os.path.exists(thumbnail_path_for(file_hash, pixels))]
+    if not missing:
+        return 0
+
+    start = time.perf_counter()
+    with Image.open(source_path) as img:
+        # JPEG: direct verkleind decoderen, veel sneller voor grote telefoonfoto's
+        img.draft('RGB', (missing[0], missing[0]))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if fmt == 'webp' and img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        # Van groot naar klein, zodat elke stap de vorige verkleint
+        for pixels in missing:
+            img.thumbnail((pixels, pixels), Image.LANCZOS)
+            target = thumbnail_path_for(file_hash, pixels)
+            temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+            img.save(temp_path, format=fmt.upper(), quality=THUMBNAIL_QUALITY)
+            os.replace(temp_path, target)
+    logger.info(f"Created {len(missing)} thumbnails for {file_hash[:12]} in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return len(missing)
+
+def create_thumbnails(source_path, file_hash):
+    """generate_thumbnails na het archiveren; een fout hier laat de upload niet mislukken"""
+    try:
+        generate_thumbnails(source_path, file_hash)
+    except Exception as e:
+        logger.warning(f"Thumbnail generation failed for {file_hash[:12]}: {str(e)}")
+        sentry_sdk.capture_exception(e)
+
+def thumbnail_worker_loop(work_queue):
+    """Achtergrond thread die ontbrekende thumbnails maakt"""
+    while True:
+        file_hash = work_queue.get()
+        try:
+            source_path = find_archived_original(file_hash)
+            if source_path is not None:
+                generate_thumbnails(source_path, file_hash)
+        except Exception as e:
+            logger.warning(f"Thumbnail generation failed for {file_hash[:12]}: {str(e)}")
+            sentry_sdk.capture_exception(e)
+            with _thumbnail_lock:
+                _thumbnail_state['failed'].add(file_hash)  # niet bij elke request opnieuw proberen
+        finally:
+            with _thumbnail_lock:
+                _thumbnail_state['pending'].discard(file_hash)
+
+def request_thumbnails(file_hash):
+    """Zet een hash in de achtergrond wachtrij (eenmalig tegelijk, ook na een gunicorn fork)"""
+    with _thumbnail_lock:
+        state = _thumbnail_state
+        if state['pid'] != os.getpid():
+            state.update(pid=os.getpid(), queue=queue.Queue(), pending=set(), failed=set())
+            threading.Thread(
+                target=thumbnail_worker_loop, args=(state['queue'],),
+                name='thumbnail-worker', daemon=True
+            ).start()
+        if file_hash in state['pending'] or file_hash in state['failed']:
+            return
+        state['pending'].add(file_hash)
+    state['queue'].put(file_hash)
+
+def find_recipe_by_hash(conn, file_hash):
+    """Id van een bestaand recept uit hetzelfde bestand, of None"""
+    row = conn.execute(
+        'SELECT id FROM recepten WHERE bestand_hash = ? ORDER BY id LIMIT 1', (file_hash,)
+    ).fetchone()
+    return row['id'] if row else None
+
+# Uploads voor deze endpoints gaan tijdens het parsen direct naar het archief
+STREAMING_UPLOAD_ENDPOINTS = {'upload', 'api_upload_batch'}
+# Deze endpoints mogen grotere bodies ontvangen dan MAX_FILE_SIZE: endpoint -> max bytes per request
+LARGE_BODY_ENDPOINTS = {
+    'api_import': RECIPE_IMPORT_MAX_SIZE,
+    'api_upload_batch': MAX_BATCH_UPLOAD_SIZE,
+}
+UPLOAD_TEMP_FOLDER = os.path.join(ARCHIVE_FOLDER, '.tmp')
+
+# Eerste bytes van de toegestane afbeeldingsformaten
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+]
+
+def detect_image_type(head):
+    """Afbeeldingsformaat op basis van de eerste bytes, of None"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_type
+    return None
+
+class StreamingUpload:
+    """Schrijft een geüpload bestand direct naar een tijdelijk bestand naast het archief.
+
+    Grootte en SHA-256 worden tijdens het schrijven bijgehouden, het formaat wordt
+    aan de eerste bytes herkend en commit() plaatst het bestand met een atomaire
+    rename in het archief. Niet gecommitte bestanden verdwijnen bij close().
+    """
+    HEAD_SIZE = 12
+
+    def __init__(self, max_size=MAX_FILE_SIZE):
+        os.makedirs(UPLOAD_TEMP_FOLDER, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='upload_', suffix='.part', dir=UPLOAD_TEMP_FOLDER)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self.max_size = max_size
+        self.size = 0
+        self.image_type = None
+        self.rejected = False
+        self.committed = False
+
+    def write(self, data):
+        if self.rejected:
+            return len(data)
+
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.close()
+            raise RequestEntityTooLarge()
+
+        if len(self._head) < self.HEAD_SIZE:
+            self._head += data[:self.HEAD_SIZE - len(self._head)]
+            if len(self._head) >= self.HEAD_SIZE:
+                self.image_type = detect_image_type(self._head)
+                if self.image_type is None:
+                    # Geen afbeelding: de rest van de body niet meer opslaan
+                    self.rejected = True
+                    self._file.truncate(0)
+                    return len(data)
+
+        self._digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    @property
+    def is_image(self):
+        if self.image_type is None and not self.rejected:
+            # Bestanden korter dan HEAD_SIZE
+            self.image_type = detect_image_type(self._head)
+        return self.image_type is not None
+
+    def commit(self, filename):
+        """Plaats het bestand in het archief (atomair); bestaat dezelfde inhoud al, dan wordt die gebruikt"""
+        target = archive_path_for(self.sha256, filename)
+        self._file.close()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(self.path)
+        else:
+            os.replace(self.path, target)
+        self.committed = True
+        return target
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # seek, read, tell, ... voor FileStorage
+        return getattr(self._file, name)
+
+class RecipeRequest(Request):
+    """Request die uploads voor STREAMING_UPLOAD_ENDPOINTS als StreamingUpload ontvangt"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in STREAMING_UPLOAD_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        upload = StreamingUpload()
+        # Ook bij een afgebroken upload (dus zonder FileStorage) opruimen
+        self.__dict__.setdefault('_streaming_uploads', []).append(upload)
+        return upload
+
+    @property
+    def max_content_length(self):
+        # Een import van de hele collectie of een batch foto's is groter dan één foto
+        if self.endpoint in LARGE_BODY_ENDPOINTS:
+            return LARGE_BODY_ENDPOINTS[self.endpoint]
+        return super().max_content_length
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for upload in self.__dict__.get('_streaming_uploads', ()):
+                upload.close()
+
+app.request_class = RecipeRequest
+
+def remove_upload_file(filepath, file_hash=None):
+    """Ruim een upload op; een archiefbestand blijft staan zolang een recept dezelfde bytes heeft"""
+    if not filepath or not os.path.exists(filepath):
+        return
+    if file_hash and find_recipe_by_hash(get_db_connection(), file_hash) is not None:
+        return
+    os.remove(filepath)
+
+def upload_job_path(job):
+    """Pad van het bestand van een upload job: nog in UPLOAD_FOLDER of al in het archief"""
+    filepath = os.path.join(UPLOAD_FOLDER, job['bestandsnaam'])
+    if not os.path.exists(filepath) and job['bestand_hash']:
+        return archive_path_for(job['bestand_hash'], job['bestandsnaam'])
+    return filepath
+
+def current_extraction_versions():
+    """(ocr_versie, ai_versie): alles wat de OCR uitkomst en de Gemini uitkomst beïnvloedt"""
+    ocr_versie = f"{OCR_VERSION}|{OCR_MODE}|{','.join(OCR_LANGUAGES)}|{ocr_preprocess_signature()}"
+    ai_versie = f"{GEMINI_MODEL}|{PROMPT_VERSION}"
+    return ocr_versie, ai_versie
+
+def ocr_cache_key(file_hash):
+    """Cache sleutel voor OCR: bestand + alles wat de OCR uitkomst beïnvloedt"""
+    config = current_extraction_versions()[0]
+    return 'ocr:' + hashlib.sha256(f"{file_hash}|{config}".encode('utf-8')).hexdigest()
+
+def ai_cache_key(raw_text):
+    """Cache sleutel voor Gemini: OCR tekst + model + prompt versie"""
+    config = current_extraction_versions()[1]
+    return 'ai:' + hashlib.sha256(f"{config}|{raw_text.strip()}".encode('utf-8')).hexdigest()
+
+def get_cached_extraction(sleutel):
+    """Gecachte OCR tekst of recept JSON, of None"""
+    row = get_db_connection().execute(
+        'SELECT waarde FROM extractie_cache WHERE sleutel = ?', (sleutel,)
+    ).fetchone()
+    return row['waarde'] if row else None
+
+def store_cached_extraction(sleutel, soort, waarde):
+    with db_write() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO extractie_cache (sleutel, soort, waarde) VALUES (?, ?, ?)
+        ''', (sleutel, soort, waarde))
+
+def extract_text_cached(image_path, file_hash):
+    """extract_text_from_image, maar hergebruik het resultaat voor identieke bestanden"""
+    sleutel = ocr_cache_key(file_hash)
+    raw_text = get_cached_extraction(sleutel)
+    if raw_text is not None:
+        logger.info(f"OCR cache hit for {file_hash[:12]}")
+        return raw_text
+    raw_text = extract_text_from_image(image_path)
+    if raw_text:
+        store_cached_extraction(sleutel, 'ocr', raw_text)
+    return raw_text
+
+def refine_text_cached(raw_text):
+    """refine_text_with_gemini, maar hergebruik het resultaat voor identieke OCR tekst"""
+    sleutel = ai_cache_key(raw_text)
+    cached = get_cached_extraction(sleutel)
+    if cached is not None:
+        logger.info("Gemini cache hit")
+        return json.loads(cached)
+    recipe_data = refine_text_with_gemini(raw_text)
+    if recipe_data:
+        store_cached_extraction(sleutel, 'ai', json.dumps(recipe_data, ensure_ascii=False))
+    return recipe_data
+
+# Upload wachtrij (SQLite) met worker threads
+UPLOAD_JOB_FIELDS = {'status', 'stage', 'ruwe_ocr_tekst', 'recept_json', 'recept_id', 'error', 'lease_until'}
+
+_upload_wakeup = threading.Event()
+_upload_workers_lock = threading.Lock()
+_upload_workers_pid = None
+
+def enqueue_upload_job(filename, content_type=None, soort='upload', file_hash=None):
+    """Zet een opgeslagen upload (of een import batch) in de wachtrij en geef het job id terug.
+
+    Een upload met dezelfde bytes als een job die nog wacht of loopt krijgt die job,
+    zodat OCR en Gemini maar één keer draaien.
+    """
+    job_id = uuid.uuid4().hex
+    with db_write() as conn:
+        if soort == 'upload' and file_hash:
+            existing = conn.execute('''
+                SELECT id FROM upload_jobs
+                WHERE bestand_hash = ? AND soort = 'upload' AND status IN ('queued', 'running')
+                ORDER BY created_at LIMIT 1
+            ''', (file_hash,)).fetchone()
+            if existing is not None:
+                return existing['id']
+        conn.execute('''
+            INSERT INTO upload_jobs (id, soort, bestandsnaam, content_type, bestand_hash)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (job_id, soort, filename, content_type, file_hash))
+    _upload_wakeup.set()
+    return job_id
+
+def get_upload_job(job_id):
+    """Haal een upload job op als dict, of None"""
+    conn = get_db_connection()
+    job = conn.execute('SELECT * FROM upload_jobs WHERE id = ?', (job_id,)).fetchone()
+    return dict(job) if job else None
+
+def update_upload_job(job_id, **fields):
+    """Werk velden van een upload job bij"""
+    unknown = set(fields) - UPLOAD_JOB_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown upload job fields: {', '.join(sorted(unknown))}")
+    assignments = ', '.join(f"{field} = ?" for field in fields)
+    with db_write() as conn:
+        conn.execute(
+            f'UPDATE upload_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+            (*fields.values(), job_id)
+        )
+
+def claim_upload_job(reprocess=False):
+    """Claim de oudste wachtende job (of een job waarvan de lease verlopen is).
+
+    Herverwerking heeft een eigen worker (reprocess=True), zodat een lange
+    herverwerking nooit een upload worker bezet houdt.
+    """
+    now = time.time()
+    soort_filter = "soort = 'reprocess'" if reprocess else "soort != 'reprocess'"
+    with db_write() as conn:
+        job = conn.execute(f'''
+            SELECT * FROM upload_jobs
+            WHERE (status = 'queued' OR (status = 'running' AND lease_until < ?))
+                AND {soort_filter}
+            ORDER BY created_at
+            LIMIT 1
+        ''', (now,)).fetchone()
+        if job is None:
+            return None
+        conn.execute('''
+            UPDATE upload_jobs
+            SET status = 'running', attempts = attempts + 1, lease_until = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (now + JOB_LEASE_SECONDS, job['id']))
+
+    job = dict(job)
+    job['attempts'] += 1
+    return job
+
+def fail_upload_job(job_id, message, filepath=None, file_hash=None):
+    """Markeer een job als mislukt en ruim het geüploade bestand op"""
+    update_upload_job(job_id, status='failed', error=message, lease_until=None)
+    inc_metric('recepten_uploads_total', status='failed')
+    remove_upload_file(filepath, file_hash)
+
+def insert_recipe(conn, recipe_data, filename, raw_text, file_hash=None, timestamp=None,
+                  extractie_versies=None, update_similar=True):
+    """Voeg een verwerkt recept (en zijn ingrediënten) toe binnen een lopende transactie.
+
+    extractie_versies is (ocr_versie, ai_versie); standaard de huidige configuratie.
+    Met update_similar=False blijft vergelijkbare_recepten staan (bulk: daarna herberekenen).
+    """
+    ocr_versie, ai_versie = extractie_versies or current_extraction_versions()
+    ingredienten_json = json.dumps(recipe_data.get('ingredienten', []), ensure_ascii=False)
+    stappen_json = json.dumps(recipe_data.get('stappen', []), ensure_ascii=False)
+    benodigdheden_json = json.dumps(recipe_data.get('benodigdheden', []), ensure_ascii=False)
+
+    cursor = conn.execute('''
+        INSERT INTO recepten (titel, ingredienten, stappen, benodigdheden, bestand_hash,
+                            inhoud_hash, timestamp, ocr_versie, ai_versie)
+        VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)
+    ''', (recipe_data.get('titel', 'Onbekend Recept'), 
+          ingredienten_json, 
+          stappen_json, 
+          benodigdheden_json,
+          file_hash,
+          recipe_content_hash(recipe_data),
+          timestamp,
+          ocr_versie,
+          ai_versie))
+    recipe_id = cursor.lastrowid
+    store_recipe_sources(conn, [(recipe_id, filename, raw_text)])
+    insert_recipe_ingredients(conn, recipe_id, recipe_data.get('ingredienten', []))
+    if update_similar:
+        update_similar_recipes(conn, recipe_id)
+    return recipe_id
+
+def update_recipe(conn, recipe_id, recipe_data, raw_text=None, filename=None,
+                  extractie_versies=(None, None), versie=None, update_similar=True):
+    """Vervang de inhoud van een recept (en zijn ingrediënten) binnen een lopende transactie.
+
+    Met versie alleen als de rij intussen niet gewijzigd is; geeft False als dat wel zo was.
+    """
+    sql = '''
+        UPDATE recepten
+        SET titel = ?, ingredienten = ?, stappen = ?, benodigdheden = ?, inhoud_hash = ?,
+            ocr_versie = ?, ai_versie = ?
+        WHERE id = ?
+    '''
+    params = [recipe_data.get('titel', 'Onbekend Recept'),
+              json.dumps(recipe_data.get('ingredienten', []), ensure_ascii=False),
+              json.dumps(recipe_data.get('stappen', []), ensure_ascii=False),
+              json.dumps(recipe_data.get('benodigdheden', []), ensure_ascii=False),
+              recipe_content_hash(recipe_data),
+              *extractie_versies,
+              recipe_id]
+    if versie is not None:
+        sql += ' AND versie = ?'
+        params.append(versie)
+    if conn.execute(sql, params).rowcount == 0:
+        return False
+    if filename is not None or raw_text is not None:
+        store_recipe_sources(conn, [(recipe_id, filename, raw_text)])
+    conn.execute('DELETE FROM recept_ingredienten WHERE recept_id = ?', (recipe_id,))
+    insert_recipe_ingredients(conn, recipe_id, recipe_data.get('ingredienten', []))
+    if update_similar:
+        update_similar_recipes(conn, recipe_id)
+    return True
+
+def save_recipe(recipe_data, filename, raw_text, job_id=None, file_hash=None):
+    """Sla een verwerkt recept op en koppel het eventueel aan een upload job.
+
+    Bestaat er intussen al een recept uit hetzelfde bestand, dan wordt dat gebruikt.
+    """
+    with db_write() as conn:
+        # Binnen de schrijftransactie, zodat gelijktijdige jobs niet allebei inserten
+        recipe_id = find_recipe_by_hash(conn, file_hash) if file_hash else None
+        if recipe_id is None:
+            recipe_id = insert_recipe(conn, recipe_data, filename, raw_text, file_hash)
+        else:
+            logger.info(f"Recipe for {filename} already exists as {recipe_id} (job: {job_id})")
+
+        # In dezelfde transactie, zodat een herstarte job nooit dubbel insert
+        if job_id is not None:
+            conn.execute('''
+                UPDATE upload_jobs SET recept_id = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (recipe_id, job_id))
+    invalidate_ingredient_cache()
+    return recipe_id
+
+def process_upload_job(job):
+    """Voer de stappen OCR -> AI -> DB -> archief uit voor een upload job.
+
+    Reeds afgeronde stappen (bijv. na een herstart) worden overgeslagen, en
+    een bestand dat al eerder is verwerkt levert direct het bestaande recept op.
+    """
+    job_id = job['id']
+    filename = job['bestandsnaam']
+    filepath = upload_job_path(job)
+
+    def renew_lease(**fields):
+        # Lease bij elke stap verlengen, anders claimt een andere worker de job tijdens trage OCR/Gemini
+        update_upload_job(job_id, lease_until=time.time() + JOB_LEASE_SECONDS, **fields)
+
+    with sentry_sdk.start_transaction(op="upload.job", name="Process Upload Job"):
+        sentry_sdk.set_tag("upload.job_id", job_id)
+
+        file_hash = job['bestand_hash'] or file_sha256(filepath)
+
+        # Zelfde bytes al eerder verwerkt: geen OCR of AI nodig
+        recipe_id = job['recept_id']
+        if recipe_id is None:
+            existing_id = find_recipe_by_hash(get_db_connection(), file_hash)
+            if existing_id is not None:
+                update_upload_job(job_id, recept_id=existing_id)
+                archive_file(filepath, file_hash, filename)
+                update_upload_job(job_id, status='done', stage='done', lease_until=None)
+                inc_metric('recepten_uploads_total', status='duplicate')
+                logger.info(f"Duplicate upload {filename} matches recipe {existing_id} (job: {job_id})")
+                return
+
+        # Process met OCR
+        raw_text = job['ruwe_ocr_tekst']
+        if raw_text is None:
+            renew_lease(stage='ocr')
+            raw_text = extract_text_cached(filepath, file_hash)
+            if not raw_text:
+                fail_upload_job(job_id, 'Kon geen tekst vinden in de afbeelding', filepath, file_hash)
+                return
+            renew_lease(ruwe_ocr_tekst=raw_text)
+
+        # Verfijn met AI
+        if job['recept_json'] is None:
+            renew_lease(stage='ai')
+            recipe_data = refine_text_cached(raw_text)
+            if not recipe_data:
+                fail_upload_job(job_id, 'Kon geen recept informatie vinden in de afbeelding', filepath, file_hash)
+                return
+            renew_lease(recept_json=json.dumps(recipe_data, ensure_ascii=False))
+        else:
+            recipe_data = json.loads(job['recept_json'])
+
+        # Sla op in database
+        if recipe_id is None:
+            renew_lease(stage='db')
+            with sentry_sdk.start_span(op="db.save", description="Save recipe to database"):
+                recipe_id = save_recipe(recipe_data, filename, raw_text, job_id=job_id, file_hash=file_hash)
+
+        # Verplaats naar archief en maak de thumbnails
+        renew_lease(stage='archive')
+        if os.path.exists(filepath):
+            archive_file(filepath, file_hash, filename)
+        create_thumbnails(archive_path_for(file_hash, filename), file_hash)
+
+        update_upload_job(job_id, status='done', stage='done', lease_until=None)
+
+        inc_metric('recepten_uploads_total', status='done')
+
+        # Log success
+        logger.info(f"Recipe successfully added: {recipe_data.get('titel')} (ID: {recipe_id}, job: {job_id})")
+        if SENTRY_UPLOAD_EVENTS:
+            sentry_sdk.capture_message(
+                f"Recipe uploaded successfully: {recipe_data.get('titel')}",
+                level="info"
+            )
+
+def run_upload_job(job):
+    """Verwerk een geclaimde job; bij een fout opnieuw in de wachtrij tot JOB_MAX_ATTEMPTS"""
+    try:
+        if job['soort'] == 'batch':
+            process_batch_job(job)
+        elif job['soort'] == 'reprocess':
+            process_reprocess_job(job)
+        else:
+            process_upload_job(job)
+    except Exception as e:
+        logger.error(f"Upload job {job['id']} error (attempt {job['attempts']}): {str(e)}")
+        sentry_sdk.capture_exception(e)
+        try:
+            if job['attempts'] >= JOB_MAX_ATTEMPTS:
+                fail_upload_job(
+                    job['id'],
+                    'Er is een fout opgetreden bij het verwerken van het bestand.',
+                    upload_job_path(job) if job['soort'] == 'upload' else None,
+                    job['bestand_hash']
+                )
+            else:
+                update_upload_job(job['id'], status='queued', lease_until=None)
+                _upload_wakeup.set()
+        except Exception as cleanup_error:
+            logger.error(f"Upload job {job['id']} cleanup error: {str(cleanup_error)}")
+
+def upload_worker_loop(reprocess=False):
+    """Worker thread die jobs uit de wachtrij verwerkt (met reprocess=True alleen herverwerking)"""
+    while True:
+        _upload_wakeup.clear()
+        try:
+            job = claim_upload_job(reprocess)
+        except Exception as e:
+            logger.error(f"Upload worker claim error: {str(e)}")
+            sentry_sdk.capture_exception(e)
+            job = None
+
+        if job is None:
+            _upload_wakeup.wait(JOB_POLL_INTERVAL)
+            continue
+
+        run_upload_job(job)
+
+def start_upload_workers():
+    """Start de worker pool (eenmalig per proces, ook na een gunicorn fork)"""
+    global _upload_workers_pid
+    if _upload_workers_pid == os.getpid():
+        return
+    with _upload_workers_lock:
+        if _upload_workers_pid == os.getpid():
+            return
+        _upload_workers_pid = os.getpid()
+        for i in range(UPLOAD_WORKERS):
+            threading.Thread(
+                target=upload_worker_loop,
+                name=f"upload-worker-{i + 1}",
+                daemon=True
+            ).start()
+        if UPLOAD_WORKERS > 0:
+            # Eén eigen worker voor herverwerking, naast de upload workers
+            threading.Thread(
+                target=upload_worker_loop,
+                args=(True,),
+                name="reprocess-worker",
+                daemon=True
+            ).start()
+        logger.info(f"Started {UPLOAD_WORKERS} upload workers and a reprocess worker (pid {os.getpid()})")
+
+@app.before_request
+def ensure_upload_workers():
+    # Vangnet voor 'App:app' en voor een fork na create_app()
+    start_upload_workers()
+
+# Bulk import: OCR in een process pool (CLI) of thread pool (web), AI in een thread pool, inserts per batch
+def archive_filename(original_name):
+    """Unieke bestandsnaam voor het archief, gebaseerd op de originele naam"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{timestamp}_{uuid.uuid4().hex[:8]}_{secure_filename(original_name)}"
+
+def add_import_items(batch_id, files):
+    """Registreer bestanden voor een batch; al bekende bronnen worden overgeslagen.
+
+    files is een lijst van (bron, pad, bestandsnaam) tuples.
+    """
+    with db_write() as conn:
+        conn.executemany('''
+            INSERT OR IGNORE INTO import_items (batch_id, bron, pad, bestandsnaam)
+            VALUES (?, ?, ?, ?)
+        ''', [(batch_id, bron, pad, bestandsnaam) for bron, pad, bestandsnaam in files])
+
+def get_import_batch_status(batch_id):
+    """Voortgang van een import batch: aantallen per status en per bestand"""
+    conn = get_db_connection()
+    items = conn.execute('''
+        SELECT bron, status, recept_id, error FROM import_items
+        WHERE batch_id = ? ORDER BY id
+    ''', (batch_id,)).fetchall()
+    counts = {"queued": 0, "done": 0, "failed": 0}
+    for item in items:
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+    return {
+        "batch_id": batch_id,
+        "totaal": len(items),
+        **counts,
+        "items": [dict(item) for item in items]
+    }
+
+def _is_upload_file(path):
+    """True als het bestand in UPLOAD_FOLDER staat (en dus van ons is)"""
+    upload_root = os.path.abspath(UPLOAD_FOLDER)
+    return os.path.commonpath([os.path.abspath(path), upload_root]) == upload_root
+
+def _archive_import_file(pad, bestandsnaam, file_hash=None):
+    """Geüploade bestanden verplaatsen, bestanden van elders kopiëren naar het archief"""
+    if not os.path.exists(pad):
+        return
+    file_hash = file_hash or file_sha256(pad)
+    archive_file(pad, file_hash, bestandsnaam, move=_is_upload_file(pad))
+    request_thumbnails(file_hash)
+
+def _flush_import_results(results):
+    """Schrijf een batch resultaten in één transactie en archiveer daarna de bestanden"""
+    if not results:
+        return
+    with db_write() as conn:
+        for result in results:
+            if result['error'] is None:
+                # Bestaat er al een recept met dezelfde bytes, koppel daaraan
+                recipe_id = find_recipe_by_hash(conn, result['bestand_hash'])
+                if recipe_id is None and result['recipe'] is not None:
+                    recipe_id = insert_recipe(
+                        conn, result['recipe'], result['bestandsnaam'],
+                        result['raw_text'], result['bestand_hash']
+                    )
+                if recipe_id is None:
+                    result['error'] = 'Dubbel bestand; het origineel kon niet worden verwerkt'
+            if result['error'] is None:
+                result['recept_id'] = recipe_id
+                conn.execute('''
+                    UPDATE import_items SET status = 'done', recept_id = ?, error = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (recipe_id, result['id']))
+            else:
+                conn.execute('''
+                    UPDATE import_items SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (result['error'], result['id']))
+
+    for result in results:
+        try:
+            if result['error'] is None:
+                _archive_import_file(result['pad'], result['bestandsnaam'], result['bestand_hash'])
+            elif _is_upload_file(result['pad']):
+                # Uploads staan al in het archief; bytes van een bestaand recept blijven staan
+                remove_upload_file(result['pad'], result['bestand_hash'])
+        except OSError as e:
+            logger.warning(f"Import archive error for {result['bron']}: {str(e)}")
+    invalidate_ingredient_cache()
+
+def run_import_batch(batch_id, ocr_workers=None, ai_workers=None, commit_every=None,
+                     retry_failed=False, progress=None, heartbeat=None, ocr_processes=False):
+    """Verwerk alle openstaande bestanden van een batch.
+
+    OCR draait met ocr_processes in een process pool (alleen vanuit de CLI;
+    niet forken vanuit de threads van het webproces), anders in een begrensde
+    thread pool. Gemini draait in een thread pool (I/O-gebonden). Het aantal
+    bestanden onderweg is begrensd, en resultaten
+    worden per commit_every recepten in één transactie opgeslagen. Bestanden
+    die al 'done' zijn worden overgeslagen, dus een afgebroken import hervat.
+    Bestanden die al als recept bestaan en gecachte OCR/AI resultaten slaan
+    de betreffende stappen over.
+    progress(result) wordt per afgerond bestand aangeroepen, heartbeat() na
+    elke commit.
+    """
+    ocr_workers = ocr_workers or (IMPORT_OCR_PROCESSES if ocr_processes else IMPORT_OCR_THREADS)
+    ai_workers = ai_workers or IMPORT_AI_THREADS
+    commit_every = commit_every or IMPORT_COMMIT_EVERY
+
+    conn = get_db_connection()
+    if retry_failed:
+        with db_write() as write_conn:
+            write_conn.execute('''
+                UPDATE import_items SET status = 'queued', error = NULL
+                WHERE batch_id = ? AND status = 'failed'
+            ''', (batch_id,))
+
+    # Afgerond maar nog niet gearchiveerd (onderbroken na de commit)
+    for item in conn.execute('''
+        SELECT pad, bestandsnaam FROM import_items WHERE batch_id = ? AND status = 'done'
+    ''', (batch_id,)).fetchall():
+        if _is_upload_file(item['pad']):
+            _archive_import_file(item['pad'], item['bestandsnaam'])
+
+    items = [dict(item) for item in conn.execute('''
+        SELECT id, bron, pad, bestandsnaam FROM import_items
+        WHERE batch_id = ? AND status = 'queued' ORDER BY id
+    ''', (batch_id,)).fetchall()]
+    if not items:
+        return get_import_batch_status(batch_id)
+
+    logger.info(f"Import batch {batch_id}: {len(items)} files (ocr={ocr_workers}, ai={ai_workers})")
+    pending_items = iter(items)
+    buffer = []
+    deferred = []  # dubbele bestanden binnen deze batch, na het origineel afhandelen
+    seen_hashes = set()
+    max_in_flight = ocr_workers * 2 + ai_workers
+
+    def finish(item, recipe=None, raw_text=None, error=None):
+        result = dict(item, recipe=recipe, raw_text=raw_text, error=error, recept_id=None)
+        buffer.append(result)
+        if len(buffer) >= commit_every:
+            flush()
+
+    def flush():
+        _flush_import_results(buffer)
+        if progress:
+            for result in buffer:
+                progress(result)
+        buffer.clear()
+        if heartbeat:
+            heartbeat()
+
+    ocr_executor = ProcessPoolExecutor if ocr_processes else ThreadPoolExecutor
+    with ocr_executor(max_workers=ocr_workers) as ocr_pool, \
+            ThreadPoolExecutor(max_workers=ai_workers) as ai_pool:
+        in_flight = {}  # future -> (stage, item, raw_text)
+
+        def submit_ai(item, raw_text):
+            cached = get_cached_extraction(ai_cache_key(raw_text))
+            if cached is not None:
+                finish(item, recipe=json.loads(cached), raw_text=raw_text)
+            else:
+                in_flight[ai_pool.submit(refine_text_with_gemini, raw_text)] = ('ai', item, raw_text)
+
+        def fill():
+            while len(in_flight) < max_in_flight:
+                item = next(pending_items, None)
+                if item is None:
+                    return
+                try:
+                    item['bestand_hash'] = file_sha256(item['pad'])
+                except OSError as e:
+                    item['bestand_hash'] = None
+                    finish(item, error=f'Bestand niet leesbaar: {e.strerror}')
+                    continue
+
+                if item['bestand_hash'] in seen_hashes:
+                    deferred.append(item)
+                    continue
+                seen_hashes.add(item['bestand_hash'])
+
+                # Al eerder geïmporteerd of geüpload: direct koppelen, geen OCR/AI
+                if find_recipe_by_hash(conn, item['bestand_hash']) is not None:
+                    finish(item)
+                    continue
+
+                raw_text = get_cached_extraction(ocr_cache_key(item['bestand_hash']))
+                if raw_text is not None:
+                    submit_ai(item, raw_text)
+                else:
+                    in_flight[ocr_pool.submit(extract_text_from_image, item['pad'])] = ('ocr', item, None)
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item, raw_text = in_flight.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    logger.error(f"Import {stage} error for {item['bron']}: {str(e)}")
+                    sentry_sdk.capture_exception(e)
+                    finish(item, error='Er is een fout opgetreden bij het verwerken van het bestand.')
+                    continue
+
+                if stage == 'ocr':
+                    if not value:
+                        finish(item, error='Kon geen tekst vinden in de afbeelding')
+                    else:
+                        store_cached_extraction(ocr_cache_key(item['bestand_hash']), 'ocr', value)
+                        submit_ai(item, value)
+                elif not value:
+                    finish(item, raw_text=raw_text, error='Kon geen recept informatie vinden in de afbeelding')
+                else:
+                    store_cached_extraction(ai_cache_key(raw_text), 'ai', json.dumps(value, ensure_ascii=False))
+                    finish(item, recipe=value, raw_text=raw_text)
+            fill()
+
+    flush()
+    for item in deferred:
+        finish(item)
+    flush()
+    return get_import_batch_status(batch_id)
+
+def process_batch_job(job):
+    """Upload job van het type 'batch': verwerk een import batch uit /api/upload/batch"""
+    job_id = job['id']
+    batch_id = job['bestandsnaam']
+
+    def renew_lease():
+        update_upload_job(job_id, lease_until=time.time() + JOB_LEASE_SECONDS)
+
+    with sentry_sdk.start_transaction(op="upload.batch", name="Process Upload Batch"):
+        sentry_sdk.set_tag("upload.batch_id", batch_id)
+        update_upload_job(job_id, stage='import')
+        status = run_import_batch(batch_id, heartbeat=renew_lease)
+        update_upload_job(job_id, status='done', stage='done', lease_until=None)
+        logger.info(f"Import batch {batch_id} finished: {status['done']} done, {status['failed']} failed")
+
+@app.cli.command('import-dir')
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.option('--batch-id', help='Batch id om te hervatten (standaard afgeleid van het pad).')
+@click.option('--ocr-workers', type=int, default=None, help='Aantal OCR processen.')
+@click.option('--ai-workers', type=int, default=None, help='Aantal gelijktijdige Gemini aanroepen.')
+@click.option('--commit-every', type=int, default=None, help='Aantal recepten per transactie.')
+@click.option('--retry-failed', is_flag=True, help='Mislukte bestanden opnieuw proberen.')
+def import_dir_command(path, batch_id, ocr_workers, ai_workers, commit_every, retry_failed):
+    """Importeer alle receptfoto's uit een map (hervat een eerdere import van dezelfde map)"""
+    init_app()
+    root = os.path.abspath(path)
+    batch_id = batch_id or f"dir-{hashlib.sha1(root.encode('utf-8')).hexdigest()[:12]}"
+
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if allowed_file(name):
+                pad = os.path.join(dirpath, name)
+                files.append((os.path.relpath(pad, root), pad, archive_filename(name)))
+    add_import_items(batch_id, files)
+
+    status = get_import_batch_status(batch_id)
+    total = status['totaal']
+    processed = status['done'] if retry_failed else status['done'] + status['failed']
+    click.echo(f"Batch {batch_id}: {total} bestanden, {status['done']} al verwerkt")
+
+    def report(result):
+        nonlocal processed
+        processed += 1
+        if result['error'] is None:
+            click.echo(f"[{processed}/{total}] OK    {result['bron']} -> recept {result['recept_id']}")
+        else:
+            click.echo(f"[{processed}/{total}] FOUT  {result['bron']}: {result['error']}")
+
+    status = run_import_batch(
+        batch_id, ocr_workers, ai_workers, commit_every,
+        retry_failed=retry_failed, progress=report, ocr_processes=True
+    )
+    click.echo(f"Klaar: {status['done']} verwerkt, {status['failed']} mislukt, {status['queued']} open")
+
+# Export/import van de hele collectie als NDJSON: één recept per regel,
+# rij voor rij uit een cursor, zodat het geheugengebruik niet met de collectie groeit
+EXPORT_COLUMNS = '''
+    r.id, r.titel, r.ingredienten, r.stappen, r.benodigdheden, b.originele_bestandsnaam,
+    b.ruwe_ocr_tekst, r.bestand_hash, r.inhoud_hash, r.ocr_versie, r.ai_versie, r.timestamp
+'''
+IMPORT_MAX_ERRORS = 20  # aantal foutmeldingen in het import resultaat
+
+def _json_list(value):
+    """Parse een JSON kolom; ongeldige of lege waarden worden een lege lijst"""
+    try:
+        parsed = json.loads(value) if value else []
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+def iter_recipe_export():
+    """Alle recepten als dicts, op id volgorde, uit één leestransactie"""
+    # Eigen connectie: de response wordt pas na de view functie gestreamd
+    conn = open_db_connection()
+    try:
+        conn.execute('BEGIN')  # consistente snapshot van de hele export
+        cursor = conn.execute(f'''
+            SELECT {EXPORT_COLUMNS}
+            FROM recepten r LEFT JOIN recept_bronnen b ON b.recept_id = r.id
+            ORDER BY r.id
+        ''')
+        while True:
+            rows = cursor.fetchmany(RECIPE_EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    "id": row['id'],
+                    "titel": row['titel'],
+                    "ingredienten": _json_list(row['ingredienten']),
+                    "stappen": _json_list(row['stappen']),
+                    "benodigdheden": _json_list(row['benodigdheden']),
+                    "originele_bestandsnaam": row['originele_bestandsnaam'],
+                    "ruwe_ocr_tekst": decompress_text(row['ruwe_ocr_tekst']),
+                    "bestand_hash": row['bestand_hash'],
+                    "inhoud_hash": row['inhoud_hash'],
+                    "ocr_versie": row['ocr_versie'],
+                    "ai_versie": row['ai_versie'],
+                    "timestamp": format_db_timestamp(row['timestamp']),
+                }
+    finally:
+        conn.close()
+
+def iter_export_chunks(records):
+    """NDJSON bytes, per RECIPE_EXPORT_FETCH_SIZE recepten één chunk"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        if len(lines) >= RECIPE_EXPORT_FETCH_SIZE:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+def gzip_chunks(chunks, level=6):
+    """Comprimeer een stroom chunks als één gzip bestand"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+class _PrefixedReader:
+    """Stream met de al gelezen eerste bytes er weer voor (voor gzip detectie)"""
+
+    def __init__(self, prefix, fileobj):
+        self.prefix = prefix
+        self.fileobj = fileobj
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.fileobj.read(size)
+        if size is None or size < 0:
+            data, self.prefix = self.prefix + self.fileobj.read(), b''
+            return data
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        if len(data) < size:
+            data += self.fileobj.read(size - len(data))
+        return data
+
+def iter_ndjson_lines(fileobj, chunk_size=64 * 1024):
+    """(regelnummer, bytes) uit een NDJSON stream; gzip wordt herkend aan de magic bytes"""
+    head = fileobj.read(2)
+    reader = _PrefixedReader(head, fileobj)
+    if head == b'\x1f\x8b':
+        reader = gzip.GzipFile(fileobj=reader, mode='rb')
+
+    line_no = 0
+    buffer = b''
+    try:
+        while True:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            *lines, buffer = (buffer + chunk).split(b'\n')
+            for line in lines:
+                line_no += 1
+                yield line_no, line
+    except (gzip.BadGzipFile, EOFError, zlib.error) as e:
+        raise ValueError(f"Ongeldig gzip bestand: {e}")
+    if buffer:
+        yield line_no + 1, buffer
+
+def normalize_import_record(record):
+    """Valideer een geëxporteerd recept; ValueError met een Nederlandse melding als het niet klopt"""
+    if not isinstance(record, dict):
+        raise ValueError("geen JSON object")
+    titel = record.get('titel')
+    if not isinstance(titel, str) or not titel.strip():
+        raise ValueError("titel ontbreekt")
+
+    normalized = {"titel": titel}
+    for field in ('ingredienten', 'stappen', 'benodigdheden'):
+        value = record.get(field) or []
+        if not isinstance(value, list):
+            raise ValueError(f"{field} is geen lijst")
+        normalized[field] = value
+    for field in ('originele_bestandsnaam', 'ruwe_ocr_tekst', 'ocr_versie', 'ai_versie'):
+        value = record.get(field)
+        normalized[field] = value if isinstance(value, str) else None
+
+    bestand_hash = record.get('bestand_hash')
+    normalized['bestand_hash'] = bestand_hash if isinstance(bestand_hash, str) and re.fullmatch(r'[0-9a-f]{64}', bestand_hash) else None
+    timestamp = record.get('timestamp')
+    try:
+        normalized['timestamp'] = datetime.strptime(timestamp, DB_TIMESTAMP_FORMAT).strftime(DB_TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        normalized['timestamp'] = None
+    return normalized
+
+def upsert_recipe(conn, record, update_similar=True):
+    """Voeg een geïmporteerd recept toe of werk het bij.
+
+    Geeft (status, id) met status 'toegevoegd', 'bijgewerkt' of 'ongewijzigd'.
+    Een recept met bestand_hash hoort bij dezelfde foto; anders is de inhoud hash de sleutel.
+    """
+    inhoud_hash = recipe_content_hash(record)
+    if record['bestand_hash']:
+        row = conn.execute(
+            'SELECT id, inhoud_hash FROM recepten WHERE bestand_hash = ? ORDER BY id LIMIT 1',
+            (record['bestand_hash'],)
+        ).fetchone()
+    else:
+        row = conn.execute(
+            'SELECT id, inhoud_hash FROM recepten WHERE inhoud_hash = ? ORDER BY id LIMIT 1',
+            (inhoud_hash,)
+        ).fetchone()
+
+    # Onbekende versies (oudere export) worden NULL, zodat reprocess ze opnieuw verwerkt
+    extractie_versies = (record['ocr_versie'], record['ai_versie'])
+    if row is None:
+        recipe_id = insert_recipe(conn, record, record['originele_bestandsnaam'], record['ruwe_ocr_tekst'],
+                                  record['bestand_hash'], timestamp=record['timestamp'],
+                                  extractie_versies=extractie_versies, update_similar=update_similar)
+        return 'toegevoegd', recipe_id
+    if row['inhoud_hash'] == inhoud_hash:
+        return 'ongewijzigd', row['id']
+
+    update_recipe(conn, row['id'], record, record['ruwe_ocr_tekst'], record['originele_bestandsnaam'],
+                  extractie_versies, update_similar=update_similar)
+    return 'bijgewerkt', row['id']
+
+def import_recipes(fileobj, batch_size=None):
+    """Importeer een NDJSON (of gzip) export in transacties van batch_size recepten"""
+    batch_size = batch_size or RECIPE_IMPORT_BATCH_SIZE
+    stats = {"toegevoegd": 0, "bijgewerkt": 0, "ongewijzigd": 0, "overgeslagen": 0, "fouten": []}
+    batch = []
+    changed = []  # voor vergelijkbare_recepten; bij een grote import volledig herberekenen
+
+    def flush():
+        with db_write() as conn:
+            for record in batch:
+                status, recipe_id = upsert_recipe(conn, record, update_similar=False)
+                stats[status] += 1
+                if status != 'ongewijzigd' and len(changed) < SIMILAR_RECIPES_REBUILD_AFTER:
+                    changed.append(recipe_id)
+        batch.clear()
+
+    for line_no, line in iter_ndjson_lines(fileobj):
+        if not line.strip():
+            continue
+        try:
+            # UnicodeDecodeError en JSONDecodeError zijn allebei ValueErrors
+            batch.append(normalize_import_record(json.loads(line)))
+        except ValueError as e:
+            stats['overgeslagen'] += 1
+            if len(stats['fouten']) < IMPORT_MAX_ERRORS:
+                stats['fouten'].append(f"Regel {line_no}: {e}")
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if changed:
+        with db_write() as conn:
+            if len(changed) >= SIMILAR_RECIPES_REBUILD_AFTER:
+                rebuild_similar_recipes(conn)
+            else:
+                for recipe_id in changed:
+                    update_similar_recipes(conn, recipe_id)
+    invalidate_ingredient_cache()
+    logger.info(
+        f"Recipe import: {stats['toegevoegd']} inserted, {stats['bijgewerkt']} updated, "
+        f"{stats['ongewijzigd']} unchanged, {stats['overgeslagen']} skipped"
+    )
+    return stats
+
+@app.cli.command('export-recipes')
+@click.argument('output', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--gzip', 'compress', is_flag=True, help='Comprimeer met gzip (standaard bij een .gz bestand).')
+def export_recipes_command(output, compress):
+    """Exporteer alle recepten als NDJSON naar OUTPUT ('-' voor stdout)"""
+    init_app()
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    chunks = iter_export_chunks(counted(iter_recipe_export()))
+    if compress or output.endswith('.gz'):
+        chunks = gzip_chunks(chunks)
+    with click.open_file(output, 'wb', atomic=output != '-') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    click.echo(f"{count} recepten geëxporteerd naar {output}", err=True)
+
+@app.cli.command('import-recipes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--batch-size', type=int, default=None, help='Aantal recepten per transactie.')
+def import_recipes_command(path, batch_size):
+    """Importeer een NDJSON (of gzip) export; bestaande recepten worden bijgewerkt"""
+    init_app()
+    with click.open_file(path, 'rb') as f:
+        try:
+            stats = import_recipes(f, batch_size)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(
+        f"Toegevoegd: {stats['toegevoegd']}, bijgewerkt: {stats['bijgewerkt']}, "
+        f"ongewijzigd: {stats['ongewijzigd']}, overgeslagen: {stats['overgeslagen']}"
+    )
+    for fout in stats['fouten']:
+        click.echo(f"  {fout}")
+
+# Herverwerking: recepten waarvan ocr_versie of ai_versie niet meer overeenkomt
+# met de huidige configuratie opnieuw extraheren. Alleen de verouderde stappen
+# draaien: bij een nieuwe prompt gaat alleen de opgeslagen OCR tekst opnieuw
+# door Gemini. Gedrosseld met een rate limit, resultaten per batch in één transactie.
+REPROCESS_COLUMNS = '''
+    r.id, r.versie, b.originele_bestandsnaam, b.ruwe_ocr_tekst, r.bestand_hash, r.inhoud_hash,
+    r.ocr_versie, r.ai_versie
+'''
+
+class RateLimiter:
+    """Maximaal per_minute aanroepen van wait() per minuut, verdeeld over alle threads"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute and per_minute > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        time.sleep(slot - now)
+
+def find_stale_recipes(conn, after_id=0, limit=REPROCESS_BATCH_SIZE):
+    """Recepten na after_id die met een oudere OCR of AI configuratie gemaakt zijn"""
+    ocr_versie, ai_versie = current_extraction_versions()
+    recepten = [dict(row) for row in conn.execute(f'''
+        SELECT {REPROCESS_COLUMNS}
+        FROM recepten r LEFT JOIN recept_bronnen b ON b.recept_id = r.id
+        WHERE r.id > ? AND (r.ocr_versie IS NOT ? OR r.ai_versie IS NOT ?)
+        ORDER BY r.id
+        LIMIT ?
+    ''', (after_id, ocr_versie, ai_versie, limit)).fetchall()]
+    for recept in recepten:
+        recept['ruwe_ocr_tekst'] = decompress_text(recept['ruwe_ocr_tekst'])
+    return recepten
+
+def get_reprocess_status(conn):
+    """Aantal recepten per verouderde stap, voor /api/reprocess"""
+    ocr_versie, ai_versie = current_extraction_versions()
+    row = conn.execute('''
+        SELECT COUNT(*) AS totaal,
+               COALESCE(SUM(ocr_versie IS NOT ?), 0) AS ocr_verouderd,
+               COALESCE(SUM(ai_versie IS NOT ?), 0) AS ai_verouderd
+        FROM recepten
+    ''', (ocr_versie, ai_versie)).fetchone()
+    job = conn.execute('''
+        SELECT id FROM upload_jobs WHERE soort = 'reprocess' AND status IN ('queued', 'running')
+        ORDER BY created_at LIMIT 1
+    ''').fetchone()
+    return dict(row, ocr_versie=ocr_versie, ai_versie=ai_versie, job_id=job['id'] if job else None)
+
+def recipe_archive_path(recept):
+    """Pad van de originele foto in het archief, of None als die er niet (meer) is"""
+    filename = recept['originele_bestandsnaam'] or ''
+    candidates = []
+    if recept['bestand_hash']:
+        candidates.append(archive_path_for(recept['bestand_hash'], filename))
+    if filename:
+        candidates.append(os.path.join(ARCHIVE_FOLDER, filename))  # archief van vóór de content hashes
+    return next((path for path in candidates if os.path.isfile(path)), None)
+
+def reextract_recipe(recept, limiter=None):
+    """Voer de verouderde stappen opnieuw uit (zonder te schrijven); geeft een resultaat dict"""
+    ocr_current, ai_current = current_extraction_versions()
+    raw_text = recept['ruwe_ocr_tekst']
+    ocr_versie = recept['ocr_versie']
+    ai_versie = recept['ai_versie']
+
+    # OCR kan alleen opnieuw als de originele foto nog in het archief staat
+    image_path = recipe_archive_path(recept) if ocr_versie != ocr_current else None
+    if ocr_versie != ocr_current and image_path is None and ai_versie == ai_current:
+        return {"status": "geen_archief"}
+
+    if limiter:
+        limiter.wait()
+    try:
+        if image_path is not None:
+            new_text = extract_text_cached(image_path, recept['bestand_hash'] or file_sha256(image_path))
+            if not new_text:
+                return {"status": "mislukt", "error": "Geen tekst gevonden"}
+            raw_text, ocr_versie = new_text, ocr_current
+
+        if not raw_text:
+            return {"status": "mislukt", "error": "Geen OCR tekst"}
+
+        recipe_data = None
+        if ai_versie != ai_current or raw_text != recept['ruwe_ocr_tekst']:
+            recipe_data = refine_text_cached(raw_text)
+            if not recipe_data:
+                return {"status": "mislukt", "error": "Geen recept uit Gemini"}
+            ai_versie = ai_current
+    except Exception as e:
+        logger.error(f"Reprocess error for recipe {recept['id']}: {str(e)}")
         sentry_sdk.capture_exception(e)
-        return None
+        return {"status": "mislukt", "error": str(e)}
 
-@sentry_sdk.trace
-def refine_text_with_gemini(raw_text):
-    """Verfijn ruwe OCR tekst met Google Gemini AI"""
-    clean_raw_text = raw_text.strip()
-    if not clean_raw_text:
-        return None
+    return {"status": "klaar", "raw_text": raw_text, "recipe": recipe_data, "versies": (ocr_versie, ai_versie)}
 
-    try:
-        with sentry_sdk.start_span(op="ai.process", description="Process with Gemini AI"):
-            # Check API key
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("Google API key not configured")
-            
-            genai.configure(api_key=api_key)
-            
-            # Gebruik een veiligere model configuratie
-            generation_config = {
-                "temperature": 0.2,  # Lagere temperatuur voor consistentere output
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            }
-            
-            safety_settings = [
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-            ]
-            
-            model = genai.GenerativeModel(
-                "gemini-1.5-flash",
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
-            
-            prompt = f"""
-            Ik heb tekst geëxtraheerd uit een afbeelding van een recept. Analyseer deze tekst en 
-            extraheer de informatie in een gestructureerd JSON formaat.
+def apply_reprocess_result(conn, recept, result):
+    """Schrijf een herverwerkt recept binnen een lopende transactie; geeft de status voor de telling"""
+    if result['status'] != 'klaar':
+        return result['status']
+    ocr_versie, ai_versie = result['versies']
+    recipe_data = result['recipe']
 
-            Geef het resultaat ALLEEN als JSON in dit exacte formaat:
-            {{
-                "titel": "Naam van het recept",
-                "ingredienten": [
-                    {{"hoeveelheid": "2", "eenheid": "stuks", "naam": "eieren"}},
-                    {{"hoeveelheid": "500", "eenheid": "gram", "naam": "bloem"}}
-                ],
-                "stappen": [
-                    "Stap 1: beschrijving",
-                    "Stap 2: beschrijving"
-                ],
-                "benodigdheden": [
-                    "Mengkom",
-                    "Garde"
-                ]
-            }}
+    # Zelfde uitkomst: alleen de versies bijwerken (geen nieuwe rij versie voor de kaart cache)
+    if recipe_data is None or recipe_content_hash(recipe_data) == recept['inhoud_hash']:
+        updated = conn.execute('''
+            UPDATE recepten SET ocr_versie = ?, ai_versie = ?
+            WHERE id = ? AND versie = ?
+        ''', (ocr_versie, ai_versie, recept['id'], recept['versie'])).rowcount
+        if updated and result['raw_text'] != recept['ruwe_ocr_tekst']:
+            store_recipe_sources(conn, [(recept['id'], None, result['raw_text'])])
+        status = 'ongewijzigd'
+    else:
+        updated = update_recipe(conn, recept['id'], recipe_data, result['raw_text'],
+                                extractie_versies=(ocr_versie, ai_versie), versie=recept['versie'])
+        status = 'bijgewerkt'
+    # Intussen gewijzigd (bijv. door een import): de volgende run pakt het opnieuw op
+    return status if updated else 'conflict'
 
-            Als je bepaalde informatie niet kunt vinden, gebruik dan lege arrays.
-            Zorg ervoor dat de JSON valide is.
+def run_reprocess(workers=None, rate=None, batch_size=None, limit=None, progress=None, heartbeat=None):
+    """Herverwerk alle verouderde recepten in batches.
 
-            Hier is de ruwe OCR-tekst:
-            ```
-            {clean_raw_text}
-            ```
+    workers recepten tegelijk (OCR/Gemini), maximaal rate per minuut; elke batch
+    wordt in één transactie opgeslagen. progress(stats) en heartbeat() na elke batch.
+    """
+    workers = workers or REPROCESS_WORKERS
+    batch_size = batch_size or REPROCESS_BATCH_SIZE
+    limiter = RateLimiter(REPROCESS_RATE if rate is None else rate)
+    stats = {"bijgewerkt": 0, "ongewijzigd": 0, "geen_archief": 0, "mislukt": 0, "conflict": 0}
+    done = 0
+    after_id = 0
 
-            Geef ALLEEN de JSON output, zonder extra tekst of uitleg.
-            """
-            
-            # Maak de API call met retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = model.generate_content(prompt)
-                    
-                    if hasattr(response, 'text'):
-                        refined_text = response.text
-                    elif hasattr(response, 'parts') and response.parts:
-                        refined_text = "".join([part.text for part in response.parts if hasattr(part, 'text')])
-                    else:
-                        raise ValueError("No text in Gemini response")
-                    
-                    # Clean up de response
-                    json_text = refined_text.strip()
-                    if json_text.startswith("```json"):
-                        json_text = json_text[7:]
-                    if json_text.startswith("```"):
-                        json_text = json_text[3:]
-                    if json_text.endswith("```"):
-                        json_text = json_text[:-3]
-                    
-                    # Parse en valideer JSON
-                    recipe_data = json.loads(json_text.strip())
-                    
-                    # Valideer de structuur
-                    required_fields = ['titel', 'ingredienten', 'stappen', 'benodigdheden']
-                    for field in required_fields:
-                        if field not in recipe_data:
-                            recipe_data[field] = [] if field != 'titel' else 'Onbekend Recept'
-                    
-                    # Log success
-                    sentry_sdk.set_context("gemini_result", {
-                        "success": True,
-                        "attempt": attempt + 1,
-                        "recipe_title": recipe_data.get('titel', 'Unknown')
-                    })
-                    
-                    return recipe_data
-                    
-                except json.JSONDecodeError as json_error:
-                    logger.warning(f"JSON parsing error on attempt {attempt + 1}: {str(json_error)}")
-                    if attempt == max_retries - 1:
-                        sentry_sdk.capture_exception(json_error)
-                except Exception as api_error:
-                    logger.warning(f"Gemini API error on attempt {attempt + 1}: {str(api_error)}")
-                    if attempt == max_retries - 1:
-                        sentry_sdk.capture_exception(api_error)
-                    
-    except Exception as e:
-        logger.error(f"Gemini refinement error: {str(e)}")
-        sentry_sdk.capture_exception(e)
-        return None
+    logger.info(f"Reprocess started (workers={workers}, rate={rate if rate is not None else REPROCESS_RATE}/min)")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reprocess') as executor:
+        while limit is None or done < limit:
+            size = batch_size if limit is None else min(batch_size, limit - done)
+            recepten = find_stale_recipes(get_db_connection(), after_id, size)
+            if not recepten:
+                break
+            after_id = recepten[-1]['id']
+
+            results = list(executor.map(lambda recept: reextract_recipe(recept, limiter), recepten))
+            with db_write() as conn:
+                for recept, result in zip(recepten, results):
+                    stats[apply_reprocess_result(conn, recept, result)] += 1
+            invalidate_ingredient_cache()
+            done += len(recepten)
+
+            if progress:
+                progress(dict(stats))
+            if heartbeat:
+                heartbeat()
+
+    logger.info(f"Reprocess finished: {stats}")
+    return stats
+
+def enqueue_reprocess_job():
+    """Zet een herverwerking in de wachtrij (of geef de job die al loopt)"""
+    job_id = get_reprocess_status(get_db_connection())['job_id']
+    return job_id or enqueue_upload_job('reprocess', soort='reprocess')
+
+def process_reprocess_job(job):
+    """Upload job van het type 'reprocess': draait in de eigen reprocess worker"""
+    job_id = job['id']
+
+    def renew_lease():
+        update_upload_job(job_id, lease_until=time.time() + JOB_LEASE_SECONDS)
+
+    with sentry_sdk.start_transaction(op="reprocess", name="Reprocess Recipes"):
+        update_upload_job(job_id, stage='reprocess')
+        stats = run_reprocess(heartbeat=renew_lease)
+        update_upload_job(job_id, status='done', stage='done', lease_until=None,
+                          error=f"{stats['mislukt']} mislukt" if stats['mislukt'] else None)
+
+@app.cli.command('reprocess')
+@click.option('--workers', type=int, default=None, help='Aantal recepten tegelijk.')
+@click.option('--rate', type=float, default=None, help='Max recepten per minuut (0 = onbeperkt).')
+@click.option('--batch-size', type=int, default=None, help='Aantal recepten per transactie.')
+@click.option('--limit', type=int, default=None, help='Stop na dit aantal recepten.')
+@click.option('--background', is_flag=True, help='Als job in de upload wachtrij zetten.')
+def reprocess_command(workers, rate, batch_size, limit, background):
+    """Verwerk recepten opnieuw na een nieuwe OCR_VERSION, PROMPT_VERSION of OCR/Gemini configuratie"""
+    init_app()
+    status = get_reprocess_status(get_db_connection())
+    click.echo(
+        f"{status['totaal']} recepten: OCR verouderd {status['ocr_verouderd']}, "
+        f"AI verouderd {status['ai_verouderd']}"
+    )
+    if background:
+        click.echo(f"Job: {enqueue_reprocess_job()}")
+        return
+
+    def report(stats):
+        click.echo(', '.join(f"{naam}: {aantal}" for naam, aantal in stats.items()))
+
+    run_reprocess(workers, rate, batch_size, limit, progress=report)
+
+def ocr_text_accuracy(expected, actual):
+    """Tekengelijkenis (0-1) tussen verwachte en herkende tekst, witruimte genormaliseerd"""
+    expected = ' '.join(expected.split())
+    actual = ' '.join(actual.split())
+    if not expected:
+        return 1.0 if not actual else 0.0
+    return difflib.SequenceMatcher(None, expected, actual, autojunk=False).ratio()
+
+@app.cli.command('ocr-benchmark')
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.option('--max-dimension', 'max_dimensions', type=int, multiple=True,
+              help='Langste zijde om te testen (meerdere keren op te geven, 0 = origineel).')
+@click.option('--binarize/--no-binarize', 'with_binarize', default=False, help='Ook varianten met binarisatie testen.')
+@click.option('--deskew/--no-deskew', 'with_deskew', default=False, help='Ook varianten met rechtzetten testen.')
+def ocr_benchmark_command(path, max_dimensions, with_binarize, with_deskew):
+    """Vergelijk OCR nauwkeurigheid en tijd per preprocessing variant.
+
+    Elke afbeelding in PATH heeft een '<naam>.txt' met de verwachte tekst.
+    """
+    fixtures = []
+    for name in sorted(os.listdir(path)):
+        base, _ = os.path.splitext(name)
+        expected_path = os.path.join(path, base + '.txt')
+        if allowed_file(name) and os.path.exists(expected_path):
+            with open(expected_path, encoding='utf-8') as f:
+                fixtures.append((os.path.join(path, name), f.read()))
+    if not fixtures:
+        raise click.ClickException("Geen afbeeldingen met bijbehorende .txt gevonden")
+
+    variants = []
+    for max_dimension in max_dimensions or (0, OCR_MAX_DIMENSION):
+        for binarize in ((False, True) if with_binarize else (False,)):
+            for deskew in ((False, True) if with_deskew else (False,)):
+                variants.append({"max_dimension": max_dimension, "binarize": binarize, "deskew": deskew})
+
+    click.echo(f"{len(fixtures)} afbeeldingen, {len(variants)} varianten, OCR modus {OCR_MODE}")
+    click.echo(f"{'variant':<28} {'prep ms':>9} {'ocr ms':>9} {'totaal ms':>10} {'nauwk.':>7} {'conf.':>6}")
+    for variant in variants:
+        prep_ms = ocr_ms = accuracy = confidence = 0.0
+        for image_path, expected in fixtures:
+            start = time.perf_counter()
+            processed_img = preprocess_image_for_ocr(image_path, **variant)
+            prep_ms += (time.perf_counter() - start) * 1000
+            if processed_img is None:
+                continue
+
+            start = time.perf_counter()
+            best = max(run_ocr_passes(processed_img), key=lambda r: r['confidence'], default=None)
+            ocr_ms += (time.perf_counter() - start) * 1000
+            if best:
+                accuracy += ocr_text_accuracy(expected, best['text'])
+                confidence += best['confidence']
+
+        count = len(fixtures)
+        label = f"max{variant['max_dimension']} bin{int(variant['binarize'])} deskew{int(variant['deskew'])}"
+        click.echo(
+            f"{label:<28} {prep_ms / count:>9.0f} {ocr_ms / count:>9.0f} {(prep_ms + ocr_ms) / count:>10.0f} "
+            f"{accuracy / count:>7.3f} {confidence / count:>6.1f}"
+        )
+
+@app.cli.command('import-time')
+@click.option('--runs', type=int, default=3, help='Aantal metingen (de snelste telt).')
+@click.option('--top', type=int, default=15, help='Aantal modules in het overzicht.')
+@click.option('--init', 'with_init', is_flag=True, help='Ook create_app() meten.')
+def import_time_command(runs, top, with_init):
+    """Meet de opstarttijd van App.py met 'python -X importtime' in een nieuw proces"""
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    code = f"import sys; sys.path.insert(0, {module_dir!r}); import App"
+    if with_init:
+        code += "; App.create_app()"
+
+    best = None
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True, text=True, check=True
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        # Regels: "import time: self [us] | cumulative | imported package"
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules.append((int(cumulative), name.rstrip()))
+        app_us = next((us for us, name in modules if name.strip() == 'App'), 0)
+        if best is None or wall_ms < best[0]:
+            best = (wall_ms, app_us, modules)
+
+    wall_ms, app_us, modules = best
+    click.echo(f"Proces totaal: {wall_ms:.0f}ms, import App: {app_us / 1000:.0f}ms (snelste van {runs})")
+    click.echo(f"{'cumulatief ms':>14}  module")
+    for us, name in sorted(modules, reverse=True)[:top]:
+        click.echo(f"{us / 1000:>14.1f}  {name}")
+
+def wants_json_response():
+    """True als de client (bijv. fetch vanuit upload.html) JSON verwacht"""
+    best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
+    return best == 'application/json'
+
+# Keyset paginering voor de receptenlijst: ?after=<timestamp,id>&limit=
+INDEX_PAGE_SIZE = 24
+API_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_page_cursor(cursor):
+    """Parse een 'timestamp,id' cursor; ValueError bij een ongeldige cursor"""
+    timestamp, _, recept_id = cursor.rpartition(',')
+    if not timestamp:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return timestamp, int(recept_id)
+
+def fetch_recipe_page(conn, after=None, limit=INDEX_PAGE_SIZE):
+    """Eén pagina recepten (nieuwste eerst) plus de cursor voor de volgende pagina"""
+    with timed('recepten_db_query_seconds', query='recipe_page'):
+        if after:
+            timestamp, recept_id = parse_page_cursor(after)
+            rows = conn.execute('''
+                SELECT id, titel, timestamp, bestand_hash FROM recepten
+                WHERE (timestamp, id) < (?, ?)
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            ''', (timestamp, recept_id, limit + 1)).fetchall()
+        else:
+            rows = conn.execute('''
+                SELECT id, titel, timestamp, bestand_hash FROM recepten
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            ''', (limit + 1,)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{format_db_timestamp(last['timestamp'])},{last['id']}"
+    return [dict(row) for row in rows], next_cursor
+
+def get_page_limit(default):
+    """Lees ?limit= uit de request, begrensd op MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
 
 # Routes met error handling
 @app.route('/')
 def index():
+    after = request.args.get('after')
     try:
         conn = get_db_connection()
-        cursor = conn.execute('SELECT id, titel, timestamp FROM recepten ORDER BY timestamp DESC')
-        recepten_raw = cursor.fetchall()
-        conn.close()
-        
-        # Converteer timestamps naar datetime objecten
-        recepten = []
-        for recept in recepten_raw:
-            recept_dict = dict(recept)
-            # Parse timestamp string naar datetime object
-            if recept_dict['timestamp']:
-                try:
-                    recept_dict['timestamp'] = datetime.strptime(
-                        recept_dict['timestamp'], 
-                        '%Y-%m-%d %H:%M:%S'
-                    )
-                except ValueError:
-                    # Als parsing faalt, gebruik de string as-is
-                    pass
-            recepten.append(recept_dict)
+        # Timestamps komen via de DATETIME converter al als datetime binnen
+        recepten, next_cursor = fetch_recipe_page(conn, after, get_page_limit(INDEX_PAGE_SIZE))
         
-        return render_template('index.html', recepten=recepten)
+        return render_template('index.html', 
+                             recepten=recepten,
+                             next_cursor=next_cursor,
+                             is_vervolgpagina=bool(after))
+    except ValueError:
+        flash('Ongeldige pagina.')
+        return redirect(url_for('index'))
     except Exception as e:
         logger.error(f"Error loading index: {str(e)}")
         sentry_sdk.capture_exception(e)
@@ -373,109 +3953,130 @@ def index():
 def recept_detail(id):
     try:
         conn = get_db_connection()
-        recept = conn.execute('SELECT * FROM recepten WHERE id = ?', (id,)).fetchone()
-        conn.close()
+        with timed('recepten_db_query_seconds', query='recipe_detail'):
+            recept = conn.execute('SELECT id, titel, versie FROM recepten WHERE id = ?', (id,)).fetchone()
         
         if recept is None:
             sentry_sdk.capture_message(f"Recipe not found: {id}", level="warning")
             return render_template('404.html'), 404
         
-        # Parse JSON data met error handling
-        try:
-            ingredienten = json.loads(recept['ingredienten']) if recept['ingredienten'] else []
-            stappen = json.loads(recept['stappen']) if recept['stappen'] else []
-            benodigdheden = json.loads(recept['benodigdheden']) if recept['benodigdheden'] else []
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error for recipe {id}: {str(e)}")
-            sentry_sdk.capture_exception(e)
-            ingredienten = []
-            stappen = []
-            benodigdheden = []
+        # Populaire recepten komen uit de cache: geen JSON parsen of kaart renderen
+        kaart = get_recipe_card(id, recept['versie'])
+        if kaart is None:
+            with timed('recepten_db_query_seconds', query='recipe_card'):
+                recept = conn.execute(
+                    f'SELECT {RECIPE_CARD_COLUMNS} FROM recepten WHERE id = ?', (id,)
+                ).fetchone()
+            if recept is None:
+                return render_template('404.html'), 404
+            kaart = render_recipe_card(recept)
+            store_recipe_card(id, recept['versie'], kaart)
+        
+        # Niet in de kaart: de buren veranderen ook als dit recept zelf niet verandert
+        with timed('recepten_db_query_seconds', query='similar_recipes'):
+            vergelijkbaar = get_similar_recipes(conn, id)
         
-        return render_template('recept.html', 
-                             recept=recept, 
-                             ingredienten=ingredienten,
-                             stappen=stappen,
-                             benodigdheden=benodigdheden)
+        return render_template('recept.html', recept=recept, kaart=kaart, vergelijkbaar=vergelijkbaar)
     except Exception as e:
         logger.error(f"Error loading recipe {id}: {str(e)}")
         sentry_sdk.capture_exception(e)
         flash('Er is een fout opgetreden bij het laden van het recept.')
         return redirect(url_for('index'))
 
+FUZZY_SEARCH_FIELDS = {
+    'titel': ('titel',),
+    'ingredienten': ('ingredienten',),
+    'all': ('titel', 'ingredienten'),
+}
+
+def render_fuzzy_results(query, search_type):
+    """Zoekresultaten via de trigram index (titels en ingrediëntnamen)"""
+    recepten = fuzzy_search(query, FUZZY_SEARCH_FIELDS.get(search_type, FUZZY_SEARCH_FIELDS['all']))
+    if search_type != 'ingredienten':
+        for recept in recepten:
+            recept.pop('matching_ingredients')
+    
+    if sentry_tracing_active():
+        sentry_sdk.set_tag("search.query", query)
+        sentry_sdk.set_tag("search.type", search_type)
+        sentry_sdk.set_tag("search.fuzzy", True)
+        sentry_sdk.set_tag("search.results_count", len(recepten))
+    
+    return render_template('index.html',
+                         recepten=recepten,
+                         zoekterm=query,
+                         search_type=search_type,
+                         fuzzy=True)
+
 @app.route('/zoeken')
 def zoeken():
     query = request.args.get('q', '')
     search_type = request.args.get('type', 'all')  # 'all', 'titel', 'ingredienten'
+    fuzzy = request.args.get('fuzzy') == '1'
     
     if not query:
         return redirect(url_for('index'))
     
     try:
         with sentry_sdk.start_span(op="search", description=f"Search recipes: {query} (type: {search_type})"):
+            if fuzzy:
+                return render_fuzzy_results(query, search_type)
+            
             conn = get_db_connection()
             
-            # Bouw query op basis van zoektype
+            # Bouw FTS query op basis van zoektype
             if search_type == 'titel':
-                cursor = conn.execute('''
-                    SELECT DISTINCT id, titel, timestamp, ingredienten 
-                    FROM recepten 
-                    WHERE titel LIKE ?
-                    ORDER BY timestamp DESC
-                ''', (f'%{query}%',))
+                fts_query = build_fts_query(query, ['titel'])
             elif search_type == 'ingredienten':
-                cursor = conn.execute('''
-                    SELECT DISTINCT id, titel, timestamp, ingredienten 
-                    FROM recepten 
-                    WHERE ingredienten LIKE ?
-                    ORDER BY timestamp DESC
-                ''', (f'%{query}%',))
+                fts_query = build_fts_query(query, ['ingredienten'])
             else:  # 'all'
-                cursor = conn.execute('''
-                    SELECT DISTINCT id, titel, timestamp, ingredienten 
-                    FROM recepten 
-                    WHERE titel LIKE ? OR ingredienten LIKE ? OR stappen LIKE ?
-                    ORDER BY timestamp DESC
-                ''', (f'%{query}%', f'%{query}%', f'%{query}%'))
+                fts_query = build_fts_query(query, ['titel', 'ingredienten', 'stappen', 'benodigdheden'])
+            
+            with timed('recepten_search_seconds', kind='fts'):
+                if fts_query is None:
+                    recepten_raw = []
+                else:
+                    recepten_raw = conn.execute(f'''
+                        SELECT r.id, r.titel, r.timestamp, r.bestand_hash
+                        FROM recepten_fts
+                        JOIN recepten r ON r.id = recepten_fts.rowid
+                        WHERE recepten_fts MATCH ?
+                        ORDER BY bm25(recepten_fts, {', '.join(map(str, SEARCH_BM25_WEIGHTS))}), r.timestamp DESC
+                    ''', (fts_query,)).fetchall()
             
-            recepten_raw = cursor.fetchall()
-            conn.close()
+            # Gevonden ingrediënten per recept, uit de genormaliseerde tabel
+            matches = {}
+            if search_type == 'ingredienten' and recepten_raw:
+                terms = search_terms(query)
+                rows = conn.execute('''
+                    SELECT recept_id, naam, naam_norm
+                    FROM recept_ingredienten
+                    WHERE recept_id IN (SELECT value FROM json_each(?))
+                    ORDER BY id
+                ''', (json.dumps([r['id'] for r in recepten_raw]),)).fetchall()
+                for row in rows:
+                    if any(term in row['naam_norm'] for term in terms):
+                        matches.setdefault(row['recept_id'], []).append(row['naam'])
             
-            # Converteer timestamps en markeer gevonden ingrediënten
+            # Markeer gevonden ingrediënten
             recepten = []
             for recept in recepten_raw:
                 recept_dict = dict(recept)
                 
-                # Parse timestamp
-                if recept_dict['timestamp']:
-                    try:
-                        recept_dict['timestamp'] = datetime.strptime(
-                            recept_dict['timestamp'], 
-                            '%Y-%m-%d %H:%M:%S'
-                        )
-                    except ValueError:
-                        pass
-                
                 # Als we op ingrediënten zoeken, markeer welke ingrediënten matchen
-                if search_type == 'ingredienten' and recept_dict.get('ingredienten'):
-                    try:
-                        ingredienten_lijst = json.loads(recept_dict['ingredienten'])
-                        matching_ingredients = []
-                        
-                        for ingredient in ingredienten_lijst:
-                            ingredient_name = ingredient.get('naam', '').lower()
-                            if query.lower() in ingredient_name:
-                                matching_ingredients.append(ingredient.get('naam', ''))
-                        
-                        recept_dict['matching_ingredients'] = matching_ingredients
-                    except json.JSONDecodeError:
-                        recept_dict['matching_ingredients'] = []
+                if search_type == 'ingredienten':
+                    recept_dict['matching_ingredients'] = matches.get(recept_dict['id'], [])
                 
                 recepten.append(recept_dict)
             
-            sentry_sdk.set_tag("search.query", query)
-            sentry_sdk.set_tag("search.type", search_type)
-            sentry_sdk.set_tag("search.results_count", len(recepten))
+            # Niets exact gevonden: waarschijnlijk een typ- of OCR fout
+            if not recepten:
+                return render_fuzzy_results(query, search_type)
+            
+            if sentry_tracing_active():
+                sentry_sdk.set_tag("search.query", query)
+                sentry_sdk.set_tag("search.type", search_type)
+                sentry_sdk.set_tag("search.results_count", len(recepten))
             
             return render_template('index.html', 
                                  recepten=recepten, 
@@ -496,148 +4097,345 @@ def upload():
             with transaction:
                 # Validatie
                 if 'file' not in request.files:
-                    flash('Geen bestand geselecteerd')
-                    return redirect(request.url)
+                    return upload_error('Geen bestand geselecteerd')
                 
                 file = request.files['file']
                 
                 if file.filename == '':
-                    flash('Geen bestand geselecteerd')
-                    return redirect(request.url)
+                    return upload_error('Geen bestand geselecteerd')
                 
                 if file and allowed_file(file.filename):
                     # Beveilig bestandsnaam
-                    filename = secure_filename(file.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{timestamp}_{filename}"
-                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                    filename = archive_filename(file.filename)
+                    upload_stream = file.stream
+                    
+                    # Het bestand is tijdens het parsen al naar schijf gestreamd en gehasht
+                    if not upload_stream.is_image:
+                        return upload_error('Ongeldig bestandstype. Alleen afbeeldingen zijn toegestaan.')
                     
-                    # Sla bestand op
                     with sentry_sdk.start_span(op="file.save", description="Save uploaded file"):
-                        file.save(filepath)
+                        file_hash = upload_stream.sha256
+                        filepath = upload_stream.commit(filename)
                         
                         # Log file info
-                        file_size = os.path.getsize(filepath)
                         sentry_sdk.set_context("upload_info", {
                             "filename": filename,
-                            "size": file_size,
-                            "type": file.content_type
+                            "size": upload_stream.size,
+                            "type": file.content_type,
+                            "image_type": upload_stream.image_type
                         })
                     
-                    # Process met OCR
-                    raw_text = extract_text_from_image(filepath)
+                    # Dezelfde foto is al eerder verwerkt: geef het bestaande recept terug
+                    existing_id = find_recipe_by_hash(get_db_connection(), file_hash)
+                    if existing_id is not None:
+                        logger.info(f"Duplicate upload {filename} matches recipe {existing_id}")
+                        recipe_url = url_for('recept_detail', id=existing_id)
+                        if wants_json_response():
+                            return jsonify({
+                                "status": "done",
+                                "duplicate": True,
+                                "recept_id": existing_id,
+                                "url": recipe_url
+                            }), 200
+                        flash('Dit recept is al eerder geüpload.')
+                        return redirect(recipe_url)
                     
-                    if raw_text:
-                        # Verfijn met AI
-                        recipe_data = refine_text_with_gemini(raw_text)
-                        
-                        if recipe_data:
-                            # Sla op in database
-                            with sentry_sdk.start_span(op="db.save", description="Save recipe to database"):
-                                conn = get_db_connection()
-                                cursor = conn.cursor()
-                                
-                                ingredienten_json = json.dumps(recipe_data.get('ingredienten', []), ensure_ascii=False)
-                                stappen_json = json.dumps(recipe_data.get('stappen', []), ensure_ascii=False)
-                                benodigdheden_json = json.dumps(recipe_data.get('benodigdheden', []), ensure_ascii=False)
-                                
-                                cursor.execute('''
-                                    INSERT INTO recepten (titel, ingredienten, stappen, benodigdheden, 
-                                                        originele_bestandsnaam, ruwe_ocr_tekst)
-                                    VALUES (?, ?, ?, ?, ?, ?)
-                                ''', (recipe_data.get('titel', 'Onbekend Recept'), 
-                                      ingredienten_json, 
-                                      stappen_json, 
-                                      benodigdheden_json,
-                                      filename, 
-                                      raw_text))
-                                
-                                conn.commit()
-                                recipe_id = cursor.lastrowid
-                                conn.close()
-                            
-                            # Verplaats naar archief
-                            archive_path = os.path.join(ARCHIVE_FOLDER, filename)
-                            shutil.move(filepath, archive_path)
-                            
-                            # Log success
-                            logger.info(f"Recipe successfully added: {recipe_data.get('titel')} (ID: {recipe_id})")
-                            sentry_sdk.capture_message(
-                                f"Recipe uploaded successfully: {recipe_data.get('titel')}",
-                                level="info"
-                            )
-                            
-                            flash('Recept succesvol toegevoegd!')
-                            return redirect(url_for('recept_detail', id=recipe_id))
-                        else:
-                            flash('Kon geen recept informatie vinden in de afbeelding')
-                            os.remove(filepath)
-                    else:
-                        flash('Kon geen tekst vinden in de afbeelding')
-                        os.remove(filepath)
+                    # OCR, AI en opslag gebeuren in de upload workers
+                    job_id = enqueue_upload_job(filename, file.content_type, file_hash=file_hash)
+                    logger.info(f"Upload queued: {filename} (job: {job_id})")
+                    
+                    status_url = url_for('api_job_status', job_id=job_id)
+                    if wants_json_response():
+                        return jsonify({
+                            "job_id": job_id,
+                            "status": "queued",
+                            "status_url": status_url
+                        }), 202
+                    return render_template('upload.html', job_id=job_id, status_url=status_url), 202
                 else:
-                    flash('Ongeldig bestandstype. Alleen afbeeldingen zijn toegestaan.')
+                    return upload_error('Ongeldig bestandstype. Alleen afbeeldingen zijn toegestaan.')
                     
+        except RequestEntityTooLarge:
+            # Afgehandeld door de 413 error handler
+            raise
         except Exception as e:
             logger.error(f"Upload error: {str(e)}")
             sentry_sdk.capture_exception(e)
-            flash('Er is een fout opgetreden bij het verwerken van het bestand.')
             
             # Cleanup bij error
             try:
-                if 'filepath' in locals() and os.path.exists(filepath):
-                    os.remove(filepath)
+                if 'filepath' in locals():
+                    remove_upload_file(filepath, file_hash)
             except:
                 pass
+            
+            return upload_error('Er is een fout opgetreden bij het verwerken van het bestand.', 500)
         
         finally:
             transaction.finish()
     
     return render_template('upload.html')
 
+def upload_error(message, status=400):
+    """Meld een upload fout als JSON of als flash bericht"""
+    if wants_json_response():
+        return jsonify({"error": message}), status
+    flash(message)
+    return redirect(request.url)
+
+# Placeholder terwijl een thumbnail op de achtergrond gemaakt wordt
+THUMBNAIL_PLACEHOLDER = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="4" height="3" viewBox="0 0 4 3">'
+    '<rect width="4" height="3" fill="#eeeeee"/></svg>'
+)
+
+@app.route('/foto/<file_hash>/<maat>')
+def foto(file_hash, maat):
+    """Verkleinde foto van een recept (maat 'klein' of 'groot'), lang cachebaar"""
+    pixels = THUMBNAIL_SIZES.get(maat)
+    if pixels is None or not re.fullmatch(r'[0-9a-f]{64}', file_hash):
+        return '', 404
+
+    path = thumbnail_path_for(file_hash, pixels)
+    if not os.path.exists(path):
+        if find_archived_original(file_hash) is None:
+            return '', 404
+        # Niet in de request zelf maken: placeholder tot de achtergrond thread klaar is
+        request_thumbnails(file_hash)
+        response = app.response_class(THUMBNAIL_PLACEHOLDER, mimetype='image/svg+xml')
+        response.headers['Cache-Control'] = 'no-store'
+        response.headers['Retry-After'] = '5'
+        return response
+
+    # Conditional GET (ETag/If-None-Match) en Range requests via send_file
+    response = send_file(
+        os.path.abspath(path),
+        mimetype=f"image/{thumbnail_format()}",
+        conditional=True,
+        etag=f"{file_hash}-{pixels}-{thumbnail_format()}",
+        max_age=THUMBNAIL_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Status van een upload job, wordt gepolld door upload.html"""
+    try:
+        job = get_upload_job(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        result = {
+            "job_id": job['id'],
+            "status": job['status'],
+            "stage": job['stage'],
+            "attempts": job['attempts'],
+            "recept_id": job['recept_id'],
+            "error": job['error'],
+            "created_at": format_db_timestamp(job['created_at']),
+            "updated_at": format_db_timestamp(job['updated_at'])
+        }
+        if job['status'] == 'done' and job['recept_id'] is not None:
+            result['url'] = url_for('recept_detail', id=job['recept_id'])
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"API job status error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/upload/batch', methods=['POST'])
+def api_upload_batch():
+    """Upload meerdere receptfoto's tegelijk; verwerking gebeurt als één import batch"""
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files:
+        return jsonify({"error": "Geen bestanden geselecteerd"}), 400
+    
+    batch_id = f"upload-{uuid.uuid4().hex}"
+    accepted = []
+    rejected = []
+    saved_files = []
+    
+    try:
+        with sentry_sdk.start_span(op="file.save", description="Save batch upload"):
+            for file in files:
+                # Elk bestand is tijdens het parsen al naar schijf gestreamd, gehasht en herkend
+                upload_stream = file.stream
+                if not allowed_file(file.filename) or not upload_stream.is_image:
+                    rejected.append({"bron": file.filename, "error": "Ongeldig bestandstype"})
+                    continue
+                filename = archive_filename(file.filename)
+                file_hash = upload_stream.sha256
+                filepath = upload_stream.commit(filename)
+                saved_files.append((filepath, file_hash))
+                accepted.append((file.filename, filepath, filename))
+        
+        if not accepted:
+            return jsonify({"error": "Geen geldige afbeeldingen", "rejected": rejected}), 400
+        
+        add_import_items(batch_id, accepted)
+        job_id = enqueue_upload_job(batch_id, soort='batch')
+        logger.info(f"Batch upload queued: {len(accepted)} files (batch: {batch_id}, job: {job_id})")
+        
+        return jsonify({
+            "batch_id": batch_id,
+            "job_id": job_id,
+            "accepted": len(accepted),
+            "rejected": rejected,
+            "status_url": url_for('api_upload_batch_status', batch_id=batch_id)
+        }), 202
+    except Exception as e:
+        logger.error(f"Batch upload error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        for filepath, file_hash in saved_files:
+            remove_upload_file(filepath, file_hash)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/reprocess', methods=['GET', 'POST'])
+def api_reprocess():
+    """Status van de herverwerking; POST start een job voor alle verouderde recepten"""
+    try:
+        if request.method == 'POST':
+            job_id = enqueue_reprocess_job()
+            return jsonify({
+                "job_id": job_id,
+                "status_url": url_for('api_job_status', job_id=job_id)
+            }), 202
+        return jsonify(get_reprocess_status(get_db_connection()))
+    except Exception as e:
+        logger.error(f"API reprocess error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/upload/batch/<batch_id>')
+def api_upload_batch_status(batch_id):
+    """Voortgang per bestand van een batch upload of import"""
+    try:
+        status = get_import_batch_status(batch_id)
+        if status['totaal'] == 0:
+            return jsonify({"error": "Batch not found"}), 404
+        return jsonify(status)
+    except Exception as e:
+        logger.error(f"API batch status error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route('/api/recepten')
 def api_recepten():
     try:
         conn = get_db_connection()
-        recepten = conn.execute('SELECT id, titel, timestamp FROM recepten ORDER BY timestamp DESC').fetchall()
-        conn.close()
+        recepten, next_cursor = fetch_recipe_page(
+            conn, request.args.get('after'), get_page_limit(API_PAGE_SIZE)
+        )
+        for recept in recepten:
+            recept['timestamp'] = format_db_timestamp(recept['timestamp'])
         
-        return jsonify([dict(r) for r in recepten])
+        return jsonify({
+            "recepten": recepten,
+            "count": len(recepten),
+            "next": next_cursor
+        })
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
         logger.error(f"API error: {str(e)}")
         sentry_sdk.capture_exception(e)
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/api/recepten/<int:id>/bron')
+def api_recept_bron(id):
+    """Ruwe OCR tekst en originele bestandsnaam, alleen op aanvraag ("Toon ruwe OCR tekst")"""
+    try:
+        bron = get_recipe_source(get_db_connection(), id)
+        if bron is None:
+            return jsonify({"error": "Recipe not found"}), 404
+        return jsonify(bron)
+    except Exception as e:
+        logger.error(f"Error loading source of recipe {id}: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/export')
+def api_export():
+    """Download alle recepten als NDJSON (?gzip=1 voor een .ndjson.gz bestand)"""
+    compress = request.args.get('gzip') == '1'
+    chunks = iter_export_chunks(iter_recipe_export())
+    filename = f"recepten-{datetime.now().strftime('%Y%m%d')}.ndjson"
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+
+    response = app.response_class(
+        chunks, mimetype='application/gzip' if compress else 'application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/import', methods=['POST'])
+def api_import():
+    """Importeer een export (als bestand 'file' of als request body); upsert op content hash"""
+    try:
+        if request.mimetype == 'multipart/form-data':
+            if 'file' not in request.files:
+                return jsonify({"error": "Geen bestand geselecteerd"}), 400
+            stream = request.files['file'].stream
+        else:
+            stream = request.stream
+        return jsonify(import_recipes(stream))
+    except RequestEntityTooLarge:
+        raise
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Recipe import error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route('/api/ingredienten')
 def api_ingredienten():
     """API endpoint om alle unieke ingrediënten op te halen voor autocomplete"""
     try:
-        conn = get_db_connection()
-        recepten = conn.execute('SELECT ingredienten FROM recepten').fetchall()
-        conn.close()
+        cache = get_ingredient_vocabulary()
         
-        # Verzamel alle unieke ingrediënten
-        alle_ingredienten = set()
-        for recept in recepten:
-            if recept['ingredienten']:
-                try:
-                    ingredienten_lijst = json.loads(recept['ingredienten'])
-                    for ingredient in ingredienten_lijst:
-                        if 'naam' in ingredient:
-                            alle_ingredienten.add(ingredient['naam'].lower())
-                except json.JSONDecodeError:
-                    continue
+        # Conditionele GET: geen body als de browser deze versie al heeft
+        if request.if_none_match.contains(cache['etag']):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(cache['body'], mimetype='application/json')
         
-        # Sorteer alfabetisch
-        ingredienten_sorted = sorted(list(alle_ingredienten))
+        response.set_etag(cache['etag'])
+        response.cache_control.public = True
+        response.cache_control.max_age = API_CACHE_MAX_AGE
+        return response
         
-        return jsonify({
-            "ingredienten": ingredienten_sorted,
-            "count": len(ingredienten_sorted)
+    except Exception as e:
+        logger.error(f"API ingredienten error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/ingredienten/suggest')
+def api_ingredienten_suggest():
+    """Autocomplete suggesties voor een prefix, gerangschikt op gebruik"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+    
+    try:
+        suggesties = suggest_ingredients(query, limit)
+        
+        response = jsonify({
+            "q": query,
+            "ingredienten": suggesties,
+            "count": len(suggesties)
         })
+        response.cache_control.public = True
+        response.cache_control.max_age = API_CACHE_MAX_AGE
+        return response
         
     except Exception as e:
-        logger.error(f"API ingredienten error: {str(e)}")
+        logger.error(f"API ingredienten suggest error: {str(e)}")
         sentry_sdk.capture_exception(e)
         return jsonify({"error": "Internal server error"}), 500
 
@@ -647,28 +4445,154 @@ def geavanceerd_zoeken():
     try:
         # Haal alle unieke ingrediënten op voor checkboxes
         conn = get_db_connection()
-        recepten = conn.execute('SELECT ingredienten FROM recepten').fetchall()
-        conn.close()
-        
-        alle_ingredienten = set()
-        for recept in recepten:
-            if recept['ingredienten']:
-                try:
-                    ingredienten_lijst = json.loads(recept['ingredienten'])
-                    for ingredient in ingredienten_lijst:
-                        if 'naam' in ingredient:
-                            alle_ingredienten.add(ingredient['naam'])
-                except json.JSONDecodeError:
-                    continue
+        ingredienten = get_distinct_ingredients(conn)
         
         return render_template('geavanceerd_zoeken.html', 
-                             ingredienten=sorted(list(alle_ingredienten)))
+                             ingredienten=ingredienten)
     except Exception as e:
         logger.error(f"Advanced search error: {str(e)}")
         sentry_sdk.capture_exception(e)
         flash('Er is een fout opgetreden.')
         return redirect(url_for('index'))
 
+def get_list_arg(name):
+    """Lijst uit herhaalde en/of komma-gescheiden query parameters (?x=a&x=b,c)"""
+    values = []
+    for value in request.args.getlist(name):
+        values.extend(part.strip() for part in value.split(',') if part.strip())
+    return values
+
+@app.route('/zoeken/ingredienten')
+def ingredienten_zoeken():
+    """Zoek op meerdere ingrediënten (formulier van de geavanceerde zoekpagina)"""
+    ingredienten = get_list_arg('ingredient')
+    zonder = get_list_arg('zonder')
+    modus = request.args.get('modus', 'alle')  # 'alle': recept bevat alles, 'enkele': wat ik in huis heb
+    
+    if not ingredienten:
+        return redirect(url_for('geavanceerd_zoeken'))
+    
+    try:
+        with sentry_sdk.start_span(op="search", description=f"Ingredient search ({modus})"):
+            if modus == 'enkele':
+                recepten, total = search_by_ingredients(any_of=ingredienten, exclude=zonder)
+            else:
+                recepten, total = search_by_ingredients(include=ingredienten, exclude=zonder)
+            
+            zoekterm = ', '.join(ingredienten)
+            if zonder:
+                zoekterm += f" zonder {', '.join(zonder)}"
+            
+            if sentry_tracing_active():
+                sentry_sdk.set_tag("search.type", "ingredienten")
+                sentry_sdk.set_tag("search.results_count", total)
+            
+            return render_template('index.html',
+                                 recepten=recepten,
+                                 zoekterm=zoekterm,
+                                 search_type='ingredienten')
+    except Exception as e:
+        logger.error(f"Ingredient search error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        flash('Er is een fout opgetreden bij het zoeken.')
+        return redirect(url_for('index'))
+
+@app.route('/api/zoeken/ingredienten')
+def api_zoeken_ingredienten():
+    """Recepten met ?include=, ?any= en zonder ?exclude= ingrediënten, gerangschikt op dekking"""
+    include = get_list_arg('include')
+    exclude = get_list_arg('exclude')
+    any_of = get_list_arg('any')
+    if not include and not any_of:
+        return jsonify({"error": "Geef minimaal één ingrediënt op via include of any"}), 400
+    
+    try:
+        min_coverage = request.args.get('min_coverage', 0.0, type=float)
+        recepten, total = search_by_ingredients(
+            include, exclude, any_of,
+            limit=get_page_limit(INGREDIENT_SEARCH_DEFAULT_LIMIT),
+            min_coverage=min_coverage
+        )
+        for recept in recepten:
+            recept['timestamp'] = format_db_timestamp(recept['timestamp'])
+        
+        return jsonify({
+            "recepten": recepten,
+            "count": total
+        })
+    except Exception as e:
+        logger.error(f"API ingredient search error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/zoeken/fuzzy')
+def api_zoeken_fuzzy():
+    """Typfout-tolerant zoeken in titels en ingrediëntnamen: ?q=&type=&limit="""
+    query = request.args.get('q', '')
+    search_type = request.args.get('type', 'all')
+    if not search_terms(query):
+        return jsonify({"error": "Geen zoekterm opgegeven"}), 400
+    
+    try:
+        recepten = fuzzy_search(
+            query,
+            FUZZY_SEARCH_FIELDS.get(search_type, FUZZY_SEARCH_FIELDS['all']),
+            limit=get_page_limit(FUZZY_DEFAULT_LIMIT)
+        )
+        for recept in recepten:
+            recept['timestamp'] = format_db_timestamp(recept['timestamp'])
+        
+        return jsonify({
+            "recepten": recepten,
+            "count": len(recepten)
+        })
+    except Exception as e:
+        logger.error(f"API fuzzy search error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/boodschappenlijst')
+def api_boodschappenlijst():
+    """Boodschappenlijst voor ?ids=1,2,3 met optioneel ?porties= (één getal, of één per recept)"""
+    try:
+        ids = [int(value) for value in get_list_arg('ids')]
+        porties = [float(value) for value in get_list_arg('porties')]
+    except ValueError:
+        return jsonify({"error": "ids en porties moeten getallen zijn"}), 400
+    if not ids:
+        return jsonify({"error": "Geef minimaal één recept op via ids"}), 400
+    if len(ids) > SHOPPING_LIST_MAX_RECIPES:
+        return jsonify({"error": f"Maximaal {SHOPPING_LIST_MAX_RECIPES} recepten per lijst"}), 400
+    if len(porties) not in (0, 1, len(ids)) or any(p <= 0 for p in porties):
+        return jsonify({"error": "Geef één aantal porties, of één per recept"}), 400
+
+    # Zonder porties de hoeveelheden zoals in het recept
+    if len(porties) == 1:
+        porties = porties * len(ids)
+    factors = [p / SHOPPING_LIST_DEFAULT_PORTIES for p in porties] or [1.0] * len(ids)
+
+    try:
+        conn = get_db_connection()
+        gevonden = {row['id'] for row in conn.execute(
+            f"SELECT id FROM recepten WHERE id IN ({','.join('?' * len(set(ids)))})", sorted(set(ids))
+        )}
+        items = build_shopping_list(conn, list(zip(ids, factors)))
+        return jsonify({
+            "recepten": [recept_id for recept_id in ids if recept_id in gevonden],
+            "niet_gevonden": sorted(set(ids) - gevonden),
+            "items": items,
+            "count": len(items)
+        })
+    except Exception as e:
+        logger.error(f"API shopping list error: {str(e)}")
+        sentry_sdk.capture_exception(e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/metrics')
+def metrics():
+    """Metrics van dit proces in Prometheus tekstformaat"""
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/health')
 def health_check():
     """Health check endpoint voor monitoring"""
@@ -676,7 +4600,6 @@ def health_check():
         # Check database connection
         conn = get_db_connection()
         conn.execute('SELECT 1')
-        conn.close()
         
         # Check Tesseract
         pytesseract.get_tesseract_version()
@@ -684,7 +4607,10 @@ def health_check():
         return jsonify({
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
-            "version": os.getenv("SENTRY_RELEASE", "1.0.0")
+            "version": os.getenv("SENTRY_RELEASE", "1.0.0"),
+            "db_pool": get_db_pool_stats(),
+            "gemini": get_gemini_metrics(),
+            "recipe_cards": get_recipe_card_stats()
         })
     except Exception as e:
         sentry_sdk.capture_exception(e)
@@ -704,10 +4630,21 @@ def internal_error(error):
     logger.error(f"Internal server error: {str(error)}")
     return render_template('500.html'), 500
 
+def format_size(size):
+    """Aantal bytes als leesbare grootte voor meldingen: 16MB, 1GB"""
+    for unit, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if size >= factor:
+            return f"{round(size / factor, 1):g}{unit}"
+    return f"{size}B"
+
 @app.errorhandler(413)
 def request_entity_too_large(error):
-    flash('Bestand is te groot. Maximum grootte is 16MB.')
-    return redirect(request.url)
+    # Eén foto boven MAX_FILE_SIZE (ook binnen een batch), of de hele request boven de limiet van het endpoint
+    for upload in request.__dict__.get('_streaming_uploads', ()):
+        if upload.size > upload.max_size:
+            return upload_error(f'Bestand is te groot. Maximum grootte is {format_size(upload.max_size)} per bestand.', 413)
+    limit = request.max_content_length or MAX_FILE_SIZE
+    return upload_error(f'Bestand is te groot. Maximum grootte is {format_size(limit)}.', 413)
 
 # Test route voor Sentry (alleen in development)
 if app.debug:
@@ -717,4 +4654,4 @@ if app.debug:
         division_by_zero = 1 / 0
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,574 @@
+"""Benchmark suite voor de recepten app.
+
+Genereert synthetische databases met recepten, stuurt de belangrijkste
+endpoints aan via Flask's test client met meerdere gelijktijdige clients en
+vervangt Tesseract en Gemini door deterministische lokale stand-ins, zodat een
+run offline werkt. Elke corpusgrootte draait in een eigen proces.
+
+    python benchmark.py run --sizes 1000,10000,100000 --save-baseline bench/baseline.json
+    python benchmark.py run --sizes 1000,10000,100000 --baseline bench/baseline.json
+    python benchmark.py cold-columns --size 100000
+"""
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORK_DIR = os.path.join(MODULE_DIR, 'bench')
+DEFAULT_ENDPOINTS = (
+    'index', 'zoeken', 'api_ingredienten', 'geavanceerd_zoeken',
+    'zoeken_ingredienten', 'zoeken_fuzzy', 'upload'
+)
+
+# Woordenlijsten voor het synthetische corpus
+INGREDIENTEN = [
+    ('bloem', 'gram'), ('suiker', 'gram'), ('boter', 'gram'), ('eieren', 'stuks'), ('melk', 'ml'),
+    ('zout', 'snufje'), ('peper', 'snufje'), ('olijfolie', 'el'), ('knoflook', 'teentjes'), ('ui', 'stuks'),
+    ('tomaten', 'stuks'), ('paprika', 'stuks'), ('courgette', 'stuks'), ('aubergine', 'stuks'), ('wortel', 'stuks'),
+    ('aardappelen', 'gram'), ('rijst', 'gram'), ('pasta', 'gram'), ('spaghetti', 'gram'), ('kipfilet', 'gram'),
+    ('gehakt', 'gram'), ('zalm', 'gram'), ('garnalen', 'gram'), ('spekjes', 'gram'), ('kaas', 'gram'),
+    ('parmezaan', 'gram'), ('room', 'ml'), ('yoghurt', 'ml'), ('citroen', 'stuks'), ('limoen', 'stuks'),
+    ('peterselie', 'el'), ('basilicum', 'el'), ('tijm', 'tl'), ('rozemarijn', 'takjes'), ('oregano', 'tl'),
+    ('komijn', 'tl'), ('kerriepoeder', 'tl'), ('paprikapoeder', 'tl'), ('kaneel', 'tl'), ('vanillesuiker', 'zakjes'),
+    ('bakpoeder', 'tl'), ('gist', 'gram'), ('honing', 'el'), ('sojasaus', 'el'), ('bouillon', 'ml'),
+    ('kokosmelk', 'ml'), ('spinazie', 'gram'), ('champignons', 'gram'), ('prei', 'stuks'), ('broccoli', 'gram'),
+    ('bloemkool', 'stuks'), ('erwten', 'gram'), ('mais', 'gram'), ('kikkererwten', 'gram'), ('linzen', 'gram'),
+    ('appels', 'stuks'), ('peren', 'stuks'), ('aardbeien', 'gram'), ('bananen', 'stuks'), ('rozijnen', 'gram'),
+    ('walnoten', 'gram'), ('amandelen', 'gram'), ('chocolade', 'gram'), ('cacao', 'el'), ('mosterd', 'tl'),
+    ('azijn', 'el'), ('mayonaise', 'el'), ('gember', 'cm'), ('rode peper', 'stuks'), ('sjalotten', 'stuks'),
+]
+GERECHTEN = [
+    'soep', 'stoofpot', 'ovenschotel', 'taart', 'cake', 'salade', 'risotto', 'curry', 'quiche', 'lasagne',
+    'pannenkoeken', 'wraps', 'roerbak', 'stamppot', 'muffins', 'koekjes', 'brood', 'saus', 'burgers', 'tajine',
+]
+BIJVOEGLIJK = [
+    'romige', 'pittige', 'snelle', 'klassieke', 'zomerse', 'herfstige', 'Italiaanse', 'Franse', 'Indiase',
+    'Marokkaanse', 'oma\'s', 'vegetarische', 'makkelijke', 'feestelijke', 'krokante', 'frisse',
+]
+WERKWOORDEN = ['Snijd', 'Bak', 'Kook', 'Meng', 'Roer', 'Verwarm', 'Voeg', 'Rooster', 'Pureer', 'Klop']
+BENODIGDHEDEN = ['Mengkom', 'Garde', 'Koekenpan', 'Braadpan', 'Ovenschaal', 'Snijplank', 'Staafmixer', 'Bakvorm', 'Zeef']
+
+def synthetic_recipe(rng):
+    """Een realistisch recept: 4-14 ingrediënten met hoeveelheid en eenheid"""
+    ingredienten = []
+    for naam, eenheid in rng.sample(INGREDIENTEN, rng.randint(4, 14)):
+        if eenheid in ('gram', 'ml'):
+            hoeveelheid = str(rng.choice([25, 50, 100, 150, 200, 250, 300, 400, 500]))
+        else:
+            hoeveelheid = str(rng.randint(1, 4))
+        ingredienten.append({"hoeveelheid": hoeveelheid, "eenheid": eenheid, "naam": naam})
+
+    hoofd = ingredienten[0]['naam']
+    titel = f"{rng.choice(BIJVOEGLIJK).capitalize()} {rng.choice(GERECHTEN)} met {hoofd}"
+    stappen = []
+    for nummer in range(1, rng.randint(3, 8) + 1):
+        ingredient = rng.choice(ingredienten)['naam']
+        stappen.append(f"Stap {nummer}: {rng.choice(WERKWOORDEN)} de {ingredient} ongeveer {rng.randint(2, 30)} minuten.")
+    return {
+        "titel": titel,
+        "ingredienten": ingredienten,
+        "stappen": stappen,
+        "benodigdheden": rng.sample(BENODIGDHEDEN, rng.randint(1, 4)),
+    }
+
+def recipe_as_text(recipe):
+    """De tekst zoals die van een receptfoto gelezen zou worden"""
+    lines = [recipe['titel'], '', 'Ingrediënten']
+    lines += [f"{i['hoeveelheid']} {i['eenheid']} {i['naam']}" for i in recipe['ingredienten']]
+    lines += ['', 'Bereiding'] + recipe['stappen']
+    return '\n'.join(lines)
+
+def generate_corpus(App, size, seed, batch_size=1000):
+    """Vul de (lege) database van de app met size synthetische recepten"""
+    rng = random.Random(seed)
+    for start in range(0, size, batch_size):
+        with App.db_write() as conn:
+            for i in range(start, min(size, start + batch_size)):
+                recipe = synthetic_recipe(rng)
+                App.insert_recipe(conn, recipe, f"bench-{i}.jpg", recipe_as_text(recipe),
+                                  update_similar=False)
+    with App.db_write() as conn:
+        App.rebuild_similar_recipes(conn)
+    App.invalidate_ingredient_cache()
+
+# Deterministische stand-ins voor Tesseract en Gemini
+class TesseractStandIn:
+    """Vervangt pytesseract: 'herkent' een recept dat afhangt van de pixels van de afbeelding"""
+
+    class Output:
+        DICT = 'dict'
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_tesseract_version(self):
+        return 'stand-in'
+
+    def image_to_data(self, image, lang=None, output_type=None):
+        time.sleep(self.delay)
+        with open(image, 'rb') as f:
+            seed = hashlib.sha256(f.read()).hexdigest()
+        text = recipe_as_text(synthetic_recipe(random.Random(seed)))
+
+        data = {key: [] for key in ('text', 'conf', 'page_num', 'block_num', 'par_num', 'line_num')}
+        for block, paragraph in enumerate(text.split('\n\n'), start=1):
+            for line_num, line in enumerate(paragraph.splitlines(), start=1):
+                for word in line.split():
+                    data['text'].append(word)
+                    data['conf'].append('91')
+                    data['page_num'].append(1)
+                    data['block_num'].append(block)
+                    data['par_num'].append(1)
+                    data['line_num'].append(line_num)
+        return data
+
+class GeminiResponseStandIn:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+class GeminiStandIn:
+    """Vervangt het Gemini model: geeft recept JSON terug die afhangt van de prompt"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def generate_content(self, prompt):
+        time.sleep(self.delay)
+        rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        return GeminiResponseStandIn(json.dumps(synthetic_recipe(rng), ensure_ascii=False))
+
+def install_stand_ins(App, ocr_delay, ai_delay):
+    App.pytesseract = TesseractStandIn(ocr_delay)
+    App._gemini_client.update(
+        pid=os.getpid(),
+        model=GeminiStandIn(ai_delay),
+        executor=ThreadPoolExecutor(max_workers=App.GEMINI_MAX_CONCURRENCY, thread_name_prefix='gemini')
+    )
+
+def synthetic_photo(index, seed):
+    """Unieke PNG per upload (zelfde index en seed geven dezelfde bytes)"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(f"{seed}-{index}")
+    img = Image.new('L', (1200, 1600), 255)
+    draw = ImageDraw.Draw(img)
+    for line in range(40):
+        y = 80 + line * 36
+        x = 60
+        while x < 1100:
+            width = rng.randint(20, 120)
+            draw.rectangle((x, y, x + width, y + 18), fill=rng.randint(0, 60))
+            x += width + rng.randint(10, 30)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+# Requests per endpoint
+def build_scenarios(seed, upload_seed, upload_jobs):
+    """Scenario per endpoint; upload_jobs krijgt job_id -> tijdstip van de 202 response"""
+    rng = random.Random(seed)
+    namen = [naam for naam, _ in INGREDIENTEN]
+    woorden = GERECHTEN + namen
+    upload_counter = iter(range(10 ** 9))
+    upload_lock = threading.Lock()
+
+    def upload(client):
+        with upload_lock:
+            index = next(upload_counter)
+        data = {'file': (io.BytesIO(synthetic_photo(index, upload_seed)), f"foto-{index}.png")}
+        response = client.post('/upload', data=data, content_type='multipart/form-data',
+                               headers={'Accept': 'application/json'})
+        if response.status_code == 202:
+            upload_jobs[response.get_json()['job_id']] = time.perf_counter()
+        return response
+
+    def typo(woord):
+        positie = rng.randrange(len(woord))
+        return woord[:positie] + woord[positie + 1:]
+
+    return {
+        'index': lambda client: client.get('/'),
+        'zoeken': lambda client: client.get('/zoeken', query_string={'q': rng.choice(woorden)}),
+        'api_ingredienten': lambda client: client.get('/api/ingredienten'),
+        'geavanceerd_zoeken': lambda client: client.get('/geavanceerd-zoeken'),
+        'zoeken_ingredienten': lambda client: client.get('/api/zoeken/ingredienten', query_string={
+            'include': ','.join(rng.sample(namen, 2)), 'exclude': rng.choice(namen)
+        }),
+        'zoeken_fuzzy': lambda client: client.get('/api/zoeken/fuzzy', query_string={'q': typo(rng.choice(woorden))}),
+        'upload': upload,
+    }
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentiel van een gesorteerde lijst"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies, errors, wall):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall > 0 else 0.0,
+    }
+
+def run_load(App, scenario, total, concurrency):
+    """Voer total requests uit met concurrency gelijktijdige clients; geeft (latencies, errors, wall)"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client_loop():
+        nonlocal errors
+        client = App.app.test_client()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            start = time.perf_counter()
+            response = scenario(client)
+            duration = time.perf_counter() - start
+            with lock:
+                latencies.append(duration)
+                if response.status_code >= 400:
+                    errors += 1
+            response.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, name=f"bench-client-{i + 1}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+def measure_endpoint(App, scenario, requests, concurrency, warmup):
+    """Warmup met tracemalloc (koude caches, piekgeheugen), daarna de load zonder tracemalloc"""
+    tracemalloc.start()
+    client = App.app.test_client()
+    for _ in range(warmup):
+        scenario(client).close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies, errors, wall = run_load(App, scenario, requests, concurrency)
+    result = summarize(latencies, errors, wall)
+    result["peak_mb"] = round(peak / 1024 / 1024, 2)
+    return result
+
+def drain_upload_jobs(App, enqueued, timeout):
+    """Wacht tot de upload workers klaar zijn; latency per job van enqueue tot done/failed"""
+    conn = App.get_db_connection()
+    finished = {}
+    start = time.perf_counter()
+    deadline = start + timeout
+    while len(finished) < len(enqueued) and time.perf_counter() < deadline:
+        now = time.perf_counter()
+        for job in conn.execute("SELECT id, status FROM upload_jobs WHERE status IN ('done', 'failed')"):
+            if job['id'] in enqueued and job['id'] not in finished:
+                finished[job['id']] = (now, job['status'])
+        time.sleep(0.02)
+
+    # Throughput over de hele verwerking, vanaf de eerste upload
+    wall = time.perf_counter() - min(enqueued.values(), default=start)
+    latencies = [done - enqueued[job_id] for job_id, (done, _) in finished.items()]
+    failed = sum(1 for _, status in finished.values() if status == 'failed')
+    return summarize(latencies, failed + len(enqueued) - len(finished), wall)
+
+def run_corpus(size, seed, corpus_path, run_dir, endpoints, requests, concurrency, warmup,
+               ocr_delay, ai_delay, drain_timeout):
+    """Draait in een eigen proces: database klaarzetten, stand-ins installeren en meten"""
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    os.chdir(run_dir)
+    generated = not os.path.exists(corpus_path)
+    if not generated:
+        shutil.copyfile(corpus_path, 'recepten.db')
+
+    sys.path.insert(0, MODULE_DIR)
+    import App
+
+    logging.getLogger().setLevel(logging.WARNING)
+    App.create_app()
+    install_stand_ins(App, ocr_delay, ai_delay)
+
+    generate_s = 0.0
+    if generated:
+        start = time.perf_counter()
+        generate_corpus(App, size, seed)
+        generate_s = time.perf_counter() - start
+        App.get_db_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        os.makedirs(os.path.dirname(corpus_path), exist_ok=True)
+        shutil.copyfile('recepten.db', corpus_path + '.tmp')
+        os.replace(corpus_path + '.tmp', corpus_path)
+
+    upload_jobs = {}
+    scenarios = build_scenarios(seed, f"{seed}-{size}", upload_jobs)
+    results = {}
+    for name in endpoints:
+        results[name] = measure_endpoint(App, scenarios[name], requests, concurrency, warmup)
+        if name == 'upload':
+            results['upload_verwerking'] = drain_upload_jobs(App, upload_jobs, drain_timeout)
+
+    recepten = App.get_db_connection().execute('SELECT COUNT(*) FROM recepten').fetchone()[0]
+    return {
+        "recepten": recepten,
+        "generate_s": round(generate_s, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "endpoints": results,
+    }
+
+# Rapportage en baseline vergelijking
+def print_report(size, result):
+    click.echo(f"\n== {size} recepten (max RSS {result['max_rss_mb']} MB"
+               + (f", corpus gegenereerd in {result['generate_s']}s" if result['generate_s'] else '') + ")")
+    click.echo(f"{'endpoint':<22} {'n':>5} {'fout':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'piek MB':>8}")
+    for name, stats in result['endpoints'].items():
+        click.echo(
+            f"{name:<22} {stats['requests']:>5} {stats['errors']:>5} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+            f"{stats['p99_ms']:>9.2f} {stats['throughput_rps']:>8.1f} {stats.get('peak_mb', 0):>8.2f}"
+        )
+
+def compare_with_baseline(results, baseline, tolerance, min_ms):
+    """Geeft de regressies: p95 of throughput meer dan tolerance slechter dan de baseline"""
+    regressions = []
+    click.echo(f"\nVergelijking met baseline ({baseline['meta'].get('created', '?')}):")
+    click.echo(f"{'corpus':>7} {'endpoint':<22} {'p95 oud':>9} {'p95 nieuw':>10} {'req/s oud':>10} {'req/s nieuw':>12}  status")
+    for size, result in results.items():
+        old_result = baseline['results'].get(size)
+        if old_result is None:
+            continue
+        for name, stats in result['endpoints'].items():
+            old = old_result['endpoints'].get(name)
+            if old is None:
+                continue
+            slower = (stats['p95_ms'] > old['p95_ms'] * (1 + tolerance)
+                      and stats['p95_ms'] - old['p95_ms'] > min_ms)
+            less_throughput = stats['throughput_rps'] < old['throughput_rps'] / (1 + tolerance)
+            status = 'REGRESSIE' if slower or less_throughput else 'ok'
+            if status != 'ok':
+                regressions.append((size, name))
+            click.echo(
+                f"{size:>7} {name:<22} {old['p95_ms']:>9.2f} {stats['p95_ms']:>10.2f} "
+                f"{old['throughput_rps']:>10.1f} {stats['throughput_rps']:>12.1f}  {status}"
+            )
+    return regressions
+
+@click.group()
+def cli():
+    """Benchmarks voor de recepten app"""
+
+@cli.command('run')
+@click.option('--sizes', default='1000,10000,100000', help='Corpusgroottes, komma gescheiden.')
+@click.option('--endpoints', default=','.join(DEFAULT_ENDPOINTS), help='Endpoints om te meten, komma gescheiden.')
+@click.option('--requests', 'requests_per_endpoint', type=int, default=200, help='Requests per endpoint.')
+@click.option('--concurrency', type=int, default=8, help='Aantal gelijktijdige clients.')
+@click.option('--warmup', type=int, default=5, help='Warmup requests per endpoint (meten het piekgeheugen).')
+@click.option('--seed', type=int, default=42, help='Seed voor het corpus en de requests.')
+@click.option('--upload-workers', type=int, default=2, help='Aantal upload workers in het benchmark proces.')
+@click.option('--ocr-delay-ms', type=float, default=50, help='Gesimuleerde duur van een Tesseract pass.')
+@click.option('--ai-delay-ms', type=float, default=100, help='Gesimuleerde duur van een Gemini aanroep.')
+@click.option('--drain-timeout', type=float, default=300, help='Max wachttijd op de upload workers (seconden).')
+@click.option('--work-dir', type=click.Path(file_okay=False), default=DEFAULT_WORK_DIR,
+              help='Map voor gegenereerde corpora en runs.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Schrijf de resultaten als JSON.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Vergelijk met deze baseline.')
+@click.option('--save-baseline', type=click.Path(dir_okay=False), help='Sla de resultaten op als baseline.')
+@click.option('--tolerance', type=float, default=0.2, help='Toegestane verslechtering t.o.v. de baseline (0.2 = 20%).')
+@click.option('--min-ms', type=float, default=2.0, help='p95 verschillen kleiner dan dit tellen niet als regressie.')
+def run_command(sizes, endpoints, requests_per_endpoint, concurrency, warmup, seed, upload_workers,
+                ocr_delay_ms, ai_delay_ms, drain_timeout, work_dir, output, baseline, save_baseline,
+                tolerance, min_ms):
+    """Meet latency, throughput en geheugen per endpoint voor elke corpusgrootte"""
+    endpoints = [name.strip() for name in endpoints.split(',') if name.strip()]
+    unknown = set(endpoints) - set(DEFAULT_ENDPOINTS)
+    if unknown:
+        raise click.BadParameter(f"Onbekende endpoints: {', '.join(sorted(unknown))}", param_hint='--endpoints')
+
+    work_dir = os.path.abspath(work_dir)
+    env = dict(os.environ, UPLOAD_WORKERS=str(upload_workers), SENTRY_DSN='', GOOGLE_API_KEY='stand-in')
+    results = {}
+    for size in [int(s) for s in sizes.split(',') if s.strip()]:
+        config = {
+            "size": size,
+            "seed": seed,
+            "corpus_path": os.path.join(work_dir, f"corpus-{size}-{seed}.db"),
+            "run_dir": os.path.join(work_dir, f"run-{size}"),
+            "endpoints": endpoints,
+            "requests": requests_per_endpoint,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "ocr_delay": ocr_delay_ms / 1000,
+            "ai_delay": ai_delay_ms / 1000,
+            "drain_timeout": drain_timeout,
+        }
+        click.echo(f"Corpus van {size} recepten...", err=True)
+        # Een nieuw proces per corpus: schone caches, connecties en max RSS
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'corpus', json.dumps(config)],
+            env=env, stdout=subprocess.PIPE, text=True
+        )
+        if proc.returncode != 0:
+            raise click.ClickException(f"Benchmark voor {size} recepten mislukt (exit code {proc.returncode})")
+        results[str(size)] = json.loads(proc.stdout.strip().splitlines()[-1])
+        print_report(size, results[str(size)])
+
+    report = {
+        "meta": {
+            "created": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": requests_per_endpoint,
+            "concurrency": concurrency,
+            "seed": seed,
+            "ocr_delay_ms": ocr_delay_ms,
+            "ai_delay_ms": ai_delay_ms,
+        },
+        "results": results,
+    }
+    for path in (output, save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), tolerance, min_ms)
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} regressie(s) ten opzichte van de baseline")
+
+# Koude kolommen: recepten met de ruwe OCR tekst inline (oude layout) tegenover
+# recepten + recept_bronnen met gecomprimeerde tekst (huidige layout)
+LEGACY_RECIPE_TABLE = '''
+    CREATE TABLE recepten (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, titel TEXT NOT NULL, ingredienten TEXT, stappen TEXT,
+        benodigdheden TEXT, originele_bestandsnaam TEXT, ruwe_ocr_tekst TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, bestand_hash TEXT, versie INTEGER NOT NULL DEFAULT 1,
+        inhoud_hash TEXT, ocr_versie TEXT, ai_versie TEXT
+    )
+'''
+COLD_COLUMN_QUERIES = {
+    'lijst': "SELECT id, titel, timestamp, bestand_hash FROM recepten ORDER BY timestamp DESC, id DESC",
+    'like_scan': "SELECT id FROM recepten WHERE titel LIKE '%zzz%' OR ingredienten LIKE '%zzz%'",
+    'versie_scan': "SELECT COUNT(*) FROM recepten WHERE ocr_versie IS NOT 'x' OR ai_versie IS NOT 'x'",
+}
+
+def build_layout_copies(source, split_path, inline_path):
+    """Kopieer alleen de recepten data naar een database per layout (zonder FTS en caches)"""
+    import sqlite3
+    import zlib
+
+    for path in (split_path, inline_path):
+        if os.path.exists(path):
+            os.remove(path)
+    conn = sqlite3.connect(split_path)
+    conn.execute('ATTACH DATABASE ? AS bron', (source,))
+    conn.execute('CREATE TABLE recepten AS SELECT * FROM bron.recepten')
+    conn.execute('CREATE TABLE recept_bronnen AS SELECT * FROM bron.recept_bronnen')
+    conn.commit()
+    conn.execute('DETACH DATABASE bron')
+
+    conn_inline = sqlite3.connect(inline_path)
+    conn_inline.create_function('uitpakken', 1, lambda value: value and zlib.decompress(value).decode('utf-8'))
+    conn_inline.execute('ATTACH DATABASE ? AS bron', (split_path,))
+    conn_inline.execute(LEGACY_RECIPE_TABLE)
+    conn_inline.execute('''
+        INSERT INTO recepten
+        SELECT r.id, r.titel, r.ingredienten, r.stappen, r.benodigdheden, b.originele_bestandsnaam,
+               uitpakken(b.ruwe_ocr_tekst), r.timestamp, r.bestand_hash, r.versie, r.inhoud_hash,
+               r.ocr_versie, r.ai_versie
+        FROM bron.recepten r LEFT JOIN bron.recept_bronnen b ON b.recept_id = r.id
+    ''')
+    conn_inline.commit()
+    conn_inline.execute('DETACH DATABASE bron')
+
+    for db in (conn, conn_inline):
+        db.execute('CREATE INDEX idx_recepten_timestamp_id ON recepten (timestamp, id)')
+        db.commit()
+        db.execute('VACUUM')
+        db.close()
+
+def time_query(path, sql, repeat):
+    """Mediaan in ms over repeat runs, elke run met een nieuwe connectie (lege page cache)"""
+    import sqlite3
+
+    timings = []
+    for _ in range(repeat):
+        conn = sqlite3.connect(path)
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+        conn.close()
+    return round(sorted(timings)[len(timings) // 2], 2)
+
+@cli.command('cold-columns')
+@click.option('--size', type=int, default=10000, help='Aantal recepten.')
+@click.option('--seed', type=int, default=42, help='Seed voor het corpus.')
+@click.option('--repeat', type=int, default=7, help='Runs per query (de mediaan telt).')
+@click.option('--work-dir', type=click.Path(file_okay=False), default=DEFAULT_WORK_DIR,
+              help='Map voor gegenereerde corpora en runs.')
+def cold_columns_command(size, seed, repeat, work_dir):
+    """Meet databasegrootte en scantijd met en zonder de koude kolommen in recepten"""
+    work_dir = os.path.abspath(work_dir)
+    corpus_path = os.path.join(work_dir, f"corpus-{size}-{seed}.db")
+    run_dir = os.path.join(work_dir, f"cold-{size}")
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    os.chdir(run_dir)
+    if os.path.exists(corpus_path):
+        shutil.copyfile(corpus_path, 'recepten.db')  # een oud corpus wordt bij het opstarten gemigreerd
+
+    os.environ.update(UPLOAD_WORKERS='0', SENTRY_DSN='')
+    sys.path.insert(0, MODULE_DIR)
+    import App
+
+    logging.getLogger().setLevel(logging.WARNING)
+    App.create_app()
+    if not os.path.exists(corpus_path):
+        click.echo(f"Corpus van {size} recepten genereren...", err=True)
+        generate_corpus(App, size, seed)
+    App.get_db_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    layouts = {'inline': os.path.abspath('inline.db'), 'gesplitst': os.path.abspath('gesplitst.db')}
+    build_layout_copies(os.path.abspath('recepten.db'), layouts['gesplitst'], layouts['inline'])
+
+    click.echo(f"\n== {size} recepten, mediaan van {repeat} runs")
+    click.echo(f"{'layout':<10} {'MB':>8} " + ' '.join(f"{name + ' ms':>14}" for name in COLD_COLUMN_QUERIES))
+    for layout, path in layouts.items():
+        timings = [time_query(path, sql, repeat) for sql in COLD_COLUMN_QUERIES.values()]
+        click.echo(f"{layout:<10} {os.path.getsize(path) / 1024 / 1024:>8.2f} "
+                   + ' '.join(f"{ms:>14.2f}" for ms in timings))
+
+@cli.command('corpus', hidden=True)
+@click.argument('config')
+def corpus_command(config):
+    """Intern: één corpus meten en het resultaat als JSON op stdout zetten"""
+    result = run_corpus(**json.loads(config))
+    sys.stdout.write(json.dumps(result) + '\n')
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def App(tmp_path_factory):
+    """App met database en uploads in een tijdelijke map"""
+    os.chdir(tmp_path_factory.mktemp('recepten'))
+    import App as app_module
+    app_module.init_app()
+    return app_module
@@ -0,0 +1,41 @@
+import threading
+import time
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_upload_is_processed_while_reprocess_runs(App, monkeypatch):
+    reprocess_started = threading.Event()
+    release_reprocess = threading.Event()
+
+    def blocking_reprocess(heartbeat=None, **kwargs):
+        reprocess_started.set()
+        release_reprocess.wait(10)
+        return {"bijgewerkt": 0, "ongewijzigd": 0, "geen_archief": 0, "mislukt": 0, "conflict": 0}
+
+    def fake_upload(job):
+        App.update_upload_job(job['id'], status='done', stage='done', lease_until=None)
+
+    monkeypatch.setattr(App, 'run_reprocess', blocking_reprocess)
+    monkeypatch.setattr(App, 'process_upload_job', fake_upload)
+    monkeypatch.setattr(App, 'JOB_POLL_INTERVAL', 0.05)
+    # Ook met één upload worker mag de herverwerking die niet bezet houden
+    monkeypatch.setattr(App, 'UPLOAD_WORKERS', 1)
+    App.start_upload_workers()
+
+    try:
+        reprocess_id = App.enqueue_reprocess_job()
+        assert reprocess_started.wait(5)
+
+        upload_id = App.enqueue_upload_job('foto.jpg', 'image/jpeg')
+        assert wait_for(lambda: App.get_upload_job(upload_id)['status'] == 'done')
+        assert App.get_upload_job(reprocess_id)['status'] == 'running'
+    finally:
+        release_reprocess.set()
+
+    assert wait_for(lambda: App.get_upload_job(reprocess_id)['status'] == 'done')
@@ -0,0 +1,22 @@
+import json
+
+def fts_ingredienten(conn, recept_id):
+    row = conn.execute('SELECT ingredienten FROM recepten_fts WHERE rowid = ?', (recept_id,)).fetchone()
+    return row['ingredienten'] if row else None
+
+def test_legacy_row_with_string_ingredients_is_indexed(App):
+    # Oudere recepten (en sommige Gemini antwoorden) hebben ingrediënten als losse strings
+    with App.db_write() as conn:
+        recept_id = conn.execute('''
+            INSERT INTO recepten (titel, ingredienten, stappen, benodigdheden)
+            VALUES (?, ?, ?, ?)
+        ''', ('Pannenkoeken', json.dumps(['bloem', {'naam': 'melk'}]), json.dumps(['Bakken']), '[]')).lastrowid
+        conn.execute('UPDATE recepten SET ingredienten = ? WHERE id = ?',
+                     (json.dumps(['bloem', 'melk', 'ei']), recept_id))
+        App.rebuild_search_index(conn)
+
+    conn = App.get_db_connection()
+    assert fts_ingredienten(conn, recept_id) == 'bloem melk ei'
+    assert conn.execute(
+        'SELECT rowid FROM recepten_fts WHERE recepten_fts MATCH ?', (App.build_fts_query('ei'),)
+    ).fetchone()[0] == recept_id
@@ -0,0 +1,28 @@
+import pytest
+
+@pytest.mark.parametrize('text, expected', [
+    ('200 g', (200.0, 'g')),
+    ('1 1/2', (1.5, '')),
+    ('1½ el', (1.5, 'el')),
+    ('2-3 el', (3.0, 'el')),
+    ('0,5', (0.5, '')),
+    ('naar smaak', (None, '')),
+    ('2 x 100 g', (None, '')),
+    ('1-2 stuks of 3', (None, '')),
+    ('2 pakjes à 250 g', (None, '')),
+])
+def test_parse_quantity(App, text, expected):
+    assert App.parse_quantity(text) == expected
+
+def test_unparseable_quantities_are_not_summed(App):
+    recipe = {'titel': 'Soep', 'stappen': [], 'benodigdheden': [], 'ingredienten': [
+        {'naam': 'Tomaat', 'hoeveelheid': '2 x 100', 'eenheid': 'g'},
+        {'naam': 'Tomaat', 'hoeveelheid': '50', 'eenheid': 'g'},
+    ]}
+    with App.db_write() as conn:
+        recept_id = App.insert_recipe(conn, recipe, 'soep.jpg', 'tekst')
+
+    items = App.build_shopping_list(App.get_db_connection(), [(recept_id, 1.0)])
+    by_unit = {item['eenheid']: item for item in items if item['naam'].lower() == 'tomaat'}
+    assert by_unit['g']['hoeveelheid'] == 50
+    assert by_unit[None]['niet_opgeteld'] == ['2 x 100 g']
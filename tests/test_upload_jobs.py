@@ -0,0 +1,32 @@
+import threading
+
+RECIPE = {'titel': 'Appeltaart', 'ingredienten': [{'naam': 'appel'}], 'stappen': [], 'benodigdheden': []}
+
+def test_same_upload_is_coalesced_onto_running_job(App, monkeypatch):
+    # Geen workers die de jobs tijdens de test oppakken
+    monkeypatch.setattr(App, 'claim_upload_job', lambda reprocess=False: None)
+
+    first = App.enqueue_upload_job('a.png', 'image/png', file_hash='hash-coalesce')
+    App.update_upload_job(first, status='running')
+    assert App.enqueue_upload_job('b.png', 'image/png', file_hash='hash-coalesce') == first
+
+    App.update_upload_job(first, status='done')
+    assert App.enqueue_upload_job('c.png', 'image/png', file_hash='hash-coalesce') != first
+
+def test_concurrent_saves_of_same_file_insert_one_recipe(App):
+    ids = []
+
+    def save(index):
+        ids.append(App.save_recipe(RECIPE, f'{index}.png', 'tekst', file_hash='hash-concurrent'))
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 1
+    count = App.get_db_connection().execute(
+        "SELECT COUNT(*) FROM recepten WHERE bestand_hash = 'hash-concurrent'"
+    ).fetchone()[0]
+    assert count == 1
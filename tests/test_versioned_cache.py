@@ -0,0 +1,28 @@
+import threading
+
+def test_slow_build_does_not_block_other_caches(App):
+    building = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def slow_builder(conn, versie):
+        building.set()
+        release.wait(10)
+        return 'traag'
+
+    slow = threading.Thread(target=App.get_versioned_cache, args=('test_traag', slow_builder))
+    fast = threading.Thread(target=lambda: results.append(
+        App.get_versioned_cache('test_snel', lambda conn, versie: 'snel')
+    ))
+    slow.start()
+    try:
+        assert building.wait(5)
+        # Een andere cache wordt opgebouwd terwijl de trage build nog loopt
+        fast.start()
+        fast.join(2)
+        assert results == ['snel']
+    finally:
+        release.set()
+        slow.join()
+        fast.join()
+    assert App.get_versioned_cache('test_traag', slow_builder) == 'traag'